@@ -0,0 +1,100 @@
+"""
+Compares converting camera frames for the recognizer by allocating new arrays every frame (cv2.resize and cv2.cvtColor
+returning new images) against FrameConverter, which writes into reused buffers. Reports time and memory allocations
+per frame. Run from the repository root:
+    python -m benchmarks.bench_frame_conversion [--frames 300] [--width 1280 --height 720] [--target-width 640]
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from myGestureRecognizer.frameConverter import FrameConverter
+
+MODES = ["allocating", "reused buffers"]
+
+
+def convert_allocating(frame: np.ndarray, size) -> np.ndarray:
+    """
+    The conversion as it was done before FrameConverter.
+    """
+    if size is not None:
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+
+def make_converter(mode: str):
+    if mode == "allocating":
+        return convert_allocating
+    return FrameConverter().convert
+
+
+def measure(mode: str, frames: list[np.ndarray], size) -> float:
+    """
+    :return: microseconds per frame
+    """
+    convert = make_converter(mode)
+    # warm up, so the buffers of FrameConverter are allocated before measuring
+    for frame in frames[:8]:
+        convert(frame, size)
+    start = time.perf_counter()
+    for frame in frames:
+        convert(frame, size)
+    return (time.perf_counter() - start) / len(frames) * 1e6
+
+
+def count_allocations(mode: str, frame: np.ndarray, size, frames: int) -> tuple[int, int]:
+    """
+    Counts the frames for which a conversion allocates image memory, from the traced peak around each frame (numpy
+    reports its buffers to tracemalloc).
+    :return: frames that allocated memory, and the largest allocation in bytes
+    """
+    convert = make_converter(mode)
+    for _ in range(8):
+        convert(frame, size)
+    allocating_frames = 0
+    largest = 0
+    tracemalloc.start()
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        convert(frame, size)
+        _, peak = tracemalloc.get_traced_memory()
+        if peak - current > 1024:
+            allocating_frames += 1
+            largest = max(largest, peak - current)
+    tracemalloc.stop()
+    return allocating_frames, largest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--target-width", type=int, default=640, help="0 to convert without downscaling")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # a few different frames, so the conversions do not run on one cached image
+    frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(4)]
+    frames = [frames[index % len(frames)] for index in range(args.frames)]
+    size = None
+    if args.target_width and args.target_width < args.width:
+        size = (args.target_width, round(args.height * args.target_width / args.width))
+
+    print(f"{args.width}x{args.height} -> {size[0]}x{size[1]}" if size else f"{args.width}x{args.height}, no downscaling")
+    print(f"{'mode':>15} {'time (us)':>10} {'frames allocating':>18} {'largest (KiB)':>14}")
+    baseline = None
+    for mode in MODES:
+        microseconds = measure(mode, frames, size)
+        allocating_frames, largest = count_allocations(mode, frames[0], size, args.frames)
+        baseline = baseline or microseconds
+        print(f"{mode:>15} {microseconds:>10.1f} {allocating_frames:>8}/{args.frames:<9} {largest / 1024:>14.1f}"
+              f"   {baseline / microseconds:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
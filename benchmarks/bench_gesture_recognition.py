@@ -0,0 +1,145 @@
+"""
+Replays labelled clips through VideoGestureRecogniser.get_gesture without a camera or window, and reports the frames
+per second, per-frame latency (p50/p95), time to decision and accuracy per gesture. Run from the repository root:
+    python -m benchmarks.bench_gesture_recognition CLIPS [--timeout 10]
+    python -m benchmarks.bench_gesture_recognition --synthetic 300
+
+CLIPS holds one directory per expected gesture, named after EnumGesture (ILoveYou_Right, ILoveYou_Left, Victory, and
+INVALID for clips in which no gesture should be chosen). Each clip in them is a video file or a directory of images:
+    CLIPS/Victory/wave.mp4
+    CLIPS/ILoveYou_Left/take1/0001.png ...
+--synthetic replays generated frames without a hand instead, to measure throughput and latency alone.
+Clips are replayed at their own frame rate, like a camera, so the recogniser drops frames the same way it would live.
+"""
+import argparse
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from gesture import EnumGesture
+from myGestureRecognizer import VideoGestureRecogniser
+from myGestureRecognizer.frameSources import EndOfFrames, FrameSource, SyntheticSource, frame_source_manager, \
+    open_frame_source
+
+GESTURES_TO_SPOT = [gesture for gesture in EnumGesture if gesture != EnumGesture.INVALID]
+
+
+@dataclass
+class ClipResult:
+    path: str
+    expected: EnumGesture
+    chosen: EnumGesture
+    # seconds from the start of get_gesture to the decision, None if no gesture was chosen
+    time_to_decision: Optional[float]
+    # seconds get_gesture ran for
+    duration: float
+    latencies_ms: list[float] = field(default_factory=list)
+
+    @property
+    def correct(self) -> bool:
+        return self.chosen == self.expected
+
+
+def find_clips(directory: str) -> list[tuple[str, EnumGesture]]:
+    """
+    :return: (clip path, expected gesture) for every clip under directory
+    """
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        label_directory = os.path.join(directory, name)
+        if not os.path.isdir(label_directory):
+            continue
+        if name not in EnumGesture.__members__:
+            print(f"Skipping {label_directory}: not a gesture name ({', '.join(EnumGesture.__members__)})")
+            continue
+        for clip in sorted(os.listdir(label_directory)):
+            clips.append((os.path.join(label_directory, clip), EnumGesture[name]))
+    return clips
+
+
+def replay(recogniser: VideoGestureRecogniser, source: FrameSource, path: str, expected: EnumGesture,
+           timeout: float) -> ClipResult:
+    """
+    Runs one get_gesture call over the frames of a source. The recognizer model is loaded before the clip starts, so
+    its load time is not counted.
+    """
+    recogniser.frame_source = lambda: frame_source_manager(source)
+    with recogniser.session():
+        start = time.perf_counter()
+        try:
+            recogniser.get_gesture(GESTURES_TO_SPOT, timeout=timeout)
+        except (TimeoutError, EndOfFrames):
+            pass
+        duration = time.perf_counter() - start
+    decision = recogniser.decision_metrics
+    return ClipResult(
+        path=path,
+        expected=expected,
+        chosen=decision.gesture if decision is not None else EnumGesture.INVALID,
+        time_to_decision=decision.time_to_decision if decision is not None else None,
+        duration=duration,
+        latencies_ms=recogniser.frame_controller.latencies(),
+    )
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def report(results: list[ClipResult]):
+    latencies = [latency for result in results for latency in result.latencies_ms]
+    duration = sum(result.duration for result in results)
+    decision_times = [result.time_to_decision for result in results if result.time_to_decision is not None]
+
+    print(f"\n{len(results)} clips, {len(latencies)} frames recognised in {duration:.1f} s")
+    print(f"throughput:       {len(latencies) / duration if duration else 0.0:.1f} fps")
+    print(f"frame latency:    p50 {percentile(latencies, 0.5):.0f} ms, p95 {percentile(latencies, 0.95):.0f} ms")
+    if decision_times:
+        print(f"time to decision: p50 {percentile(decision_times, 0.5):.2f} s, "
+              f"p95 {percentile(decision_times, 0.95):.2f} s ({len(decision_times)} decisions)")
+
+    print(f"\n{'gesture':>15} {'clips':>6} {'correct':>8} {'accuracy':>9}")
+    for gesture in EnumGesture:
+        gesture_results = [result for result in results if result.expected == gesture]
+        if not gesture_results:
+            continue
+        correct = sum(result.correct for result in gesture_results)
+        print(f"{gesture.name:>15} {len(gesture_results):>6} {correct:>8} {correct / len(gesture_results):>9.0%}")
+
+    wrong = [result for result in results if not result.correct]
+    for result in wrong:
+        print(f"wrong: {result.path} expected {result.expected.name}, chose {result.chosen.name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("clips", nargs="?", help="directory of labelled clips")
+    parser.add_argument("--synthetic", type=int, metavar="FRAMES", help="replay this many generated frames instead")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds per clip before giving up")
+    args = parser.parse_args()
+    if (args.clips is None) == (args.synthetic is None):
+        parser.error("give either a clips directory or --synthetic")
+
+    recogniser = VideoGestureRecogniser(headless=True)
+    results = []
+    if args.synthetic is not None:
+        source = SyntheticSource(frames=args.synthetic)
+        results.append(replay(recogniser, source, "synthetic", EnumGesture.INVALID, args.timeout))
+    else:
+        for path, expected in find_clips(args.clips):
+            source = open_frame_source(path)
+            result = replay(recogniser, source, path, expected, args.timeout)
+            print(f"{path}: expected {expected.name}, chose {result.chosen.name}")
+            results.append(result)
+    if not results:
+        print("No clips found.")
+        return
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compares decoding graph.json with strict pydantic validation (untrusted games) against the trusted paths used for
+games this installation signed itself: graph.json without validation, and the signed binary graph the loader builds
+the graph from when the game has one. Run from the repository root:
+    python -m benchmarks.bench_graph_decode [--sizes 10000 100000] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+
+from benchmarks.bench_graph_load import build_serial_graph
+from graph.binary_graph import encode_binary_graph
+from storageManager import config, integrity
+from storageManager.game_load import GameLoader
+from storageManager.integrity import BlockSignatures
+from storageManager.mapped_graph import MappedBinaryGraph
+
+MODES = ["validated", "trusted", "trusted-binary"]
+
+
+@dataclass
+class EncodedGraph:
+    graph_json: bytes
+    # a signed graph.bin, as written on save
+    binary_path: str
+    binary_signature: str
+    block_signatures: BlockSignatures
+
+
+def encode(size: int, directory: str) -> EncodedGraph:
+    serial_graph = build_serial_graph(size)
+    binary_path = os.path.join(directory, f"{size}.bin")
+    with open(binary_path, 'wb') as file:
+        writer = integrity.SigningWriter(file, config.GRAPH_SIGNATURE_BLOCK_SIZE)
+        writer.write(encode_binary_graph(serial_graph))
+    return EncodedGraph(serial_graph.model_dump_json(indent=4).encode("utf-8"), binary_path, writer.signature,
+                        writer.block_signatures)
+
+
+def decode(loader: GameLoader, mode: str, encoded: EncodedGraph):
+    if mode == "validated":
+        loader._build_graph(encoded.graph_json.decode("utf-8"))
+    elif mode == "trusted":
+        loader._build_graph_trusted(encoded.graph_json)
+    else:
+        # the same call the loader makes for a signed game, block verification included
+        root = loader._build_graph_from_binary(
+            lambda block_signatures: MappedBinaryGraph(encoded.binary_path, block_signatures=block_signatures),
+            encoded.binary_signature, encoded.block_signatures)
+        if root is None:
+            raise RuntimeError("The binary graph was rejected")
+
+
+def measure(loader: GameLoader, mode: str, encoded: EncodedGraph, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(loader, mode, encoded)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    loader = GameLoader()
+    print(f"{'nodes':>8} {'mode':>14} {'decode (ms)':>12} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            encoded = encode(size, directory)
+            baseline = None
+            for mode in MODES:
+                seconds = measure(loader, mode, encoded, args.repeat)
+                baseline = baseline or seconds
+                print(f"{size:>8} {mode:>14} {seconds * 1000:>12.1f} {baseline / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Compares loading a game graph from graph.json (pydantic) with the memory-mapped binary graph (graph.bin).
+
+Each measurement runs in a fresh interpreter, so peak RSS is not shared between runs. Run from the repository root:
+    python -m benchmarks.bench_graph_load [--sizes 1000 10000 100000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from gesture import EnumGesture
+from graph.binary_graph import encode_binary_graph
+from graph.serial_graph import SerialGraph
+from graph.serial_node import SerialNode
+
+MODES = ["json", "binary", "binary-on-demand"]
+# how many nodes the on-demand mode resolves, following the first choice from the root
+ON_DEMAND_STEPS = 100
+
+
+def build_serial_graph(node_count: int) -> SerialGraph:
+    """
+    Synthetic binary-tree shaped story with node_count nodes and realistic text lengths.
+    """
+    nodes = {}
+    for index in range(node_count):
+        adjacency_list = {}
+        if 2 * index + 1 < node_count:
+            adjacency_list[EnumGesture.ILoveYou_Left] = 2 * index + 1
+        if 2 * index + 2 < node_count:
+            adjacency_list[EnumGesture.ILoveYou_Right] = 2 * index + 2
+        nodes[index] = SerialNode(
+            id=index,
+            text=f"Scene {index}: the corridor splits in two and a cold draft blows out of the darkness ahead.",
+            left_option=f"Take the left passage from scene {index}" if adjacency_list else "",
+            right_option=f"Take the right passage from scene {index}" if adjacency_list else "",
+            audio_filename=f"node_{index}.flac",
+            adjacency_list=adjacency_list,
+            is_win=not adjacency_list,
+        )
+    return SerialGraph(nodes=nodes, audio_codec="flac")
+
+
+def write_archive(serial_graph: SerialGraph, zip_path: str):
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("bench/graph.json", serial_graph.model_dump_json(indent=4))
+        zf.writestr("bench/graph.bin", encode_binary_graph(serial_graph), zipfile.ZIP_STORED)
+
+
+def peak_rss_kb() -> int | None:
+    # on Linux ru_maxrss survives exec, so a child would report the parent's peak; VmHWM belongs to this process only
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_child(mode: str, zip_path: str):
+    """
+    Loads the graph once with the given mode and prints the measurement as JSON.
+    """
+    from storageManager.game_archive import GameArchive
+    from storageManager.game_load import GameLoader
+
+    loader = GameLoader()
+    rss_before = peak_rss_kb()
+    start = time.perf_counter()
+
+    archive = GameArchive(zip_path)
+    if mode == "json":
+        loader._build_graph(archive.read_graph())
+    elif mode == "binary":
+        with archive.open_binary_graph() as binary_graph:
+            binary_graph.to_nodes()
+    else:
+        with archive.open_binary_graph() as binary_graph:
+            index = binary_graph.root_index
+            for _ in range(ON_DEMAND_STEPS):
+                binary_graph.serial_node(index)
+                edges = binary_graph.edges(index)
+                if not edges:
+                    break
+                index = edges[0][1]
+
+    elapsed = time.perf_counter() - start
+    rss_after = peak_rss_kb()
+    rss_delta = None if rss_before is None else rss_after - rss_before
+    print(json.dumps({"seconds": elapsed, "peak_rss_delta_kb": rss_delta}))
+
+
+def measure(mode: str, zip_path: str, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_graph_load", "--child", mode, zip_path],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    rss = [run["peak_rss_delta_kb"] for run in runs if run["peak_rss_delta_kb"] is not None]
+    return {"seconds": min(run["seconds"] for run in runs), "peak_rss_delta_kb": max(rss) if rss else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "ZIP"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+        return
+
+    print(f"{'nodes':>8} {'mode':>17} {'load (ms)':>10} {'peak RSS +MB':>13}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            zip_path = os.path.join(tmp_dir, f"bench_{size}.noui")
+            write_archive(build_serial_graph(size), zip_path)
+            for mode in MODES:
+                result = measure(mode, zip_path, args.repeat)
+                rss = result["peak_rss_delta_kb"]
+                rss_text = "n/a" if rss is None else f"{rss / 1024:.1f}"
+                print(f"{size:>8} {mode:>17} {result['seconds'] * 1000:>10.1f} {rss_text:>13}")
+
+
+if __name__ == "__main__":
+    main()
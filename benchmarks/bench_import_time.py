@@ -0,0 +1,133 @@
+"""
+Measures how long starting the editor takes to import, with python -X importtime in a fresh interpreter, and fails if
+it goes over a time budget or loads a heavy dependency that is only needed once speech is synthesized or gestures are
+recognised (torch, transformers, parler_tts, mediapipe, cv2). Run from the repository root:
+    python -m benchmarks.bench_import_time [--budget-ms 1000] [--repeat 5] [--top 15]
+    python -m benchmarks.bench_import_time --module gamePlayer --attribute GamePlayer
+The exit status is 1 if the budget is exceeded or a heavy dependency was imported, so the check can gate CI.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+# import time of the editor's entry point allowed by default, in milliseconds
+STARTUP_BUDGET_MS = 1000
+# packages that must only be imported once synthesis or recognition starts
+HEAVY_PACKAGES = ["torch", "transformers", "parler_tts", "mediapipe", "cv2"]
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# import time:       self [us] |  cumulative | imported package
+_IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    # microseconds spent importing the module itself, and with the modules it imported
+    self_us: int
+    cumulative_us: int
+    # how deep in the import tree the module was imported (0 for the ones imported by the measured code)
+    depth: int
+
+
+def measure_imports(module: str, attribute: Optional[str]) -> list[ImportRecord]:
+    """
+    Imports module (and gets the attribute from it) in a new interpreter.
+    :return: every module that was imported, in the order the imports finished
+    """
+    code = f"import {module}" + (f"; {module}.{attribute}" if attribute else "")
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPOSITORY_ROOT,
+                             capture_output=True, text=True)
+    records = []
+    other_lines = []
+    for line in process.stderr.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if match is None:
+            if not line.startswith("import time:"):
+                other_lines.append(line)
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        # -X importtime indents a nested import by two more spaces, after the one separating the columns
+        records.append(ImportRecord(name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n" + "\n".join(other_lines))
+    return records
+
+
+def top_level_totals(records: list[ImportRecord]) -> dict[str, int]:
+    """
+    :return: top-level package -> microseconds spent importing it and its submodules (excluding other packages)
+    """
+    totals: dict[str, int] = {}
+    for record in records:
+        package = record.module.split(".")[0]
+        totals[package] = totals.get(package, 0) + record.self_us
+    return totals
+
+
+def heavy_imports(records: list[ImportRecord]) -> list[str]:
+    imported = {record.module.split(".")[0] for record in records}
+    return [package for package in HEAVY_PACKAGES if package in imported]
+
+
+def import_chain(records: list[ImportRecord], package: str) -> list[str]:
+    """
+    :return: the first module of package that was imported, followed by the modules whose imports led to it, to show
+    where the import should be made lazy
+    """
+    for index, record in enumerate(records):
+        if record.module.split(".")[0] != package:
+            continue
+        chain = [record.module]
+        depth = record.depth
+        # the import of a module finishes after the imports it made, so its importer is the next record one level up
+        for later in records[index + 1:]:
+            if later.depth < depth:
+                chain.append(later.module)
+                depth = later.depth
+        return chain
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="gui.homePage", help="module to import, as started by main.py")
+    parser.add_argument("--attribute", default="run", help="attribute to get from the module after importing it "
+                                                          "(empty for none)")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=5, help="imports to measure; the fastest counts, so the first "
+                                                             "one compiling the bytecode does not")
+    parser.add_argument("--top", type=int, default=15, help="slowest packages to list")
+    args = parser.parse_args()
+
+    try:
+        runs = [measure_imports(args.module, args.attribute or None) for _ in range(max(1, args.repeat))]
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    records = min(runs, key=lambda run: sum(record.self_us for record in run))
+    total_ms = sum(record.self_us for record in records) / 1000
+
+    print(f"Importing {args.module}: {total_ms:.1f} ms, {len(records)} modules (best of {len(runs)})")
+    print(f"{'package':<32} {'time (ms)':>10} {'share':>7}")
+    totals = top_level_totals(records)
+    for package, microseconds in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{package:<32} {microseconds / 1000:>10.1f} {microseconds / 1000 / total_ms:>7.1%}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"the import took {total_ms:.1f} ms, over the budget of {args.budget_ms:g} ms")
+    for package in heavy_imports(records):
+        failures.append(f"{package} was imported at startup (via {' <- '.join(import_chain(records, package))})")
+    if failures:
+        print("\nFailed:\n" + "\n".join(failures))
+        sys.exit(1)
+    print(f"\nWithin the budget of {args.budget_ms:g} ms, no heavy dependencies imported.")
+
+
+if __name__ == "__main__":
+    main()
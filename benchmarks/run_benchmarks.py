@@ -0,0 +1,231 @@
+"""
+End-to-end benchmark suite over synthetic stories (storageManager.synthetic_graphs): serializing and saving the graph,
+saving a whole game with the speech synthesis stubbed out, loading it, analysing it and playing through it. Records
+the time (best of --repeat runs) and peak traced memory of every case into a JSON file, and compares against an
+earlier one. Run from the repository root:
+    python -m benchmarks.run_benchmarks [--sizes 100 10000] [--shapes chain tree dag cycles] [--output results.json]
+    python -m benchmarks.run_benchmarks --compare baseline.json [--tolerance 0.25]
+With --compare, cases more than --tolerance slower (or using more memory) than the baseline are listed and the exit
+status is 1, so the suite can gate CI.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import numpy as np
+import soundfile as sf
+
+from gesture import EnumGesture
+from gamePlayer.gameSession import GameSession, GestureDetected, NarrationEnded
+from graph import Node
+from graph.analysis import analyze_graph
+from storageManager import ExtractionCache, GameLoader, GameSaver, SpeechCache
+from storageManager.synthetic_graphs import SHAPES, build_graph
+
+CASES = ["serialize", "save_graph", "save_game", "load_graph", "analyze", "play"]
+# choices made by the play case (a session on a chain would otherwise walk the whole graph)
+PLAY_STEPS = 10000
+
+
+class StubTalker:
+    """
+    Stands in for text2speech.Talker: writes a short silence instead of synthesizing speech, so saving can be measured
+    without the TTS model.
+    """
+    model_name = "benchmark-stub"
+    device = "cpu"
+    sampling_rate = 16000
+
+    def generate_speech_batch(self, items, description, batch_size=8):
+        silence = np.zeros(self.sampling_rate // 10, dtype=np.float32)
+        for _, output_file in items:
+            sf.write(output_file, silence, self.sampling_rate)
+
+
+def make_saver(work_dir: str) -> GameSaver:
+    return GameSaver(speech_cache=SpeechCache(os.path.join(work_dir, "speech_cache")), workers=1,
+                     talker_factory=StubTalker)
+
+
+def write_graph_archive(saver: GameSaver, root: Node, zip_path: str, work_dir: str):
+    """
+    Writes a game archive with the graph files only (no audio), as save_game would lay it out.
+    """
+    folder = os.path.join(work_dir, "bench")
+    os.makedirs(os.path.join(folder, "audio"), exist_ok=True)
+    saver._zip_folder_to(folder, zip_path, root, {})
+
+
+def play(root: Node, steps: int = PLAY_STEPS):
+    """
+    Plays a session with random choices for at most steps choices, as a player would.
+    """
+    choose = random.Random(0).choice
+    session = GameSession(root, barge_in=False)
+    for _ in range(steps):
+        node_id = session.node.get_id()
+        # the audio GamePlayer would prefetch
+        _ = session.next_audio_filenames
+        session.handle(NarrationEnded(node_id))
+        gestures = [gesture for gesture in session.allowed_gestures if gesture != EnumGesture.Victory]
+        session.handle(GestureDetected(node_id, choose(gestures) if gestures else EnumGesture.Victory))
+        if session.finished:
+            break
+
+
+def prepare_case(case: str, root: Node, work_dir: str) -> Callable[[], None]:
+    """
+    Does the setup of a case outside the measurement.
+    :return: the function to measure
+    """
+    saver = make_saver(work_dir)
+    if case == "serialize":
+        return lambda: sum(1 for _ in saver._iter_serial_nodes(root))
+    if case == "save_graph":
+        graph_dir = os.path.join(work_dir, "graph")
+        os.makedirs(graph_dir, exist_ok=True)
+        return lambda: saver.save_graph(graph_dir, root)
+    if case == "save_game":
+        games_dir = os.path.join(work_dir, "games")
+        os.makedirs(games_dir, exist_ok=True)
+        # a new speech cache every run, so every run synthesizes (with the stub) instead of reusing the last run's audio
+        return lambda: make_saver(tempfile.mkdtemp(dir=work_dir)).save_game(games_dir, "bench", root, incremental=False)
+    if case == "load_graph":
+        zip_path = os.path.join(work_dir, "bench.noui")
+        write_graph_archive(saver, root, zip_path, work_dir)
+
+        def load():
+            # a new extraction cache every run, so every load extracts the archive like a first launch
+            cache_dir = tempfile.mkdtemp(dir=work_dir)
+            try:
+                loader = GameLoader(ExtractionCache(cache_dir))
+                _, game_folder = loader.load_graph(zip_path)
+                loader.release(game_folder)
+            finally:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+        return load
+    if case == "analyze":
+        return lambda: analyze_graph(root)
+    if case == "play":
+        return lambda: play(root)
+    raise ValueError(f"Unknown case {case!r}")
+
+
+def measure(function: Callable[[], None], repeat: int) -> tuple[float, int]:
+    """
+    :return: best time in seconds, and the peak memory traced during one more run, in bytes
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak - baseline
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(shapes: list[str], sizes: list[int], cases: list[str], repeat: int, max_save_game_nodes: int) -> dict:
+    results = {}
+    print(f"{'case':>11} {'shape':>7} {'nodes':>8} {'time (ms)':>11} {'peak (MiB)':>11}")
+    for shape in shapes:
+        for size in sizes:
+            root = build_graph(shape, size)
+            for case in cases:
+                if case == "save_game" and size > max_save_game_nodes:
+                    continue
+                work_dir = tempfile.mkdtemp(prefix="noui-bench-")
+                try:
+                    seconds, peak = measure(prepare_case(case, root, work_dir), repeat)
+                finally:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+                results[f"{case}/{shape}/{size}"] = {"seconds": seconds, "peak_bytes": peak}
+                print(f"{case:>11} {shape:>7} {size:>8} {seconds * 1000:>11.1f} {peak / 1024 ** 2:>11.1f}")
+    return {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    :return: one line per case that got worse than the baseline by more than tolerance
+    """
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline.get('date', 'unknown date')}):")
+    print(f"{'case':>30} {'time':>8} {'memory':>8}")
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        time_ratio = result["seconds"] / previous["seconds"] if previous["seconds"] else 1.0
+        memory_ratio = result["peak_bytes"] / previous["peak_bytes"] if previous["peak_bytes"] else 1.0
+        print(f"{name:>30} {time_ratio:>7.2f}x {memory_ratio:>7.2f}x")
+        if time_ratio > 1 + tolerance:
+            regressions.append(f"{name}: {time_ratio:.2f}x slower")
+        if memory_ratio > 1 + tolerance:
+            regressions.append(f"{name}: {memory_ratio:.2f}x more memory")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000],
+                        help="node counts, e.g. 100 10000 1000000")
+    parser.add_argument("--shapes", nargs="+", choices=list(SHAPES), default=list(SHAPES))
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=CASES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-save-game-nodes", type=int, default=10000,
+                        help="save_game writes an audio file per node, so it is skipped for larger graphs")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a case counts as a "
+                                                                      "regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    current = run(args.shapes, args.sizes, args.cases, args.repeat, args.max_save_game_nodes)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(current, file, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(current, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:\n" + "\n".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
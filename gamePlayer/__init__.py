@@ -1 +1,3 @@
-from .gamePlayer import GamePlayer
\ No newline at end of file
+from .gamePlayer import GamePlayer
+from .gameSession import GameSession
+from .asyncEngine import AsyncGameEngine
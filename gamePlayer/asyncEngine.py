@@ -0,0 +1,275 @@
+"""
+Runs many GameSessions at once on one asyncio event loop, e.g. a room of kiosks or thousands of simulated players.
+The engine only drives the sessions; the narration and the gestures come from adapters, which get the session ID with
+every call so one adapter can serve many sessions (or route each session to its own kiosk):
+    SimulatedAudio, SimulatedPlayer     take time but do no I/O, for load tests
+    SoundDeviceAudio, RecogniserGestures    the speakers and camera of this machine, for one session
+"""
+
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import Hashable, Iterable, Optional
+
+from gesture import EnumGesture
+from graph import Node
+from . import config
+from .audioPrefetcher import AudioPrefetcher
+from .gameSession import GameSession, GestureDetected, NarrationEnded, SessionState, TimedOut
+
+
+class AudioAdapter:
+    """
+    Plays the narration of the sessions.
+    """
+
+    def prefetch(self, session_id: Hashable, audio_filenames: Iterable[Optional[str]]):
+        """
+        Called with the audio of the nodes a session can go to next, before its current node is narrated.
+        """
+
+    async def play(self, session_id: Hashable, node: Node):
+        """
+        Narrates a node and returns once the narration has ended. Cancelled when a gesture cuts the narration short
+        (barge-in), so the audio has to stop then.
+        """
+        raise NotImplementedError
+
+
+class GestureAdapter:
+    """
+    Recognises the gestures of the players.
+    """
+
+    async def get_gesture(self, session_id: Hashable, gestures: list[EnumGesture], ignore_for: float) -> EnumGesture:
+        """
+        Waits for the next gesture of a player. Cancelled when it is no longer needed (the engine times out the
+        choice itself); raising TimeoutError ends the session like the engine's timeout.
+        :param gestures: the gestures the session accepts
+        :param ignore_for: seconds during which gestures are not taken (the barge-in grace period)
+        """
+        raise NotImplementedError
+
+
+@dataclass
+class SessionResult:
+    session_id: Hashable
+    session: GameSession
+    # seconds the session ran for
+    duration: float
+    # the error that ended the session early, None if it finished normally
+    error: Optional[BaseException] = None
+
+
+class AsyncGameEngine:
+    """
+    Drives GameSessions with the given adapters, all sessions concurrently.
+    """
+
+    def __init__(self, audio: AudioAdapter, gestures: GestureAdapter, timeout: float = config.GESTURE_TIMEOUT,
+                 grace_period: float = config.BARGE_IN_GRACE_PERIOD, max_concurrent: Optional[int] = None):
+        """
+        :param timeout: seconds to wait for a gesture once the narration has ended
+        :param grace_period: with barge-in, seconds at the start of a node during which gestures are ignored
+        :param max_concurrent: sessions running at the same time at most (the others wait), None for no limit
+        """
+        self.audio = audio
+        self.gestures = gestures
+        self.timeout = timeout
+        self.grace_period = grace_period
+        self.max_concurrent = max_concurrent
+
+    async def run(self, sessions: dict[Hashable, GameSession]) -> dict[Hashable, SessionResult]:
+        """
+        Runs the sessions to the end. A session failing does not stop the others.
+        :param sessions: session ID -> session
+        :return: session ID -> result
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent) if self.max_concurrent else None
+
+        async def run_one(session_id: Hashable, session: GameSession) -> SessionResult:
+            if semaphore is not None:
+                async with semaphore:
+                    return await self._run_timed(session_id, session)
+            return await self._run_timed(session_id, session)
+
+        results = await asyncio.gather(*(run_one(session_id, session) for session_id, session in sessions.items()))
+        return {result.session_id: result for result in results}
+
+    async def _run_timed(self, session_id: Hashable, session: GameSession) -> SessionResult:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            await self.run_session(session_id, session)
+        except Exception as e:
+            print(f"Session {session_id} failed: {e}")
+            return SessionResult(session_id, session, loop.time() - start, e)
+        return SessionResult(session_id, session, loop.time() - start)
+
+    async def run_session(self, session_id: Hashable, session: GameSession) -> GameSession:
+        """
+        Runs one session to the end.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        while not session.finished:
+            if session.state == SessionState.NARRATING:
+                self.audio.prefetch(session_id, session.next_audio_filenames)
+                await self._narrate(session_id, session)
+                deadline = loop.time() + self.timeout
+            else:
+                await self._choose(session_id, session, deadline - loop.time())
+        return session
+
+    async def _narrate(self, session_id: Hashable, session: GameSession):
+        """
+        Plays the narration of the current node. With barge-in, listens at the same time and stops the narration as
+        soon as a gesture moves the session on.
+        """
+        node_id = session.node.get_id()
+        narration = asyncio.ensure_future(self.audio.play(session_id, session.node))
+        try:
+            if session.barge_in:
+                loop = asyncio.get_running_loop()
+                grace_end = loop.time() + self.grace_period
+                while not narration.done():
+                    listening = asyncio.ensure_future(self.gestures.get_gesture(
+                        session_id, session.allowed_gestures, max(0.0, grace_end - loop.time())))
+                    try:
+                        await asyncio.wait({narration, listening}, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        await _cancel(listening)
+                    if listening.cancelled():
+                        continue
+                    error = listening.exception()
+                    # a recognizer giving up during a long narration just listens again
+                    if isinstance(error, TimeoutError):
+                        continue
+                    if error is not None:
+                        raise error
+                    if session.handle(GestureDetected(node_id, listening.result())):
+                        return
+            await narration
+            session.handle(NarrationEnded(node_id))
+        finally:
+            await _cancel(narration)
+
+    async def _choose(self, session_id: Hashable, session: GameSession, timeout: float):
+        """
+        Waits for a gesture after the narration, for at most timeout seconds.
+        """
+        node_id = session.node.get_id()
+        try:
+            gesture = await asyncio.wait_for(
+                self.gestures.get_gesture(session_id, session.allowed_gestures, 0.0), max(0.0, timeout))
+        except TimeoutError:
+            session.handle(TimedOut(node_id))
+            return
+        session.handle(GestureDetected(node_id, gesture))
+
+
+async def _cancel(task: asyncio.Future):
+    """
+    Cancels a task and waits for it to finish, without raising its result.
+    """
+    if not task.done():
+        task.cancel()
+        await asyncio.wait({task})
+
+
+class SimulatedAudio(AudioAdapter):
+    """
+    Narration that takes time and does nothing else.
+    """
+
+    def __init__(self, seconds: float = 1.0):
+        """
+        :param seconds: length of every narration
+        """
+        self.seconds = seconds
+
+    async def play(self, session_id: Hashable, node: Node):
+        await asyncio.sleep(self.seconds)
+
+
+class SimulatedPlayer(GestureAdapter):
+    """
+    Players that choose a random way after a random reaction time, and only end the game where there is no way on
+    (or at random, with quit_probability).
+    """
+
+    def __init__(self, min_reaction: float = 0.5, max_reaction: float = 2.0, quit_probability: float = 0.0,
+                 seed: Optional[int] = None):
+        """
+        :param min_reaction: shortest seconds a player takes to make a gesture
+        :param max_reaction: longest seconds a player takes to make a gesture
+        :param quit_probability: chance of ending the game with Victory at any choice
+        """
+        self.min_reaction = min_reaction
+        self.max_reaction = max_reaction
+        self.quit_probability = quit_probability
+        self._random = random.Random(seed)
+
+    async def get_gesture(self, session_id: Hashable, gestures: list[EnumGesture], ignore_for: float) -> EnumGesture:
+        await asyncio.sleep(ignore_for + self._random.uniform(self.min_reaction, self.max_reaction))
+        ways_on = [gesture for gesture in gestures if gesture != EnumGesture.Victory]
+        if not ways_on or self._random.random() < self.quit_probability:
+            return EnumGesture.Victory
+        return self._random.choice(ways_on)
+
+
+class SoundDeviceAudio(AudioAdapter):
+    """
+    Plays the node audio on this machine's default sound device, as GamePlayer does. The device plays one stream at a
+    time, so this adapter serves a single session.
+    """
+
+    def __init__(self, prefetcher: AudioPrefetcher):
+        # imported here so the simulated adapters work on machines without PortAudio
+        import sounddevice
+        self._sd = sounddevice
+        self.prefetcher = prefetcher
+
+    def prefetch(self, session_id: Hashable, audio_filenames: Iterable[Optional[str]]):
+        self.prefetcher.prefetch(audio_filenames)
+
+    async def play(self, session_id: Hashable, node: Node):
+        if node.audio_filename is None:
+            return
+        try:
+            data, samplerate = await asyncio.to_thread(self.prefetcher.get, node.audio_filename)
+        except Exception as e:
+            print(f"Error playing audio file {node.audio_filename}: {e}")
+            return
+        self._sd.play(data, samplerate)
+        try:
+            await asyncio.sleep(len(data) / samplerate)
+        finally:
+            self._sd.stop()
+
+
+class RecogniserGestures(GestureAdapter):
+    """
+    Recognises the gestures of the player at this machine's camera, for a single session. Open a session of the
+    recogniser around the engine run, so the camera is not reopened at every node.
+    """
+
+    def __init__(self, recogniser):
+        """
+        :param recogniser: a myGestureRecognizer.VideoGestureRecogniser
+        """
+        self.recogniser = recogniser
+
+    async def get_gesture(self, session_id: Hashable, gestures: list[EnumGesture], ignore_for: float) -> EnumGesture:
+        recognition = asyncio.ensure_future(
+            asyncio.to_thread(self.recogniser.get_gesture, gestures, ignore_for=ignore_for))
+        try:
+            return await asyncio.shield(recognition)
+        except asyncio.CancelledError:
+            # the recognition thread must end before the next one starts on the same camera
+            while not recognition.done():
+                self.recogniser.cancel()
+                await asyncio.wait({recognition}, timeout=0.1)
+            raise
+        finally:
+            self.recogniser.pause()
@@ -0,0 +1,106 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Optional
+
+import numpy as np
+import soundfile as sf
+
+from . import config
+
+
+class AudioPrefetcher:
+    """
+    Decodes node audio in the background, so the next node can start playing as soon as the player has chosen it.
+    Decoded PCM buffers are kept in a least-recently-used cache bounded by size.
+    """
+
+    def __init__(self, game_path: str, max_bytes: int = config.AUDIO_PREFETCH_MAX_BYTES,
+                 workers: int = config.AUDIO_PREFETCH_WORKERS):
+        """
+        :param game_path: the extracted game folder (containing the audio folder)
+        :param max_bytes: maximum size of the decoded audio kept in memory
+        :param workers: number of threads decoding audio
+        """
+        self.game_path = game_path
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        # audio filename -> (samples, sample rate), most recently used last
+        self._buffers: OrderedDict[str, tuple[np.ndarray, int]] = OrderedDict()
+        self._size: int = 0
+        self._pending: dict[str, Future] = {}
+        # set by close(); decodes still running then finish without caching their result
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio-prefetch")
+
+    def __enter__(self) -> 'AudioPrefetcher':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Stops decoding and drops the cached audio. Decodes already running are not waited for, and their results are
+        not cached.
+        """
+        with self._lock:
+            self._closed = True
+            for future in self._pending.values():
+                future.cancel()
+            self._buffers.clear()
+            self._pending.clear()
+            self._size = 0
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def prefetch(self, audio_filenames: Iterable[Optional[str]]):
+        """
+        Starts decoding the given audio files in the background, unless they are cached or already being decoded.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            for audio_filename in audio_filenames:
+                if audio_filename is None or audio_filename in self._buffers or audio_filename in self._pending:
+                    continue
+                self._pending[audio_filename] = self._executor.submit(self._decode, audio_filename)
+
+    def get(self, audio_filename: str) -> tuple[np.ndarray, int]:
+        """
+        Gives the decoded audio of a file: straight from the cache if it was prefetched, after waiting for it if it is
+        still being decoded, or decoded now otherwise. Raises the decoding error if the file cannot be read.
+        :return: samples (float32, frames x channels) and sample rate
+        """
+        with self._lock:
+            if audio_filename in self._buffers:
+                self._buffers.move_to_end(audio_filename)
+                return self._buffers[audio_filename]
+            future = self._pending.get(audio_filename)
+
+        if future is not None:
+            return future.result()
+        return self._decode(audio_filename)
+
+    def _decode(self, audio_filename: str) -> tuple[np.ndarray, int]:
+        try:
+            data, sample_rate = sf.read(os.path.join(self.game_path, "audio", audio_filename), dtype="float32")
+        except Exception:
+            with self._lock:
+                self._pending.pop(audio_filename, None)
+            raise
+        self._store(audio_filename, data, sample_rate)
+        return data, sample_rate
+
+    def _store(self, audio_filename: str, data: np.ndarray, sample_rate: int):
+        with self._lock:
+            # cached and no longer pending in one step, so get() never misses it in between
+            self._pending.pop(audio_filename, None)
+            if self._closed or audio_filename in self._buffers or data.nbytes > self.max_bytes:
+                return
+            self._buffers[audio_filename] = (data, sample_rate)
+            self._size += data.nbytes
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._buffers.popitem(last=False)
+                self._size -= evicted.nbytes
@@ -0,0 +1,13 @@
+# decoded audio of upcoming nodes is kept in memory up to this size (least recently used is dropped first)
+AUDIO_PREFETCH_MAX_BYTES = 256 * 1024 ** 2
+# threads decoding the audio of the nodes the player can go to next
+AUDIO_PREFETCH_WORKERS = 2
+
+# listen for gestures while the narration plays: a valid gesture stops the narration and moves on straight away
+BARGE_IN = True
+# with barge-in, gestures in the first seconds of a node are ignored, so a hand still raised from the last choice is
+# not taken as the next one
+BARGE_IN_GRACE_PERIOD = 1.0
+
+# seconds the asyncio engine waits for a gesture once the narration has ended (like the recogniser's TIMEOUT_TIME)
+GESTURE_TIMEOUT = 30.0
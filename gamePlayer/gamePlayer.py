@@ -1,32 +1,58 @@
-from playsound3 import playsound
-import os
 import time
+from typing import Optional
 
 from graph import Node
 import myGestureRecognizer
 
 from gesture import EnumGesture
 import storageManager.game_load
+from . import config
+from .audioPrefetcher import AudioPrefetcher
+from .gameSession import GameSession, GestureDetected, NarrationEnded, TimedOut
+from tracing import span
 
 
 class GamePlayer:
     """
     Class to play the interactive story game.
     """
-    def __init__(self):
+    def __init__(self, barge_in: bool = config.BARGE_IN):
+        """
+        :param barge_in: recognise gestures while the narration plays, so the player can choose without waiting for it
+        to finish
+        """
+        self.barge_in: bool = barge_in
         self.game_loader: storageManager.game_load.GameLoader = storageManager.game_load.GameLoader()
 
-        self.recogniser: myGestureRecognizer.VideoGestureRecogniser = myGestureRecognizer.VideoGestureRecogniser()
+        # created on first use, so opening the player does not wait for mediapipe and cv2 to load
+        self._recogniser: Optional['myGestureRecognizer.VideoGestureRecogniser'] = None
+
+    @property
+    def recogniser(self) -> 'myGestureRecognizer.VideoGestureRecogniser':
+        if self._recogniser is None:
+            self._recogniser = myGestureRecognizer.VideoGestureRecogniser()
+        return self._recogniser
 
-    def _playAudio(self, game_path: str, audio_filename: str):
+    def _playAudio(self, prefetcher: AudioPrefetcher, audio_filename: str, wait: bool = True) -> float:
         """
-        Play the audio file.
+        Play the audio of a node. The audio is usually decoded already, since the prefetcher decodes the audio of the
+        possible next nodes while the current one plays. WAV, FLAC and Ogg are all played the same way.
+        :param wait: block until the audio has finished; otherwise it plays in the background until sd.stop()
+        :return: duration of the audio in seconds (0 if it could not be played)
         """
-        audio_full_path = os.path.join(game_path, "audio", audio_filename)
-        try:
-            playsound(audio_full_path)
-        except Exception as e:
-            print(f"Error playing audio file {audio_full_path}: {e}")
+        import sounddevice as sd
+        with span("play_audio", "player", audio=audio_filename, wait=wait) as play_span:
+            try:
+                with span("get_audio", "player"):
+                    data, samplerate = prefetcher.get(audio_filename)
+                sd.play(data, samplerate)
+                if wait:
+                    sd.wait()
+                play_span.set("duration", len(data) / samplerate)
+                return len(data) / samplerate
+            except Exception as e:
+                print(f"Error playing audio file {audio_filename}: {e}")
+                return 0.0
 
     def playGame(self, game_path: str):
         try:
@@ -35,30 +61,71 @@ class GamePlayer:
             print(f"Failed to load graph from file: {e}")
             return
 
-        self._startGameLoop(root_node, game_folder)
+        try:
+            # the recognizer and camera stay open for the whole game instead of being reopened on every node
+            with AudioPrefetcher(game_folder) as prefetcher, self.recogniser.session():
+                self._startGameLoop(root_node, prefetcher)
+        finally:
+            self.game_loader.release(game_folder)
 
-    def _startGameLoop(self, startNode: Node, game_folder: str):
+    def _startGameLoop(self, startNode: Node, prefetcher: AudioPrefetcher) -> GameSession:
         """
+        Plays a GameSession at the camera: the session decides where the game goes, this loop does the I/O.
         Throws TimeoutError if no gesture is detected within TIMEOUT_TIME seconds.
         """
-        curNode: Node = startNode
-        while True:
-            # Display current scene and available choices (explicit about handedness)
-            print("\n" + curNode.getText() + "\n")
+        session = GameSession(startNode, barge_in=self.barge_in)
+        while not session.finished:
+            curNode: Node = session.node
+            with span("turn", "player", node=curNode.get_id()) as turn_span:
+                # Display current scene and available choices (explicit about handedness)
+                print("\n" + curNode.getText() + "\n")
 
-            self._listOptions(curNode)
-            
-            # Play current scene audio
-            self._playAudio(game_folder, curNode.audio_filename)
+                self._listOptions(curNode)
 
-            # Ask recognizer for a decision (expects a tuple like ("ILoveYou", "Left"))
-            decision: EnumGesture = self.recogniser.get_gesture(curNode.get_possible_gestures())
-            if decision == EnumGesture.Victory:
-                break
+                # Decode the audio of every node the player can go to next while the current one plays
+                prefetcher.prefetch(session.next_audio_filenames)
 
-            curNode = curNode.getNode(decision)
+                try:
+                    if self.barge_in:
+                        decision: EnumGesture = self._playAndListen(prefetcher, curNode)
+                    else:
+                        # Play current scene audio
+                        self._playAudio(prefetcher, curNode.audio_filename)
+                        session.handle(NarrationEnded(curNode.get_id()))
 
-            time.sleep(2)
+                        # Ask recognizer for a decision (expects a tuple like ("ILoveYou", "Left"))
+                        decision: EnumGesture = self.recogniser.get_gesture(curNode.get_possible_gestures())
+                except TimeoutError:
+                    session.handle(TimedOut(curNode.get_id()))
+                    raise
+                session.handle(GestureDetected(curNode.get_id(), decision))
+                turn_span.set("gesture", decision.name)
+                if session.finished:
+                    break
+
+                # stop reading the camera until the next node asks for a gesture
+                self.recogniser.pause()
+
+                if not self.barge_in:
+                    time.sleep(2)
+        return session
+
+    def _playAndListen(self, prefetcher: AudioPrefetcher, curNode: Node) -> EnumGesture:
+        """
+        Play the node's narration and recognise gestures at the same time. A valid gesture stops the narration, so the
+        next node starts right away. The recognition timeout only starts counting once the narration would have ended.
+        """
+        import sounddevice as sd
+        from myGestureRecognizer.videoGestureRecogniser import TIMEOUT_TIME
+        duration = self._playAudio(prefetcher, curNode.audio_filename, wait=False)
+        try:
+            return self.recogniser.get_gesture(
+                curNode.get_possible_gestures(),
+                timeout=duration + TIMEOUT_TIME,
+                ignore_for=config.BARGE_IN_GRACE_PERIOD,
+            )
+        finally:
+            sd.stop()
 
     def _listOptions(self, curNode: Node):
         options = list(curNode.adjacencyList.items())
@@ -0,0 +1,139 @@
+"""
+The rules of playing a game, without any I/O: a GameSession only knows the current node, the gestures it accepts and
+the choices made so far, and moves on when it is told what happened (the narration ended, a gesture was seen, the
+player took too long). Playing the audio and recognising gestures is left to whoever drives the session: GamePlayer for
+one player at the camera, asyncEngine.AsyncGameEngine for many at once.
+"""
+
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional, Union
+
+from gesture import EnumGesture
+from graph import Node
+from . import config
+
+
+class SessionState(Enum):
+    # the narration of the current node is playing (with barge-in, gestures are already accepted)
+    NARRATING = "narrating"
+    # the narration has ended and the session waits for a gesture
+    CHOOSING = "choosing"
+    # the player ended the game with the Victory gesture
+    QUIT = "quit"
+    # no gesture was made in time
+    TIMED_OUT = "timed_out"
+
+
+FINISHED_STATES = {SessionState.QUIT, SessionState.TIMED_OUT}
+
+
+# Events. Each names the node it happened at, so a late event about a node the session already left (e.g. the end of a
+# narration that a gesture cut short) is ignored.
+
+@dataclass(frozen=True)
+class NarrationEnded:
+    node_id: int
+
+
+@dataclass(frozen=True)
+class GestureDetected:
+    node_id: int
+    gesture: EnumGesture
+
+
+@dataclass(frozen=True)
+class TimedOut:
+    node_id: int
+
+
+SessionEvent = Union[NarrationEnded, GestureDetected, TimedOut]
+
+
+@dataclass(frozen=True)
+class Choice:
+    """
+    One step of a session's history.
+    """
+    node_id: int
+    gesture: EnumGesture
+    # the node the gesture led to
+    next_node_id: int
+
+
+class GameSession:
+    """
+    State machine of one play-through of a game graph, driven by events through handle().
+    """
+
+    def __init__(self, root: Node, barge_in: bool = config.BARGE_IN):
+        """
+        :param root: the node the game starts at
+        :param barge_in: accept gestures while the narration is still playing
+        """
+        self.barge_in = barge_in
+        self.node: Node = root
+        self.state: SessionState = SessionState.NARRATING
+        self.history: list[Choice] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    @property
+    def listening(self) -> bool:
+        """
+        Whether gestures are accepted in the current state.
+        """
+        return self.state == SessionState.CHOOSING or (self.state == SessionState.NARRATING and self.barge_in)
+
+    @property
+    def allowed_gestures(self) -> list[EnumGesture]:
+        """
+        The gestures that lead somewhere from the current node, and Victory, which ends the game.
+        """
+        return self.node.get_possible_gestures() + [EnumGesture.Victory]
+
+    @property
+    def next_audio_filenames(self) -> list[Optional[str]]:
+        """
+        The audio of the nodes the player can go to next, to be decoded ahead of time.
+        """
+        return [node.audio_filename for node in self.node.adjacencyList.values()]
+
+    def handle(self, event: SessionEvent) -> bool:
+        """
+        Moves the session on after an event. Events about another node than the current one, gestures while not
+        listening and gestures that lead nowhere are ignored.
+        :return: whether the state or node changed
+        """
+        if self.finished:
+            raise ValueError(f"The session has already finished ({self.state.value})")
+        if event.node_id != self.node.get_id():
+            return False
+
+        if isinstance(event, NarrationEnded):
+            if self.state != SessionState.NARRATING:
+                return False
+            self.state = SessionState.CHOOSING
+            return True
+
+        if isinstance(event, TimedOut):
+            self.state = SessionState.TIMED_OUT
+            return True
+
+        if isinstance(event, GestureDetected):
+            if not self.listening:
+                return False
+            if event.gesture == EnumGesture.Victory:
+                self.state = SessionState.QUIT
+                return True
+            next_node = self.node.getNode(event.gesture)
+            if next_node is None:
+                return False
+            self.history.append(Choice(self.node.get_id(), event.gesture, next_node.get_id()))
+            self.node = next_node
+            self.state = SessionState.NARRATING
+            return True
+
+        raise TypeError(f"Unknown session event {event!r}")
@@ -1 +1,2 @@
-from .graph import Node
\ No newline at end of file
+from .graph import Node
+from .graph_store import GraphStore
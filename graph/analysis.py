@@ -0,0 +1,247 @@
+"""
+Checks a game graph for problems before it is saved (and its audio synthesized), in time linear in the size of the graph.
+
+Reported:
+    unreachable nodes       nodes of the graph that cannot be reached from the root
+    dead ends               reachable nodes without choices that are not a win
+    trapped components      reachable strongly connected components (cycles) that cannot be left and contain no win
+    doomed nodes            reachable nodes from which no win can be reached at all
+    win path                a shortest path from the root to a win node
+    branching               how many nodes have 0, 1, 2, ... choices, and the depth of the story
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from graph.graph import Node
+
+
+@dataclass
+class GraphReport:
+    """
+    Result of analyze_graph. Node IDs are the store IDs of the analysed graph.
+    """
+    node_count: int
+    reachable_count: int
+    unreachable: list[int] = field(default_factory=list)
+    dead_ends: list[int] = field(default_factory=list)
+    # every strongly connected component of the reachable graph, as lists of node IDs
+    components: list[list[int]] = field(default_factory=list)
+    trapped_components: list[list[int]] = field(default_factory=list)
+    doomed: list[int] = field(default_factory=list)
+    # node IDs from the root to the nearest win node, None if no win node is reachable
+    win_path: Optional[list[int]] = None
+    # number of choices -> number of reachable nodes with that many choices
+    branching: dict[int, int] = field(default_factory=dict)
+    max_depth: int = 0
+
+    @property
+    def is_playable(self) -> bool:
+        """
+        True if every reachable node can still lead to a win, so no player gets stuck.
+        """
+        return self.win_path is not None and not self.dead_ends and not self.trapped_components and not self.doomed
+
+    @property
+    def mean_branching(self) -> float:
+        """
+        Average number of choices of the reachable nodes that have any.
+        """
+        choice_nodes = sum(count for choices, count in self.branching.items() if choices)
+        choices = sum(choices * count for choices, count in self.branching.items())
+        return choices / choice_nodes if choice_nodes else 0.0
+
+    def errors(self, describe: Optional[Callable[[int], str]] = None) -> list[str]:
+        """
+        Problems that make the game unplayable.
+        :param describe: gives a readable name for a node ID (e.g. its text); defaults to the ID
+        :return: one message per problem
+        """
+        describe = describe or str
+        errors = []
+        if self.win_path is None:
+            errors.append("No win node can be reached from the start.")
+        for node_id in self.dead_ends:
+            errors.append(f"Dead end (no choices and not a win): {describe(node_id)}")
+        for component in self.trapped_components:
+            errors.append(f"Loop with no way out and no win: {', '.join(describe(node_id) for node_id in component)}")
+        trapped = {node_id for component in self.trapped_components for node_id in component}
+        dead_ends = set(self.dead_ends)
+        for node_id in self.doomed:
+            if node_id not in trapped and node_id not in dead_ends:
+                errors.append(f"No win can be reached from: {describe(node_id)}")
+        return errors
+
+    def warnings(self, describe: Optional[Callable[[int], str]] = None) -> list[str]:
+        """
+        Problems that do not stop the game from being played.
+        """
+        describe = describe or str
+        return [f"Unreachable from the start (will not be saved): {describe(node_id)}" for node_id in self.unreachable]
+
+    def summary(self) -> str:
+        branching = ", ".join(f"{count} with {choices}" for choices, count in sorted(self.branching.items()))
+        win_path = "none" if self.win_path is None else f"{len(self.win_path) - 1} choices"
+        return (f"{self.reachable_count}/{self.node_count} nodes reachable, shortest win: {win_path}, "
+                f"depth {self.max_depth}, choices per node: {branching} (mean {self.mean_branching:.2f})")
+
+    def __str__(self):
+        return "\n".join([self.summary(), *self.errors(), *self.warnings()])
+
+
+class GraphValidationError(Exception):
+    """
+    Raised when a graph that must be playable is not. The full report is kept in .report.
+    """
+
+    def __init__(self, report: GraphReport, describe: Optional[Callable[[int], str]] = None):
+        self.report = report
+        super().__init__("The game cannot be won from every node:\n" + "\n".join(report.errors(describe)))
+
+
+def analyze_graph(root: Node) -> GraphReport:
+    """
+    Analyses the graph of root. Every node of root's GraphStore counts as part of the graph, so nodes that are not
+    connected to the root are reported as unreachable.
+    """
+    store = root.store
+    successors = [[target_id for _, target_id in store.successors(node_id)] for node_id in range(len(store))]
+    is_win = [store.is_win(node_id) for node_id in range(len(store))]
+    return _analyze(list(range(len(store))), root.get_id(), successors, is_win)
+
+
+def _analyze(node_ids: list[int], root: int, successors: list[list[int]], is_win: list[bool]) -> GraphReport:
+    """
+    Runs every check over a graph given as adjacency lists of indices 0..n-1.
+    :param node_ids: the node ID of each index, used in the report
+    :param root: index of the root
+    :param successors: index -> indices of the nodes it leads to
+    :param is_win: index -> whether the node is a win
+    """
+    node_count = len(successors)
+
+    # BFS from the root: reachability, depth and a shortest path to the nearest win
+    depth = [-1] * node_count
+    parent = [-1] * node_count
+    depth[root] = 0
+    queue = deque([root])
+    nearest_win = -1
+    while queue:
+        index = queue.popleft()
+        if is_win[index] and nearest_win == -1:
+            nearest_win = index
+        for target in successors[index]:
+            if depth[target] == -1:
+                depth[target] = depth[index] + 1
+                parent[target] = index
+                queue.append(target)
+    reachable = [index for index in range(node_count) if depth[index] != -1]
+
+    win_path = None
+    if nearest_win != -1:
+        win_path = []
+        index = nearest_win
+        while index != -1:
+            win_path.append(node_ids[index])
+            index = parent[index]
+        win_path.reverse()
+
+    # reverse BFS from every win node: the nodes that can still reach a win
+    predecessors: list[list[int]] = [[] for _ in range(node_count)]
+    for index in reachable:
+        for target in successors[index]:
+            predecessors[target].append(index)
+    can_win = [False] * node_count
+    queue = deque(index for index in reachable if is_win[index])
+    for index in queue:
+        can_win[index] = True
+    while queue:
+        index = queue.popleft()
+        for source in predecessors[index]:
+            if not can_win[source]:
+                can_win[source] = True
+                queue.append(source)
+
+    components = _strongly_connected_components(root, successors)
+    component_of = [-1] * node_count
+    for number, component in enumerate(components):
+        for index in component:
+            component_of[index] = number
+
+    trapped_components = []
+    for number, component in enumerate(components):
+        is_cycle = len(component) > 1 or component[0] in successors[component[0]]
+        has_exit = any(component_of[target] != number for index in component for target in successors[index])
+        if is_cycle and not has_exit and not any(is_win[index] for index in component):
+            trapped_components.append([node_ids[index] for index in component])
+
+    branching: dict[int, int] = {}
+    for index in reachable:
+        choices = len(successors[index])
+        branching[choices] = branching.get(choices, 0) + 1
+
+    return GraphReport(
+        node_count=node_count,
+        reachable_count=len(reachable),
+        unreachable=[node_ids[index] for index in range(node_count) if depth[index] == -1],
+        dead_ends=[node_ids[index] for index in reachable if not successors[index] and not is_win[index]],
+        components=[[node_ids[index] for index in component] for component in components],
+        trapped_components=trapped_components,
+        doomed=[node_ids[index] for index in reachable if not can_win[index]],
+        win_path=win_path,
+        branching=branching,
+        max_depth=max((depth[index] for index in reachable), default=0),
+    )
+
+
+def _strongly_connected_components(root: int, successors: list[list[int]]) -> list[list[int]]:
+    """
+    Tarjan's algorithm over the nodes reachable from root, with an explicit stack so deep stories do not hit the
+    recursion limit.
+    :return: the components, each a list of node indices
+    """
+    node_count = len(successors)
+    order = [-1] * node_count
+    low_link = [0] * node_count
+    on_stack = [False] * node_count
+    component_stack: list[int] = []
+    components: list[list[int]] = []
+    counter = 0
+
+    # (node, index of the next successor to visit)
+    call_stack: list[tuple[int, int]] = [(root, 0)]
+    order[root] = low_link[root] = counter
+    counter += 1
+    component_stack.append(root)
+    on_stack[root] = True
+
+    while call_stack:
+        index, next_successor = call_stack[-1]
+        if next_successor < len(successors[index]):
+            call_stack[-1] = (index, next_successor + 1)
+            target = successors[index][next_successor]
+            if order[target] == -1:
+                order[target] = low_link[target] = counter
+                counter += 1
+                component_stack.append(target)
+                on_stack[target] = True
+                call_stack.append((target, 0))
+            elif on_stack[target]:
+                low_link[index] = min(low_link[index], order[target])
+            continue
+
+        call_stack.pop()
+        if call_stack:
+            caller = call_stack[-1][0]
+            low_link[caller] = min(low_link[caller], low_link[index])
+        if low_link[index] == order[index]:
+            component = []
+            while True:
+                member = component_stack.pop()
+                on_stack[member] = False
+                component.append(member)
+                if member == index:
+                    break
+            components.append(component)
+    return components
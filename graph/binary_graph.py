@@ -0,0 +1,371 @@
+"""
+Compact binary encoding of a game graph, designed to be memory-mapped and read node by node.
+
+Layout (all integers little-endian):
+    header          magic, version, node count (at least 1), gesture count, edge count, string count, root index
+    node records    node_count fixed-width records: node id, string indices of text / left option / right option /
+                    audio filename, flags (bit 0: is_win)
+    row offsets     node_count + 1 uint32: the edges of node i are edges[row_offsets[i]:row_offsets[i + 1]] (CSR)
+    edges           edge_count records: gesture index (int(EnumGesture.value)), target node index
+    string offsets  string_count + 1 uint32 byte offsets into the string data
+    string data     UTF-8 bytes of the strings
+"""
+
+import io
+import operator
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+from typing import BinaryIO, Callable, Optional, Union
+
+from gesture import EnumGesture
+from graph.graph import Node
+from graph.graph_store import GraphStore, GESTURE_COUNT, NO_NODE, STRING_FIELDS
+from graph.serial_graph import SerialGraph
+from graph.serial_node import SerialNode
+
+MAGIC = b"NOUIGRPH"
+VERSION = 1
+
+HEADER = struct.Struct("<8sIIIIII")
+NODE_RECORD = struct.Struct("<qIIIIB3x")
+OFFSET = struct.Struct("<I")
+EDGE_RECORD = struct.Struct("<II")
+# edge as spooled by BinaryGraphWriter before the target's node index is known: gesture index, target node id
+PENDING_EDGE_RECORD = struct.Struct("<Iq")
+
+# sections of a graph being written are kept in memory up to this size, then spilled to disk
+SPOOL_MAX_SIZE = 4 * 1024 * 1024
+# edges resolved per read while writing
+COPY_RECORDS = 64 * 1024
+
+IS_WIN_FLAG = 0x01
+
+# gestures that can label an edge, indexed by their enum value
+GESTURES: list[EnumGesture] = sorted(
+    (gesture for gesture in EnumGesture if gesture != EnumGesture.INVALID), key=lambda g: int(g.value)
+)
+
+
+def encode_binary_graph(serial_graph: SerialGraph) -> bytes:
+    """
+    Encodes a serialized graph into the binary format. The first node of the graph is the root, as in graph.json.
+    :param serial_graph: the graph to encode; raises ValueError if it has no nodes
+    :return: the encoded graph
+    """
+    with BinaryGraphWriter(next(iter(serial_graph.nodes), None)) as writer:
+        for serial_node in serial_graph.nodes.values():
+            writer.add(serial_node)
+        output = io.BytesIO()
+        writer.write_to(output)
+        return output.getvalue()
+
+
+class BinaryGraphWriter:
+    """
+    Streaming encoder for the binary format. Nodes are added one at a time and each section is spooled to a temporary
+    file as they come, so encoding takes the same memory for 10 nodes as for a million (apart from a map of node id to
+    node index, needed to resolve the edges).
+    """
+
+    def __init__(self, root_id: Optional[int] = None):
+        """
+        :param root_id: id of the root node, which may be added at any point; None for the first node added
+        """
+        self.root_id: Optional[int] = root_id
+        self._records = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self._row_offsets = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        # edges point at node ids until write_to, since their target may not have been added yet
+        self._pending_edges = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self._string_offsets = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self._string_data = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+        self._node_index: dict[int, int] = {}
+        self._edge_count = 0
+        self._string_count = 0
+        self._string_data_size = 0
+        self._row_offsets.write(OFFSET.pack(0))
+        self._string_offsets.write(OFFSET.pack(0))
+
+    def __enter__(self) -> 'BinaryGraphWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for section in (self._records, self._row_offsets, self._pending_edges, self._string_offsets,
+                        self._string_data):
+            section.close()
+
+    def _string_index(self, value: str) -> int:
+        data = value.encode("utf-8")
+        self._string_data.write(data)
+        self._string_data_size += len(data)
+        self._string_offsets.write(OFFSET.pack(self._string_data_size))
+        self._string_count += 1
+        return self._string_count - 1
+
+    def add(self, serial_node: SerialNode):
+        """
+        Appends a node. Its edges may point at nodes that are added later.
+        """
+        self._node_index[serial_node.id] = len(self._node_index)
+        self._records.write(NODE_RECORD.pack(
+            serial_node.id,
+            self._string_index(serial_node.text),
+            self._string_index(serial_node.left_option),
+            self._string_index(serial_node.right_option),
+            self._string_index(serial_node.audio_filename),
+            IS_WIN_FLAG if serial_node.is_win else 0,
+        ))
+        # edges keep the order of the adjacency list, so choices are listed the same way as with graph.json
+        for gesture, target_id in serial_node.adjacency_list.items():
+            self._pending_edges.write(PENDING_EDGE_RECORD.pack(int(gesture.value), target_id))
+            self._edge_count += 1
+        self._row_offsets.write(OFFSET.pack(self._edge_count))
+
+    def write_to(self, output: BinaryIO):
+        """
+        Writes the encoded graph of all nodes added so far.
+        :param output: binary file-like object to write to; raises ValueError if no node was added, or the root or
+        the target of an edge was never added
+        """
+        if not self._node_index:
+            raise ValueError("A binary graph needs at least one node")
+        if self.root_id is None:
+            root_index = 0
+        elif self.root_id in self._node_index:
+            root_index = self._node_index[self.root_id]
+        else:
+            raise ValueError(f"The root node {self.root_id} is not in the graph")
+
+        header = HEADER.pack(MAGIC, VERSION, len(self._node_index), len(GESTURES), self._edge_count,
+                             self._string_count, root_index)
+        output.write(header)
+        self._copy(self._records, output)
+        self._copy(self._row_offsets, output)
+
+        self._pending_edges.seek(0)
+        while chunk := self._pending_edges.read(PENDING_EDGE_RECORD.size * COPY_RECORDS):
+            edges = bytearray()
+            for gesture_index, target_id in PENDING_EDGE_RECORD.iter_unpack(chunk):
+                if target_id not in self._node_index:
+                    raise ValueError(f"Edge to node {target_id}, which is not in the graph")
+                edges += EDGE_RECORD.pack(gesture_index, self._node_index[target_id])
+            output.write(edges)
+
+        self._copy(self._string_offsets, output)
+        self._copy(self._string_data, output)
+
+    @staticmethod
+    def _copy(section: BinaryIO, output: BinaryIO):
+        section.seek(0)
+        shutil.copyfileobj(section, output)
+
+
+class BinaryGraph:
+    """
+    Reader for the binary graph format over any buffer (bytes, mmap, memoryview). Nothing is decoded up front: node
+    records, edges and strings are read from the buffer when a node is asked for, so opening a memory-mapped graph
+    costs the same for 10 nodes as for a million.
+    """
+
+    def __init__(self, buffer: Union[bytes, bytearray, memoryview],
+                 check_range: Optional[Callable[[int, int], None]] = None):
+        """
+        :param buffer: the encoded graph; raises ValueError if it is not a valid binary graph
+        :param check_range: called with (start, end) before buffer[start:end] is read, e.g. to verify its signature;
+        raises ValueError to reject the data
+        """
+        self._buffer = memoryview(buffer)
+        self._check_range = check_range
+        try:
+            if len(self._buffer) < HEADER.size:
+                raise ValueError("Buffer too small for a binary graph")
+            self._read(0, HEADER.size)
+            magic, version, self.node_count, gesture_count, self.edge_count, self.string_count, self.root_index = \
+                HEADER.unpack_from(self._buffer, 0)
+            if magic != MAGIC:
+                raise ValueError("Not a binary graph")
+            if version != VERSION:
+                raise ValueError(f"Unsupported binary graph version {version}")
+            if gesture_count != len(GESTURES):
+                raise ValueError(f"Binary graph was written for {gesture_count} gestures, expected {len(GESTURES)}")
+
+            self._nodes_start = HEADER.size
+            self._rows_start = self._nodes_start + self.node_count * NODE_RECORD.size
+            self._edges_start = self._rows_start + (self.node_count + 1) * OFFSET.size
+            self._string_offsets_start = self._edges_start + self.edge_count * EDGE_RECORD.size
+            self._string_data_start = self._string_offsets_start + (self.string_count + 1) * OFFSET.size
+            if self.node_count == 0:
+                raise ValueError("Binary graph has no nodes")
+            if self._string_data_start > len(self._buffer) or self.root_index >= self.node_count:
+                raise ValueError("Truncated or corrupt binary graph")
+        except BaseException:
+            # the buffer may be an mmap, which cannot be closed while this view of it exists
+            self._buffer.release()
+            raise
+
+        # node id -> node index, only built if a node is looked up by id
+        self._index_by_id: Optional[dict[int, int]] = None
+
+    def __len__(self) -> int:
+        return self.node_count
+
+    def release(self):
+        """
+        Releases the view on the underlying buffer (needed before closing an mmap it was created from).
+        """
+        self._buffer.release()
+
+    def _read(self, start: int, end: int):
+        """
+        Marks buffer[start:end] as about to be read.
+        """
+        if self._check_range is not None and start < end:
+            self._check_range(start, end)
+
+    def _check_index(self, index: int, count: int):
+        if not 0 <= index < count:
+            raise ValueError("Corrupt binary graph: index out of range")
+
+    def _string(self, string_index: int) -> str:
+        self._check_index(string_index, self.string_count)
+        offset_start = self._string_offsets_start + string_index * OFFSET.size
+        self._read(offset_start, offset_start + 2 * OFFSET.size)
+        start, = OFFSET.unpack_from(self._buffer, self._string_offsets_start + string_index * OFFSET.size)
+        end, = OFFSET.unpack_from(self._buffer, self._string_offsets_start + (string_index + 1) * OFFSET.size)
+        data_start = self._string_data_start + start
+        data_end = self._string_data_start + end
+        if not start <= end or data_end > len(self._buffer):
+            raise ValueError("Corrupt binary graph: string out of range")
+        self._read(data_start, data_end)
+        return str(self._buffer[data_start:data_end], "utf-8")
+
+    def _record(self, index: int) -> tuple[int, int, int, int, int, int]:
+        self._check_index(index, self.node_count)
+        record_start = self._nodes_start + index * NODE_RECORD.size
+        self._read(record_start, record_start + NODE_RECORD.size)
+        return NODE_RECORD.unpack_from(self._buffer, record_start)
+
+    def node_id(self, index: int) -> int:
+        return self._record(index)[0]
+
+    def index_of(self, node_id: int) -> int:
+        """
+        Gives the index of the node with the given id (raises KeyError if there is none).
+        """
+        if self._index_by_id is None:
+            self._read(self._nodes_start, self._rows_start)
+            self._index_by_id = {
+                NODE_RECORD.unpack_from(self._buffer, self._nodes_start + index * NODE_RECORD.size)[0]: index
+                for index in range(self.node_count)
+            }
+        return self._index_by_id[node_id]
+
+    def edges(self, index: int) -> list[tuple[EnumGesture, int]]:
+        """
+        Gives the outgoing edges of a node as (gesture, target node index) pairs.
+        """
+        self._check_index(index, self.node_count)
+        row_start = self._rows_start + index * OFFSET.size
+        self._read(row_start, row_start + 2 * OFFSET.size)
+        start, = OFFSET.unpack_from(self._buffer, row_start)
+        end, = OFFSET.unpack_from(self._buffer, row_start + OFFSET.size)
+        if not start <= end <= self.edge_count:
+            raise ValueError("Corrupt binary graph: edge row out of range")
+
+        self._read(self._edges_start + start * EDGE_RECORD.size, self._edges_start + end * EDGE_RECORD.size)
+        edges = []
+        for edge in range(start, end):
+            gesture_index, target = EDGE_RECORD.unpack_from(self._buffer, self._edges_start + edge * EDGE_RECORD.size)
+            self._check_index(gesture_index, len(GESTURES))
+            self._check_index(target, self.node_count)
+            edges.append((GESTURES[gesture_index], target))
+        return edges
+
+    def serial_node(self, index: int) -> SerialNode:
+        """
+        Decodes a single node.
+        :param index: index of the node (0 <= index < len(self))
+        """
+        node_id, text, left_option, right_option, audio_filename, flags = self._record(index)
+        return SerialNode(
+            id=node_id,
+            text=self._string(text),
+            left_option=self._string(left_option),
+            right_option=self._string(right_option),
+            audio_filename=self._string(audio_filename),
+            adjacency_list={gesture: self.node_id(target) for gesture, target in self.edges(index)},
+            is_win=bool(flags & IS_WIN_FLAG),
+        )
+
+    def _array(self, typecode: str, start: int, end: int) -> array:
+        """
+        Copies buffer[start:end] into an array of little-endian integers.
+        """
+        values = array(typecode)
+        values.frombytes(self._buffer[start:end])
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def to_store(self) -> GraphStore:
+        """
+        Builds a GraphStore holding the whole graph. Node indices become the store's node IDs.
+        The sections are decoded in bulk into the store's arrays, and the whole buffer is verified once up front
+        instead of on every read.
+        """
+        self._read(0, len(self._buffer))
+        node_count = self.node_count
+
+        # records as NODE_RECORD.size // 4 uint32 columns: id (2 columns), the 4 string indices, then the flags byte
+        record_columns = NODE_RECORD.size // 4
+        records = self._array("I", self._nodes_start, self._rows_start)
+        string_offsets = self._array("I", self._string_offsets_start, self._string_data_start)
+        if string_offsets[0] != 0 or not all(map(operator.le, string_offsets, string_offsets[1:])) \
+                or self._string_data_start + string_offsets[-1] > len(self._buffer):
+            raise ValueError("Corrupt binary graph: string out of range")
+
+        # the store's string 0 is the empty string, so every string index moves up by one
+        node_strings = array("I", bytes(4 * STRING_FIELDS * node_count))
+        for field in range(STRING_FIELDS):
+            column = records[2 + field::record_columns]
+            if column and max(column) >= self.string_count:
+                raise ValueError("Corrupt binary graph: index out of range")
+            node_strings[field::STRING_FIELDS] = array("I", map((1).__add__, column))
+        flags_offset = struct.calcsize("<qIIII")
+        flags = bytearray(self._buffer[self._nodes_start + flags_offset:self._rows_start:NODE_RECORD.size])
+
+        rows = self._array("I", self._rows_start, self._edges_start)
+        edges = self._array("I", self._edges_start, self._string_offsets_start)
+        gestures, targets = edges[0::2], edges[1::2]
+        if rows[0] != 0 or rows[-1] != self.edge_count or not all(map(operator.le, rows, rows[1:])):
+            raise ValueError("Corrupt binary graph: edge row out of range")
+        if edges and (max(gestures) >= len(GESTURES) or max(targets) >= node_count):
+            raise ValueError("Corrupt binary graph: index out of range")
+        # gesture indices are the adjacency slots, both being the gestures' enum values
+        adjacency = array("q", [NO_NODE]) * (node_count * GESTURE_COUNT)
+        for index in range(node_count):
+            slots = index * GESTURE_COUNT
+            for edge in range(rows[index], rows[index + 1]):
+                adjacency[slots + gestures[edge]] = targets[edge]
+
+        string_data_end = self._string_data_start + string_offsets[-1]
+        return GraphStore.from_arrays(
+            bytearray(self._buffer[self._string_data_start:string_data_end]),
+            array("Q", [0]) + array("Q", string_offsets),
+            node_strings,
+            flags,
+            adjacency,
+        )
+
+    def to_nodes(self) -> Node:
+        """
+        Builds the whole connected Node graph.
+        :return: the root node
+        """
+        return Node.view(self.to_store(), self.root_index)
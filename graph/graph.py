@@ -1,35 +1,122 @@
-from gesture import EnumGesture
+from types import MappingProxyType
+from typing import Mapping, Optional
 
+from gesture import EnumGesture
+from graph.graph_store import GraphStore, NO_NODE, TEXT, LEFT_OPTION, RIGHT_OPTION, AUDIO_FILENAME
 
 class Node:
-    def __init__(self, text: str, left_option: str = "", right_option: str = ""):
+    """
+    A node of the game graph. Nodes are views over a GraphStore, which holds the data of all nodes of a graph; two views
+    of the same node compare equal. The ID of a node is its dense index in the store.
+    Connecting nodes of two different stores merges the smaller store into the larger one; views of the moved nodes
+    follow them to their new store and ID.
+    """
+    __slots__ = ("_store", "_id")
+
+    def __init__(self, text: str, left_option: str = "", right_option: str = "", store: Optional[GraphStore] = None):
         """
         :param text: the narrative text describing the current node (e.g., "You stand before an old manor. The gate is locked.")
         :param left_option: the text describing the left option (e.g., "Enter the shed and search")
         :param right_option: the text describing the right option (e.g., "Follow a winding path that leads back toward the gate")
+        :param store: the store of the graph the node belongs to. Without one, the node gets a new store of its own,
+        which is merged into the store of the first node it is connected with
+        """
+        self._store: GraphStore = store if store is not None else GraphStore()
+        self._id: int = self._store.add_node(text, left_option, right_option)
+
+    @classmethod
+    def view(cls, store: GraphStore, node_id: int) -> 'Node':
+        """
+        Gives a view of a node already in the store.
+        """
+        node = cls.__new__(cls)
+        node._store = store
+        node._id = node_id
+        return node
+
+    def _follow_merges(self):
+        while self._store.merged_into is not None:
+            self._store, offset = self._store.merged_into
+            self._id += offset
+
+    @property
+    def store(self) -> GraphStore:
+        self._follow_merges()
+        return self._store
+
+    @property
+    def id(self) -> int:
+        self._follow_merges()
+        return self._id
+
+    @property
+    def left_option(self) -> str:
+        return self.store.get_field(self.id, LEFT_OPTION)
+
+    @left_option.setter
+    def left_option(self, value: str):
+        self.store.set_field(self.id, LEFT_OPTION, value)
+
+    @property
+    def right_option(self) -> str:
+        return self.store.get_field(self.id, RIGHT_OPTION)
+
+    @right_option.setter
+    def right_option(self, value: str):
+        self.store.set_field(self.id, RIGHT_OPTION, value)
+
+    @property
+    def audio_filename(self) -> Optional[str]:
+        return self.store.get_field(self.id, AUDIO_FILENAME)
+
+    @audio_filename.setter
+    def audio_filename(self, value: Optional[str]):
+        self.store.set_field(self.id, AUDIO_FILENAME, value)
+
+    @property
+    def is_win(self) -> bool:
+        return self.store.is_win(self.id)
+
+    @is_win.setter
+    def is_win(self, value: bool):
+        self.store.set_win(self.id, value)
+
+    @property
+    def adjacencyList(self) -> Mapping[EnumGesture, 'Node']:
+        """
+        The connections of the node, as a read-only mapping taken on every access; use addNode to change them.
         """
-        self.id: int = id(self)
-        self._text = text
-        self.left_option = left_option
-        self.right_option = right_option
-        self.audio_filename = None
-        self.adjacencyList: dict[EnumGesture, Node] = {}
-        self.is_win: bool = False
+        return MappingProxyType({gesture: Node.view(self.store, target_id)
+                                 for gesture, target_id in self.store.successors(self.id)})
 
     def getText(self):
-        return self._text
+        return self.store.get_field(self.id, TEXT)
 
     def get_id(self) -> int:
         return self.id
 
     def addNode(self, gesture: EnumGesture, newNode: 'Node'):
-        self.adjacencyList[gesture] = newNode
+        if newNode.store is not self.store:
+            # moving the smaller graph costs the least; both nodes follow the merge
+            if len(newNode.store) > len(self.store):
+                newNode.store.merge(self.store)
+            else:
+                self.store.merge(newNode.store)
+        self.store.set_successor(self.id, gesture, newNode.id)
 
-    def getNode(self, gesture: EnumGesture):
-        return self.adjacencyList.get(gesture)
+    def getNode(self, gesture: EnumGesture) -> Optional['Node']:
+        target_id = self.store.successor(self.id, gesture)
+        return None if target_id == NO_NODE else Node.view(self.store, target_id)
 
     def get_possible_gestures(self) -> list[EnumGesture]:
-        return [gesture for gesture, node in self.adjacencyList.items() if node is not None]
+        return [gesture for gesture, _ in self.store.successors(self.id)]
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Node) and other.store is self.store and other.id == self.id
+
+    def __hash__(self) -> int:
+        # changes when the node's store is merged into another, like its ID
+        return hash((id(self.store), self.id))
 
     def __str__(self):
-        return f"{self._text}, adjacent to {[node._text for node in self.adjacencyList.values()]}"
+        return f"{self.getText()}, adjacent to {[node.getText() for node in self.adjacencyList.values()]}"
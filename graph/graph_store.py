@@ -0,0 +1,201 @@
+"""
+Compact, array-backed storage for a game graph.
+
+Nodes are identified by dense integer IDs (0, 1, 2, ... in the order they are added) and have no per-node Python object:
+    strings     one UTF-8 pool with array offsets; every node points at its text, options and audio filename by index
+    flags       one byte per node (is_win)
+    adjacency   a fixed-width table with a slot per gesture: adjacency[node_id * GESTURE_COUNT + int(gesture.value)]
+                holds the target node ID, or NO_NODE
+"""
+
+from array import array
+from typing import Optional
+
+from gesture import EnumGesture
+
+NO_NODE = -1
+# string index of a field that is not set (e.g. the audio filename of a node that was never saved)
+NO_STRING = 0xFFFFFFFF
+# the empty string is always string 0, so the many empty options cost nothing
+EMPTY_STRING = 0
+
+# string fields of a node, in the order of its slots in the string table
+TEXT, LEFT_OPTION, RIGHT_OPTION, AUDIO_FILENAME = range(4)
+STRING_FIELDS = 4
+
+# gestures that can label an edge, indexed by their enum value
+GESTURE_SLOTS: list[EnumGesture] = sorted(
+    (gesture for gesture in EnumGesture if gesture != EnumGesture.INVALID), key=lambda g: int(g.value)
+)
+GESTURE_COUNT = len(GESTURE_SLOTS)
+
+
+def gesture_slot(gesture: EnumGesture) -> int:
+    """
+    Gives the adjacency slot of a gesture (raises ValueError for EnumGesture.INVALID).
+    """
+    if gesture == EnumGesture.INVALID:
+        raise ValueError("EnumGesture.INVALID cannot label an edge")
+    return int(gesture.value)
+
+
+class GraphStore:
+    """
+    Holds all nodes of a graph in a handful of flat arrays. graph.Node is a thin view over a store, so code written
+    against nodes keeps working while the data itself costs a few dozen bytes per node.
+    Strings are never overwritten in place: changing a field appends the new value to the pool.
+    """
+    __slots__ = ("_string_data", "_string_offsets", "_node_strings", "_flags", "_adjacency", "merged_into")
+
+    IS_WIN_FLAG = 0x01
+
+    def __init__(self):
+        self._string_data = bytearray()
+        # string i is _string_data[_string_offsets[i]:_string_offsets[i + 1]]; string 0 is the empty string
+        self._string_offsets = array("Q", [0, 0])
+        self._node_strings = array("I")
+        self._flags = bytearray()
+        self._adjacency = array("q")
+        # (store, node ID offset) once the nodes of this store were moved into another one by merge()
+        self.merged_into: Optional[tuple['GraphStore', int]] = None
+
+    @classmethod
+    def from_arrays(cls, string_data: bytearray, string_offsets: array, node_strings: array, flags: bytearray,
+                    adjacency: array) -> 'GraphStore':
+        """
+        Builds a store around arrays already in its layout (e.g. decoded in bulk from a binary graph), without copying
+        them. The arrays are not validated.
+        :param string_data: UTF-8 bytes of all strings
+        :param string_offsets: array("Q") of string offsets; string 0 must be the empty string
+        :param node_strings: array("I") of STRING_FIELDS string indices per node
+        :param flags: one byte of flags per node
+        :param adjacency: array("q") of GESTURE_COUNT target node IDs (or NO_NODE) per node
+        """
+        store = cls.__new__(cls)
+        store._string_data = string_data
+        store._string_offsets = string_offsets
+        store._node_strings = node_strings
+        store._flags = flags
+        store._adjacency = adjacency
+        store.merged_into = None
+        return store
+
+    def merge(self, other: 'GraphStore') -> int:
+        """
+        Moves all nodes of other into this store, keeping their fields and connections. Node i of other becomes node
+        i + offset of this store, and other is left empty with merged_into pointing here, so views of its nodes can
+        follow them (see graph.Node).
+        :return: the node ID offset of the moved nodes
+        """
+        if other is self:
+            raise ValueError("A graph store cannot be merged into itself")
+        node_offset = len(self)
+        # strings 1, 2, ... of other are appended after the strings of this store (string 0 is the empty one in both)
+        string_offset = len(self._string_offsets) - 2
+        data_size = len(self._string_data)
+        self._string_data += other._string_data
+        self._string_offsets.extend(offset + data_size for offset in other._string_offsets[2:])
+        self._node_strings.extend(
+            index if index in (NO_STRING, EMPTY_STRING) else index + string_offset for index in other._node_strings
+        )
+        self._flags += other._flags
+        self._adjacency.extend(
+            target_id if target_id == NO_NODE else target_id + node_offset for target_id in other._adjacency
+        )
+
+        other._string_data = bytearray()
+        other._string_offsets = array("Q", [0, 0])
+        other._node_strings = array("I")
+        other._flags = bytearray()
+        other._adjacency = array("q")
+        other.merged_into = (self, node_offset)
+        return node_offset
+
+    def __len__(self) -> int:
+        return len(self._flags)
+
+    def _add_string(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        if not value:
+            return EMPTY_STRING
+        self._string_data += value.encode("utf-8")
+        self._string_offsets.append(len(self._string_data))
+        return len(self._string_offsets) - 2
+
+    def _string(self, string_index: int) -> Optional[str]:
+        if string_index == NO_STRING:
+            return None
+        return self._string_data[self._string_offsets[string_index]:self._string_offsets[string_index + 1]] \
+            .decode("utf-8")
+
+    def _check_node(self, node_id: int):
+        if not 0 <= node_id < len(self):
+            raise IndexError(f"No node {node_id} in the graph store")
+
+    def add_node(self, text: str, left_option: str = "", right_option: str = "",
+                 audio_filename: Optional[str] = None, is_win: bool = False) -> int:
+        """
+        Adds an unconnected node.
+        :return: the ID of the new node
+        """
+        self._node_strings.extend((
+            self._add_string(text),
+            self._add_string(left_option),
+            self._add_string(right_option),
+            self._add_string(audio_filename),
+        ))
+        self._flags.append(self.IS_WIN_FLAG if is_win else 0)
+        self._adjacency.extend([NO_NODE] * GESTURE_COUNT)
+        return len(self) - 1
+
+    def get_field(self, node_id: int, field: int) -> Optional[str]:
+        """
+        Reads a string field of a node.
+        :param field: one of TEXT, LEFT_OPTION, RIGHT_OPTION, AUDIO_FILENAME
+        """
+        self._check_node(node_id)
+        return self._string(self._node_strings[node_id * STRING_FIELDS + field])
+
+    def set_field(self, node_id: int, field: int, value: Optional[str]):
+        """
+        Sets a string field of a node.
+        :param field: one of TEXT, LEFT_OPTION, RIGHT_OPTION, AUDIO_FILENAME
+        """
+        self._check_node(node_id)
+        self._node_strings[node_id * STRING_FIELDS + field] = self._add_string(value)
+
+    def is_win(self, node_id: int) -> bool:
+        self._check_node(node_id)
+        return bool(self._flags[node_id] & self.IS_WIN_FLAG)
+
+    def set_win(self, node_id: int, is_win: bool):
+        self._check_node(node_id)
+        self._flags[node_id] = self.IS_WIN_FLAG if is_win else 0
+
+    def successor(self, node_id: int, gesture: EnumGesture) -> int:
+        """
+        Gives the node reached from node_id with the gesture, or NO_NODE if the gesture leads nowhere.
+        """
+        self._check_node(node_id)
+        if gesture == EnumGesture.INVALID:
+            return NO_NODE
+        return self._adjacency[node_id * GESTURE_COUNT + gesture_slot(gesture)]
+
+    def set_successor(self, node_id: int, gesture: EnumGesture, target_id: int):
+        """
+        Connects node_id to target_id with the gesture (NO_NODE removes the connection).
+        """
+        self._check_node(node_id)
+        if target_id != NO_NODE:
+            self._check_node(target_id)
+        self._adjacency[node_id * GESTURE_COUNT + gesture_slot(gesture)] = target_id
+
+    def successors(self, node_id: int) -> list[tuple[EnumGesture, int]]:
+        """
+        Gives the outgoing connections of a node as (gesture, target node ID) pairs, in gesture order.
+        """
+        self._check_node(node_id)
+        start = node_id * GESTURE_COUNT
+        targets = self._adjacency[start:start + GESTURE_COUNT]
+        return [(gesture, target_id) for gesture, target_id in zip(GESTURE_SLOTS, targets) if target_id != NO_NODE]
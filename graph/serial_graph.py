@@ -2,6 +2,13 @@ from pydantic import BaseModel
 
 from graph.serial_node import SerialNode
 
+# version of the graph.json layout written by this code
+SCHEMA_VERSION = 2
+
 
 class SerialGraph(BaseModel):
+    # graphs saved before the schema was versioned have no version and count as 1
+    schema_version: int = 1
     nodes: dict[int, SerialNode]
+    # codec the node audio was written with ("wav" for games saved before codecs were configurable)
+    audio_codec: str = "wav"
@@ -5,12 +5,15 @@ from typing import Optional
 from PySide6 import QtWidgets, QtCore, QtGui
 
 from gesture import EnumGesture
-from graph import Node
-from storageManager import GameLoader, GameSaver
+from graph import GraphStore, Node
+from graph.analysis import GraphReport, analyze_graph
+from storageManager import GameLoader, GameSaver, GameArchive
+from storageManager import config as storage_config
 from . import config
 from .zoomableGraphicsView import ZoomableGraphicsView
 from .nodeWidget import NodeWidget
 from .optionSide import OptionSide
+from .saveWorker import SaveWorker
 
 
 class GameCreationPage(QtWidgets.QWidget):
@@ -24,6 +27,13 @@ class GameCreationPage(QtWidgets.QWidget):
 
         self.game_loader: GameLoader = GameLoader()
         self.game_saver: GameSaver = GameSaver()
+        # archive the game was opened from (audio stays inside it until something asks for it)
+        self.game_archive: Optional[GameArchive] = None
+
+        # background save in progress, if any
+        self._save_thread: Optional[QtCore.QThread] = None
+        self._save_worker: Optional[SaveWorker] = None
+        self._save_progress: Optional[QtWidgets.QProgressDialog] = None
 
         # list of all nodes in the game
         self.nodes: list[NodeWidget] = []
@@ -72,6 +82,10 @@ class GameCreationPage(QtWidgets.QWidget):
         self.view.setMinimumHeight(config.CANVAS_HEIGHT)
         self.layout.addWidget(self.view)
 
+        self.check_game_button = QtWidgets.QPushButton("Check Game")
+        self.check_game_button.clicked.connect(self.check_game)
+        self.layout.addWidget(self.check_game_button)
+
         self.save_game_button = QtWidgets.QPushButton("Save Game")
         self.save_game_button.clicked.connect(self.save_game)
         self.layout.addWidget(self.save_game_button)
@@ -167,6 +181,7 @@ class GameCreationPage(QtWidgets.QWidget):
         if not self.root_node:
             return None
         
+        store: GraphStore = GraphStore()
         widget_node: dict[NodeWidget, Node] = {}
         # 1. create backend nodes
         for node_widget in self.nodes:
@@ -174,7 +189,7 @@ class GameCreationPage(QtWidgets.QWidget):
             left_text = node_widget.left_option.text().strip()
             right_text = node_widget.right_option.text().strip()
             
-            game_graph_node = Node(main_text, left_text, right_text)
+            game_graph_node = Node(main_text, left_text, right_text, store)
             game_graph_node.is_win = node_widget.win_button.isChecked()
             widget_node[node_widget] = game_graph_node
 
@@ -193,11 +208,34 @@ class GameCreationPage(QtWidgets.QWidget):
                 parent_node.addNode(EnumGesture.ILoveYou_Right, widget_node[right_child])
         return widget_node[self.root_node]
     
+    def check_game(self) -> None:
+        """
+        Check the story for dead ends, loops with no way out and unreachable nodes, and show what was found.
+        """
+        root = self._build_game_graph()
+        if not root:
+            return
+
+        def describe(node_id: int) -> str:
+            return f'"{Node.view(root.store, node_id).getText()[:40] or "(empty node)"}"'
+
+        report: GraphReport = analyze_graph(root)
+        details = "\n".join([report.summary(), "", *report.errors(describe), *report.warnings(describe)])
+        if report.is_playable:
+            QtWidgets.QMessageBox.information(self, "Check Game", "The game can be won from every node.\n\n" + details)
+        else:
+            QtWidgets.QMessageBox.warning(self, "Check Game", "The game has problems:\n\n" + details)
+
     def save_title(self) -> None:
         self.game_title = self.title_entry.text().strip()
         print(f"Title: {self.game_title}")
 
     def save_game(self) -> None:
+        """
+        Save the game on a background thread, so the canvas stays usable while the audio is generated.
+        """
+        if self._save_thread is not None:
+            return
         root = self._build_game_graph()
         if not root:
             return
@@ -205,31 +243,119 @@ class GameCreationPage(QtWidgets.QWidget):
         title = self.title_entry.text().strip() or "untitled"
         game_path = os.path.join(os.path.dirname(__file__), os.pardir, "saved_games")
 
-        progress = self._show_saving_popup()
+        self._save_thread = QtCore.QThread(self)
+        self._save_worker = SaveWorker(self.game_saver, game_path, title, root)
+        self._save_worker.moveToThread(self._save_thread)
+        self._save_thread.started.connect(self._save_worker.run)
+        self._save_thread.finished.connect(self._save_worker.deleteLater)
+        self._save_thread.finished.connect(self._save_thread.deleteLater)
 
-        self.game_saver.save_game(game_path, title, root)
-        progress.close()
-        QtWidgets.QMessageBox.information(self, "Success", f"Game saved to {game_path}/{title}")
-    
-    def _show_saving_popup(self):
-        progress = QtWidgets.QProgressDialog("Saving game...", None, 0, 0, self)
+        self._save_worker.progress.connect(self._on_save_progress)
+        self._save_worker.saved.connect(self._on_save_finished)
+        self._save_worker.failed.connect(self._on_save_failed)
+        self._save_worker.cancelled.connect(self._on_save_cancelled)
+
+        self._save_progress = self._show_saving_popup()
+        # cancel() only sets a threading.Event, so call it directly rather than queueing it behind the running save
+        self._save_progress.canceled.connect(self._save_worker.cancel, QtCore.Qt.DirectConnection)
+        self._save_progress.canceled.connect(self._on_save_cancel_requested)
+
+        self.save_game_button.setEnabled(False)
+        self._save_thread.start()
+
+    def _show_saving_popup(self) -> QtWidgets.QProgressDialog:
+        progress = QtWidgets.QProgressDialog("Saving game...", "Cancel", 0, 0, self)
         progress.setWindowTitle("Saving")
-        progress.setWindowModality(QtCore.Qt.WindowModal)
-        progress.setCancelButton(None)
+        # not modal, so the canvas can still be used while saving
+        progress.setWindowModality(QtCore.Qt.NonModal)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.setMinimumDuration(0)
         progress.show()
-        QtWidgets.QApplication.processEvents()
 
         return progress
 
+    def _on_save_cancel_requested(self) -> None:
+        if self._save_progress is None:
+            return
+        self._save_progress.setCancelButton(None)
+        if self.game_saver.workers > 1:
+            # the worker processes are stopped in the middle of their batch
+            self._save_progress.setLabelText("Cancelling...")
+        else:
+            self._save_progress.setLabelText(
+                f"Cancelling...\nThe narration being generated (up to {storage_config.TTS_BATCH_SIZE} nodes) is "
+                f"finished first.")
+
+    def _on_save_progress(self, completed: int, total: int, eta: float) -> None:
+        if self._save_progress is None or self._save_progress.wasCanceled():
+            return
+        self._save_progress.setMaximum(total)
+        self._save_progress.setValue(completed)
+        eta_text = "estimating time left..." if eta < 0 else f"about {self._format_duration(eta)} left"
+        self._save_progress.setLabelText(f"Generating audio: node {completed} of {total}\n{eta_text}")
+
+    @staticmethod
+    def _format_duration(seconds: float) -> str:
+        minutes, seconds = divmod(int(round(seconds)), 60)
+        return f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
+
+    def _on_save_finished(self, zip_path: str, audio_report: str, graph_warnings: list) -> None:
+        if not self._finish_save():
+            return
+        message = "\n\n".join(part for part in (f"Game saved to {zip_path}", audio_report, "\n".join(graph_warnings))
+                              if part)
+        if graph_warnings:
+            QtWidgets.QMessageBox.warning(self, "Saved with warnings", message)
+        else:
+            QtWidgets.QMessageBox.information(self, "Success", message)
+
+    def _on_save_failed(self, message: str) -> None:
+        if not self._finish_save():
+            return
+        QtWidgets.QMessageBox.critical(self, "Error", f"Failed to save game: {message}")
+
+    def _on_save_cancelled(self) -> None:
+        self._finish_save()
+
+    def _finish_save(self) -> bool:
+        """
+        Close the progress popup and shut down the save thread.
+        :return: False if there was no save to finish (the page was closed while saving)
+        """
+        if self._save_thread is None:
+            return False
+        if self._save_progress is not None:
+            self._save_progress.canceled.disconnect()
+            self._save_progress.close()
+            self._save_progress = None
+
+        self._save_thread.quit()
+        self._save_thread.wait()
+        self._save_worker = None
+        self._save_thread = None
+
+        self.save_game_button.setEnabled(True)
+        return True
+
+    def closeEvent(self, event: QtGui.QCloseEvent) -> None:
+        """
+        Cancel a save that is still running and wait for it to stop, so the save thread does not outlive the page.
+        """
+        if self._save_worker is not None:
+            self._save_worker.cancel()
+            self._finish_save()
+        super().closeEvent(event)
+
     def _load_game(self, game_path: str) -> None:
         """
         Load an existing game onto the creation page and populate the graph nodes.
         """
         print(f"load game from {game_path}")
         try:
-            root_node, game_folder = self.game_loader.load_graph(game_path)
+            root_node, self.game_archive = self.game_loader.load_graph_lazy(game_path)
 
-            game_name = os.path.basename(game_folder)
+            game_name = self.game_archive.game_name
             self.game_title = game_name
             self.title_entry.setText(game_name)
 
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from PySide6 import QtCore
+
+from graph import Node
+from storageManager import GameSaver, SaveCancelled
+from text2speech import SynthesisProgress
+
+
+class SaveWorker(QtCore.QObject):
+    """
+    Runs GameSaver.save_game off the UI thread. Move it to a QThread and connect the thread's started signal to run().
+    Progress, completion, failure and cancellation are reported through signals, which Qt delivers on the UI thread.
+    """
+    # completed nodes, total nodes, estimated seconds left (-1 while unknown)
+    progress = QtCore.Signal(int, int, float)
+    # path of the saved game zip, how much of the audio was synthesized or reused, and the graph's warnings
+    saved = QtCore.Signal(str, str, list)
+    # error message
+    failed = QtCore.Signal(str)
+    cancelled = QtCore.Signal()
+
+    def __init__(self, game_saver: GameSaver, path_to_save: str, game_name: str, root: Node) -> None:
+        super().__init__()
+        self.game_saver = game_saver
+        self.path_to_save = path_to_save
+        self.game_name = game_name
+        self.root = root
+
+        self._cancel_event = threading.Event()
+        self._start_time: float = 0.0
+        # nodes taken from a cache are instant, so they are left out of the ETA estimate
+        self._cached_nodes: int = 0
+
+    @QtCore.Slot()
+    def run(self) -> None:
+        self._start_time = time.monotonic()
+        try:
+            zip_path = self.game_saver.save_game(
+                self.path_to_save,
+                self.game_name,
+                self.root,
+                progress_callback=self._on_progress,
+                cancel_event=self._cancel_event,
+            )
+        except SaveCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.saved.emit(zip_path, str(self.game_saver.last_audio_report or ""),
+                            list(self.game_saver.last_graph_warnings))
+
+    def cancel(self) -> None:
+        """
+        Ask the save to stop. Safe to call from any thread. Synthesizing in the saving process, the save stops once the
+        batch currently being generated (up to storageManager.config.TTS_BATCH_SIZE nodes) is done.
+        """
+        self._cancel_event.set()
+
+    def _on_progress(self, event: SynthesisProgress) -> None:
+        if event.cached:
+            self._cached_nodes += 1
+        synthesized = event.completed - self._cached_nodes
+        remaining = event.total - event.completed
+
+        eta = -1.0
+        if synthesized > 0:
+            eta = (time.monotonic() - self._start_time) / synthesized * remaining
+        elif remaining == 0:
+            eta = 0.0
+        self.progress.emit(event.completed, event.total, eta)
@@ -7,19 +7,7 @@
 # nuitka-project: --enable-plugin=pyside6
 # nuitka-project: --include-qt-plugins=qml
 
-import sys
-
-import gamePlayer
-import playerPage
-
 if __name__ == "__main__":
-    # for game player
-    # if len(sys.argv) > 1:
-    #     player = gamePlayer.GamePlayer()
-    #     player.playGame(sys.argv[1])
-    # else:
-    #     playerPage.run()
-
     # for game engine
     from gui.homePage import run
     run()
@@ -1 +1,19 @@
-from .videoGestureRecogniser import VideoGestureRecogniser
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .videoGestureRecogniser import VideoGestureRecogniser
+
+__all__ = ["VideoGestureRecogniser"]
+
+# imported on first use: the recogniser pulls in mediapipe and cv2, which take seconds to load and are only needed
+# once a game is played
+_LAZY_ATTRIBUTES = {"VideoGestureRecogniser": ".videoGestureRecogniser"}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
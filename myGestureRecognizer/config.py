@@ -0,0 +1,23 @@
+# no preview window (e.g. kiosk builds, CI); the recogniser can also be made headless per instance
+HEADLESS = False
+
+# frames are downscaled to at most this width before recognition (the preview window keeps the full frame)
+FRAME_TARGET_WIDTH = 640
+# a new frame is only sent while fewer than this many are still being recognised; the others are dropped
+MAX_FRAMES_IN_FLIGHT = 2
+# a frame without a result after this long is taken as dropped by the recognizer
+FRAME_RESULT_TIMEOUT_MS = 1000
+# when the frame latency stays above this budget the frames are downscaled further, down to MIN_FRAME_SCALE of the
+# target width; they are scaled back up once the latency is well under it
+LATENCY_BUDGET_MS = 150
+MIN_FRAME_SCALE = 0.5
+# number of recent results the FPS and latency are averaged over
+FRAME_STATS_WINDOW = 30
+
+# gesture decisions: the scores (gesture confidence x handedness confidence) of the last VOTE_WINDOW_SIZE frames are
+# summed per gesture, and a gesture is chosen as soon as its sum reaches VOTE_THRESHOLD; frames without a hand count
+# as empty votes, so old detections fade out of the window
+VOTE_WINDOW_SIZE = 8
+VOTE_THRESHOLD = 2.5
+# detections scored lower than this are ignored altogether
+VOTE_MIN_SCORE = 0.3
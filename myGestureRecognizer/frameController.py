@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from . import config
+
+# step by which the adaptive scale moves when the latency is over or well under budget
+SCALE_STEP = 0.1
+
+
+@dataclass
+class FrameStats:
+    """
+    Recognition throughput over the last few results.
+    """
+    # results received per second
+    fps: float
+    # time from sending a frame to receiving its result, in milliseconds
+    latency_ms: float
+    frames_sent: int
+    frames_dropped: int
+    in_flight: int
+    # current downscale factor on top of the target width
+    scale: float
+
+    def __str__(self):
+        return (f"{self.fps:.1f} fps, {self.latency_ms:.0f} ms latency, {self.frames_sent} frames sent, "
+                f"{self.frames_dropped} dropped, scale {self.scale:.1f}")
+
+
+class FrameController:
+    """
+    Decides which camera frames go to the recognizer and at what size, so a slow CPU never builds up a backlog.
+    Frames are sent only while few are still being recognised (tracked through the result timestamps) and are
+    downscaled to the target width, and further while the recognizer cannot keep up. Thread-safe: results arrive on
+    the recognizer's callback thread.
+    """
+
+    def __init__(self, target_width: int = config.FRAME_TARGET_WIDTH,
+                 max_in_flight: int = config.MAX_FRAMES_IN_FLIGHT,
+                 latency_budget_ms: float = config.LATENCY_BUDGET_MS,
+                 min_scale: float = config.MIN_FRAME_SCALE,
+                 window: int = config.FRAME_STATS_WINDOW):
+        """
+        :param target_width: frames wider than this are downscaled to it (0 disables downscaling)
+        :param max_in_flight: maximum number of frames sent without a result yet
+        :param latency_budget_ms: latency above which frames are downscaled further
+        :param min_scale: lowest adaptive scale, relative to the target width
+        :param window: number of recent results the statistics are computed over
+        """
+        self.target_width = target_width
+        self.max_in_flight = max_in_flight
+        self.latency_budget_ms = latency_budget_ms
+        self.min_scale = min_scale
+
+        self._lock = threading.Lock()
+        # timestamps (ms) of the frames sent and not answered yet, oldest first
+        self._in_flight: deque[int] = deque()
+        self._result_times: deque[float] = deque(maxlen=window)
+        self._latencies: deque[float] = deque(maxlen=window)
+        # every latency since reset_counters(), for percentiles over a whole turn
+        self._turn_latencies: list[float] = []
+        self._scale: float = 1.0
+        self._frames_sent: int = 0
+        self._frames_dropped: int = 0
+
+    def reset_counters(self):
+        """
+        Restart the sent/dropped counts and turn latencies (e.g. at the start of a turn). The latency history the scale
+        adapts to is kept.
+        """
+        with self._lock:
+            self._frames_sent = 0
+            self._frames_dropped = 0
+            self._turn_latencies = []
+
+    def should_send(self) -> bool:
+        """
+        Whether the next frame should go to the recognizer. Counts the frame as dropped if not.
+        """
+        now_ms = time.time() * 1000
+        with self._lock:
+            # the recognizer may drop frames without ever answering them
+            while self._in_flight and now_ms - self._in_flight[0] > config.FRAME_RESULT_TIMEOUT_MS:
+                self._in_flight.popleft()
+            if len(self._in_flight) < self.max_in_flight:
+                return True
+            self._frames_dropped += 1
+            return False
+
+    def target_size(self, frame_shape: tuple[int, ...]) -> Optional[tuple[int, int]]:
+        """
+        Gives the size a frame of the given shape is downscaled to before recognition.
+        :return: (width, height), or None if the frame is sent as it is
+        """
+        if not self.target_width:
+            return None
+        height, width = frame_shape[:2]
+        target_width = int(min(width, self.target_width) * self._scale)
+        if target_width >= width:
+            return None
+        return target_width, max(1, round(height * target_width / width))
+
+    def on_sent(self, timestamp_ms: int):
+        with self._lock:
+            self._in_flight.append(timestamp_ms)
+            self._frames_sent += 1
+
+    def on_result(self, timestamp_ms: int):
+        """
+        Record the result of the frame sent at timestamp_ms. Older frames still in flight were dropped by the
+        recognizer, so they are forgotten too.
+        """
+        now = time.time()
+        with self._lock:
+            while self._in_flight and self._in_flight[0] <= timestamp_ms:
+                self._in_flight.popleft()
+            self._result_times.append(now)
+            latency = max(0.0, now * 1000 - timestamp_ms)
+            self._latencies.append(latency)
+            self._turn_latencies.append(latency)
+            self._adapt_scale()
+
+    def _adapt_scale(self):
+        if len(self._latencies) < self._latencies.maxlen // 2:
+            return
+        latency = sum(self._latencies) / len(self._latencies)
+        if latency > self.latency_budget_ms:
+            self._scale = max(self.min_scale, self._scale - SCALE_STEP)
+        elif latency < self.latency_budget_ms / 2:
+            self._scale = min(1.0, self._scale + SCALE_STEP)
+        else:
+            return
+        # judge the new scale on its own results
+        self._latencies.clear()
+
+    def latencies(self) -> list[float]:
+        """
+        The latency (ms) of every result since reset_counters(), in the order they arrived.
+        """
+        with self._lock:
+            return list(self._turn_latencies)
+
+    @property
+    def stats(self) -> FrameStats:
+        with self._lock:
+            fps = 0.0
+            if len(self._result_times) > 1:
+                elapsed = self._result_times[-1] - self._result_times[0]
+                fps = (len(self._result_times) - 1) / elapsed if elapsed > 0 else 0.0
+            latency = sum(self._latencies) / len(self._latencies) if self._latencies else 0.0
+            return FrameStats(fps, latency, self._frames_sent, self._frames_dropped, len(self._in_flight),
+                              self._scale)
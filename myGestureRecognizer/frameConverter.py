@@ -0,0 +1,50 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from . import config
+
+
+class FrameConverter:
+    """
+    Turns camera frames into the RGB arrays the recognizer takes without allocating new arrays for every frame.
+    Downscaling and colour conversion write into preallocated buffers (the dst= argument of OpenCV), which are only
+    reallocated when the frame size changes. The buffers rotate through a ring a little larger than the number of
+    frames in flight, so a buffer is never overwritten while the recognizer may still be reading it.
+    """
+
+    def __init__(self, ring_size: int = config.MAX_FRAMES_IN_FLIGHT + 1):
+        """
+        :param ring_size: number of buffer sets; must be more than the frames that can be in flight at once
+        """
+        # per ring slot: buffer name -> array
+        self._slots: list[dict[str, np.ndarray]] = [{} for _ in range(ring_size)]
+        self._next: int = 0
+
+    @staticmethod
+    def _buffer(slot: dict[str, np.ndarray], name: str, shape: tuple[int, ...], dtype) -> np.ndarray:
+        buffer = slot.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = slot[name] = np.empty(shape, dtype)
+        return buffer
+
+    def convert(self, frame: np.ndarray, size: Optional[tuple[int, int]] = None) -> np.ndarray:
+        """
+        Converts a BGR camera frame to an RGB array, downscaled to size. The result stays valid until the converter
+        has been called ring_size more times.
+        :param frame: the camera frame (it is not modified, and not referenced by the result)
+        :param size: (width, height) to downscale to, or None to keep the frame size
+        :return: contiguous RGB array
+        """
+        slot = self._slots[self._next]
+        self._next = (self._next + 1) % len(self._slots)
+
+        if size is not None and size != (frame.shape[1], frame.shape[0]):
+            resized = self._buffer(slot, "resized", (size[1], size[0]) + frame.shape[2:], frame.dtype)
+            cv2.resize(frame, size, dst=resized, interpolation=cv2.INTER_AREA)
+            frame = resized
+
+        rgb = self._buffer(slot, "rgb", frame.shape, frame.dtype)
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        return rgb
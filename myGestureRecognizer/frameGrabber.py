@@ -0,0 +1,192 @@
+import threading
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from .frameSources import EndOfFrames, FrameSource
+
+# frames in the ring: one being written, one being read, and the newest complete one
+RING_SIZE = 3
+# wait before trying again after the camera failed to give a frame
+READ_RETRY_DELAY = 0.01
+# frames the camera may have buffered while paused; dropped on resume so recognition starts on a fresh one
+STALE_FRAMES = 5
+# consecutive failed reads (READ_RETRY_DELAY apart, so about 3 seconds) after which the camera is taken as gone
+MAX_FAILED_READS = 300
+
+
+class FrameGrabber:
+    """
+    Reads the camera on its own thread, so the recognition loop never blocks on the camera and always gets the newest
+    frame. Frames are read into a small ring of preallocated buffers: the thread writes into a slot nobody is reading,
+    and older frames the loop did not get to are simply overwritten.
+    """
+
+    def __init__(self, capture: cv2.VideoCapture, ring_size: int = RING_SIZE, stale_frames: Optional[int] = None):
+        """
+        :param capture: an opened capture (or frameSources.FrameSource); the grabber reads it but does not release it
+        :param ring_size: number of frame buffers (at least 3, so writing never waits for the reader)
+        :param stale_frames: frames dropped after a resume; defaults to STALE_FRAMES for a camera, and to 0 for a
+        FrameSource, which buffers nothing while paused
+        """
+        if ring_size < 3:
+            raise ValueError("The ring needs at least 3 frames")
+        self.capture = capture
+        self.ring_size = ring_size
+        if stale_frames is None:
+            stale_frames = 0 if isinstance(capture, FrameSource) else STALE_FRAMES
+        self.stale_frames = stale_frames
+
+        self._condition = threading.Condition()
+        # allocated from the first frame, once its size is known
+        self._slots: list[Optional[np.ndarray]] = [None] * ring_size
+        self._latest: int = -1
+        self._held: int = -1
+        self._sequence: int = 0
+        self._paused: bool = False
+        # set by resume(), so the thread drops the stale frames before its next read
+        self._resumed: bool = False
+        self._stopping: bool = False
+        self._interrupted: bool = False
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> 'FrameGrabber':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the thread and waits for it to finish its current read.
+        """
+        if self._thread is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._thread = None
+
+    def pause(self):
+        """
+        Stop reading the camera (without releasing it) until resume(). A read already in progress still finishes.
+        """
+        with self._condition:
+            self._paused = True
+
+    def resume(self):
+        """
+        Start reading again. The grabber thread drops the frames the camera buffered while paused before its first read,
+        so the capture is only ever used from that thread.
+        """
+        with self._condition:
+            if not self._paused:
+                return
+            self._paused = False
+            self._resumed = True
+            self._condition.notify_all()
+
+    @property
+    def sequence(self) -> int:
+        """
+        Sequence number of the newest frame read so far (0 for none).
+        """
+        with self._condition:
+            return self._sequence
+
+    def interrupt(self):
+        """
+        Wake up a read_latest call that is waiting for a frame (it then returns None). Safe to call from any thread.
+        """
+        with self._condition:
+            self._interrupted = True
+            self._condition.notify_all()
+
+    def read_latest(self, after_sequence: int, timeout: Optional[float] = None) -> Optional[tuple[int, np.ndarray]]:
+        """
+        Waits for a frame newer than after_sequence and gives the newest one. The frame stays valid until the next
+        call; copy it to keep it longer.
+        :param after_sequence: sequence number of the last frame read (0 for none)
+        :param timeout: maximum seconds to wait
+        :return: sequence number and frame, or None on timeout or interrupt()
+        Raises EndOfFrames once a replayed source has no frames left (after its last frame was read).
+        """
+        with self._condition:
+            self._held = -1
+            self._condition.wait_for(
+                lambda: self._sequence > after_sequence or self._interrupted or self._error is not None,
+                timeout,
+            )
+            if self._interrupted:
+                self._interrupted = False
+                return None
+            if self._sequence > after_sequence:
+                self._held = self._latest
+                return self._sequence, self._slots[self._latest]
+            if isinstance(self._error, EndOfFrames):
+                raise EndOfFrames(str(self._error))
+            if self._error is not None:
+                raise RuntimeError("Reading the camera failed") from self._error
+            return None
+
+    def _free_slot(self) -> int:
+        for index in range(self.ring_size):
+            if index != self._latest and index != self._held:
+                return index
+        raise AssertionError("No free frame buffer")
+
+    def _run(self):
+        failed_reads = 0
+        try:
+            while True:
+                with self._condition:
+                    self._condition.wait_for(lambda: not self._paused or self._stopping)
+                    if self._stopping:
+                        return
+                    resumed = self._resumed
+                    self._resumed = False
+                    index = self._free_slot()
+                    buffer = self._slots[index]
+
+                if resumed:
+                    for _ in range(self.stale_frames):
+                        self.capture.grab()
+
+                # read outside the lock: the slot is neither the newest frame nor the one being read
+                ok, frame = self.capture.read(buffer) if buffer is not None else self.capture.read()
+                if not ok:
+                    failed_reads += 1
+                    if failed_reads == 1:
+                        print("Failed to grab frame from camera, retrying.")
+                    if failed_reads >= MAX_FAILED_READS:
+                        raise RuntimeError(f"The camera gave no frame in {failed_reads} reads")
+                    time.sleep(READ_RETRY_DELAY)
+                    continue
+                failed_reads = 0
+
+                with self._condition:
+                    if self._slots[index] is None:
+                        self._slots = [frame] + [np.empty_like(frame) for _ in range(self.ring_size - 1)]
+                        index = 0
+                    else:
+                        # the backend gives a new array if the frame no longer fits the buffer (e.g. size changed)
+                        self._slots[index] = frame
+                    self._latest = index
+                    self._sequence += 1
+                    self._condition.notify_all()
+        except BaseException as e:
+            with self._condition:
+                self._error = e
+                self._condition.notify_all()
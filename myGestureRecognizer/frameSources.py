@@ -0,0 +1,222 @@
+"""
+Frame sources that stand in for the camera, so recognition can be replayed and measured without one (e.g. in CI or on
+headless kiosk builds). They have the parts of the cv2.VideoCapture interface the recogniser uses (read, grab, set, get,
+isOpened, release), so they plug into FrameGrabber and VideoGestureRecogniser(frame_source=...) unchanged:
+    VideoFileSource         a recorded video file
+    ImageDirectorySource    the images of a directory, in name order
+    SyntheticSource         generated frames, for load tests without any recording
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import cv2
+import numpy as np
+
+# frame rate of sources that do not have one of their own
+DEFAULT_FPS = 30.0
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class EndOfFrames(EOFError):
+    """
+    Raised by a source that is not looping once all its frames have been read.
+    """
+
+
+class FrameSource:
+    """
+    Base of the replay sources. Subclasses give the frames through _next_frame; this class paces them like a camera.
+    """
+
+    def __init__(self, fps: float = DEFAULT_FPS, loop: bool = False, realtime: bool = True):
+        """
+        :param fps: frames per second the source delivers
+        :param loop: start again from the first frame at the end, instead of raising EndOfFrames
+        :param realtime: deliver frames at fps like a camera; otherwise as fast as they are read
+        """
+        self.fps = fps
+        self.loop = loop
+        self.realtime = realtime
+        self.frames_read: int = 0
+        # perf_counter time the next frame is due at, set by the first read
+        self._next_due: Optional[float] = None
+
+    def _next_frame(self, image: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """
+        Gives the next frame, written into image if it has the right size. None at the end of the frames.
+        """
+        raise NotImplementedError
+
+    def _rewind(self):
+        raise NotImplementedError
+
+    def _pace(self):
+        if not self.realtime:
+            return
+        now = time.perf_counter()
+        due = now if self._next_due is None else max(self._next_due, now)
+        if due > now:
+            time.sleep(due - now)
+        self._next_due = due + 1 / self.fps
+
+    def read(self, image: Optional[np.ndarray] = None) -> tuple[bool, np.ndarray]:
+        """
+        Reads the next frame, like cv2.VideoCapture.read. Raises EndOfFrames when there are no frames left.
+        """
+        self._pace()
+        frame = self._next_frame(image)
+        if frame is None and self.loop and self.frames_read:
+            self._rewind()
+            frame = self._next_frame(image)
+        if frame is None:
+            raise EndOfFrames(f"{type(self).__name__} has no frames left after {self.frames_read}")
+        self.frames_read += 1
+        return True, frame
+
+    def grab(self) -> bool:
+        """
+        Skips a frame. Not paced: like the frames a camera buffered, skipped frames are available at once.
+        """
+        frame = self._next_frame(None)
+        if frame is None and self.loop and self.frames_read:
+            self._rewind()
+            frame = self._next_frame(None)
+        if frame is None:
+            return False
+        self.frames_read += 1
+        return True
+
+    def isOpened(self) -> bool:
+        return True
+
+    def set(self, prop_id: int, value: float) -> bool:
+        # capture properties (e.g. the buffer size) do not apply to replayed frames
+        return False
+
+    def get(self, prop_id: int) -> float:
+        if prop_id == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0.0
+
+    def release(self):
+        pass
+
+
+class VideoFileSource(FrameSource):
+    """
+    Replays a recorded video file at its own frame rate.
+    """
+
+    def __init__(self, path: str, fps: Optional[float] = None, loop: bool = False, realtime: bool = True):
+        """
+        :param path: the video file
+        :param fps: overrides the frame rate stored in the file
+        """
+        self.path = path
+        self._capture = cv2.VideoCapture(path)
+        if not self._capture.isOpened():
+            raise RuntimeError(f"Failed to open video file {path}")
+        super().__init__(fps or self._capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS, loop, realtime)
+
+    def _next_frame(self, image: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        ok, frame = self._capture.read(image) if image is not None else self._capture.read()
+        return frame if ok else None
+
+    def _rewind(self):
+        self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def release(self):
+        self._capture.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """
+    Replays the images of a directory in name order, as frames at a fixed frame rate.
+    """
+
+    def __init__(self, directory: str, fps: float = DEFAULT_FPS, loop: bool = False, realtime: bool = True):
+        self.directory = directory
+        self.paths: list[str] = sorted(
+            os.path.join(directory, filename) for filename in os.listdir(directory)
+            if filename.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self.paths:
+            raise RuntimeError(f"No images in {directory}")
+        self._index: int = 0
+        super().__init__(fps, loop, realtime)
+
+    def _next_frame(self, image: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if self._index >= len(self.paths):
+            return None
+        path = self.paths[self._index]
+        self._index += 1
+        frame = cv2.imread(path, cv2.IMREAD_COLOR)
+        if frame is None:
+            raise RuntimeError(f"Failed to read image {path}")
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return image
+        return frame
+
+    def _rewind(self):
+        self._index = 0
+
+
+class SyntheticSource(FrameSource):
+    """
+    Generates frames with a square moving over a gradient. There is no hand in them, so they measure the throughput
+    and latency of the recognizer, not its accuracy.
+    """
+
+    def __init__(self, width: int = 1280, height: int = 720, fps: float = DEFAULT_FPS, frames: Optional[int] = None,
+                 realtime: bool = True):
+        """
+        :param frames: number of frames before EndOfFrames, None for no end
+        """
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self._index: int = 0
+        gradient = np.linspace(0, 255, width, dtype=np.uint8)
+        self._background = np.broadcast_to(gradient[np.newaxis, :, np.newaxis], (height, width, 3))
+        super().__init__(fps, False, realtime)
+
+    def _next_frame(self, image: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if self.frames is not None and self._index >= self.frames:
+            return None
+        if image is None or image.shape != (self.height, self.width, 3):
+            image = np.empty((self.height, self.width, 3), np.uint8)
+        np.copyto(image, self._background)
+        side = self.height // 4
+        x = (self._index * 8) % max(1, self.width - side)
+        y = (self.height - side) // 2
+        image[y:y + side, x:x + side] = 255
+        self._index += 1
+        return image
+
+    def _rewind(self):
+        self._index = 0
+
+
+def open_frame_source(path: str, fps: Optional[float] = None, loop: bool = False,
+                      realtime: bool = True) -> FrameSource:
+    """
+    Opens a recording: an image directory if path is a directory, otherwise a video file.
+    """
+    if os.path.isdir(path):
+        return ImageDirectorySource(path, fps or DEFAULT_FPS, loop, realtime)
+    return VideoFileSource(path, fps, loop, realtime)
+
+
+@contextmanager
+def frame_source_manager(source: FrameSource) -> Iterator[FrameSource]:
+    """
+    Releases the source at the end of the with statement, like video_capture_manager does for the camera.
+    """
+    try:
+        yield source
+    finally:
+        source.release()
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from gesture import EnumGesture
+from . import config
+
+
+@dataclass
+class DecisionMetrics:
+    """
+    How a decision was reached, for tuning the window size and threshold.
+    """
+    gesture: EnumGesture
+    # summed score of the gesture when it was chosen
+    confidence: float
+    # seconds from the start of the turn to the decision
+    time_to_decision: float
+    # frames voted on during the turn, and how many of them had a hand in them
+    frames: int
+    frames_with_hand: int
+
+
+class GestureVoter:
+    """
+    Chooses a gesture from many noisy frames instead of a single one. Every frame votes for the gestures of the hands in
+    it, weighted by the recognizer's confidence in the gesture and in the handedness. Votes are summed over a sliding
+    window of frames, and a gesture is chosen as soon as its sum reaches the threshold. Thread-safe: frames arrive on
+    the recognizer's callback thread.
+    """
+
+    def __init__(self, window_size: int = config.VOTE_WINDOW_SIZE, threshold: float = config.VOTE_THRESHOLD,
+                 min_score: float = config.VOTE_MIN_SCORE):
+        """
+        :param window_size: number of most recent frames whose votes are summed
+        :param threshold: summed score a gesture needs to be chosen; lower decides faster, higher is more certain
+        :param min_score: detections scored lower than this do not vote
+        """
+        self.window_size = window_size
+        self.threshold = threshold
+        self.min_score = min_score
+
+        self._lock = threading.Lock()
+        self._window: deque[dict[EnumGesture, float]] = deque(maxlen=window_size)
+        self._allowed: set[EnumGesture] = set()
+        self._start: float = time.time()
+        self._frames: int = 0
+        self._frames_with_hand: int = 0
+        self._decision: Optional[DecisionMetrics] = None
+
+    def reset(self, allowed: list[EnumGesture]):
+        """
+        Start a new decision.
+        :param allowed: gestures that can be chosen; Victory can always be chosen, as it ends the game
+        """
+        with self._lock:
+            self._window.clear()
+            self._allowed = set(allowed) | {EnumGesture.Victory}
+            self._start = time.time()
+            self._frames = 0
+            self._frames_with_hand = 0
+            self._decision = None
+
+    def add_frame(self, hands: list[tuple[str, float, str, float]]) -> Optional[EnumGesture]:
+        """
+        Vote with the hands detected in one frame.
+        :param hands: per hand: top gesture category, its score, handedness, handedness score
+        :return: the chosen gesture once one reaches the threshold (also on every later call), None until then
+        """
+        votes: dict[EnumGesture, float] = {}
+        for category, score, handedness, handedness_score in hands:
+            gesture = EnumGesture.from_gesture(category, handedness)
+            weight = score * handedness_score
+            if gesture != EnumGesture.INVALID and weight >= self.min_score:
+                votes[gesture] = votes.get(gesture, 0.0) + weight
+
+        with self._lock:
+            if self._decision is not None:
+                return self._decision.gesture
+            self._frames += 1
+            self._frames_with_hand += bool(hands)
+            self._window.append(votes)
+
+            totals: dict[EnumGesture, float] = {}
+            for frame_votes in self._window:
+                for gesture, weight in frame_votes.items():
+                    totals[gesture] = totals.get(gesture, 0.0) + weight
+            candidates = [(total, gesture) for gesture, total in totals.items()
+                          if gesture in self._allowed and total >= self.threshold]
+            if not candidates:
+                return None
+
+            confidence, gesture = max(candidates, key=lambda candidate: candidate[0])
+            self._decision = DecisionMetrics(gesture, confidence, time.time() - self._start, self._frames,
+                                             self._frames_with_hand)
+            return gesture
+
+    @property
+    def decision(self) -> Optional[DecisionMetrics]:
+        """
+        The decision of the current turn, None while undecided.
+        """
+        return self._decision
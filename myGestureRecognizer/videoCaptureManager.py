@@ -4,11 +4,12 @@ import cv2
 
 
 @contextmanager
-def video_capture_manager(index: int):
+def video_capture_manager(index: int, destroy_windows: bool = True):
     """
     Makes sure that the camera is properly turned off after the program is finished.
     Everything before the yield statement is run when entering the with statement and everything after is run when
     exiting the with statement.
+    :param destroy_windows: also close the preview windows (not available in headless OpenCV builds)
     """
     cap = cv2.VideoCapture(index)
     try:
@@ -17,5 +18,6 @@ def video_capture_manager(index: int):
         yield cap
     finally:
         cap.release()
-        cv2.destroyAllWindows()
+        if destroy_windows:
+            cv2.destroyAllWindows()
         pass
@@ -1,13 +1,25 @@
+import threading
 import time
 import os
+from concurrent.futures import Future, InvalidStateError, wait
+from contextlib import AbstractContextManager, ExitStack, contextmanager
+from typing import Callable, Iterator, Optional
 
 import cv2
 import mediapipe as mp
+import numpy as np
 from mediapipe.tasks.python import BaseOptions
 from mediapipe.tasks.python.vision import GestureRecognizer, RunningMode, GestureRecognizerOptions, \
     GestureRecognizerResult
 
 from gesture import EnumGesture
+from tracing import count, span
+from . import config
+from .frameController import FrameController, FrameStats
+from .frameConverter import FrameConverter
+from .frameGrabber import FrameGrabber
+from .frameSources import EndOfFrames
+from .gestureVoter import DecisionMetrics, GestureVoter
 from .videoCaptureManager import video_capture_manager
 
 WINDOW_NAME = "Hand Detection"
@@ -19,25 +31,72 @@ class VideoGestureRecogniser:
     Class to handle gesture recognition using MediaPipe's GestureRecognizer.
     """
 
-    def __init__(self):
+    def __init__(self, frame_source: Optional[Callable[[], AbstractContextManager]] = None,
+                 headless: bool = config.HEADLESS):
+        """
+        :param frame_source: opens the frames to recognise, as a context manager giving a capture (e.g.
+        lambda: frame_source_manager(VideoFileSource(path)) to replay a recording); defaults to camera_index
+        :param headless: do not show the preview window
+        """
         self.model_path = os.path.join(os.path.dirname(__file__), "gesture_recognizer.task")
         self.camera_index = 0
-        self._running: bool = True
+        self.frame_source = frame_source
+        self.headless = headless
+        # completed by the result callback (on the recognizer's thread) once a decision is made
+        self._decision: Future = Future()
+        # guards the state written by the result callback
+        self._lock = threading.Lock()
         self._last_gesture_category: str | None = None
         self._last_handedness: str | None = None
         self._gestures_to_spot: list[EnumGesture] = []
+        # results of frames sent before this time (time.time() seconds) are ignored
+        self._accept_after: float = 0.0
+        # the recognizer needs strictly increasing timestamps, also across the turns of a session
+        self._last_timestamp_ms: int = 0
+
+        # long-lived recognizer and camera, open between open_session() and close_session()
+        self._session: Optional[ExitStack] = None
+        self._recognizer: Optional[GestureRecognizer] = None
+        self._capture: Optional[cv2.VideoCapture] = None
+        self._grabber: Optional[FrameGrabber] = None
+
+        # drops and downscales frames so the recognizer never falls behind the camera
+        self.frame_controller: FrameController = FrameController()
+        # converts frames into reused buffers instead of new arrays
+        self.frame_converter: FrameConverter = FrameConverter()
+        # turns the per-frame detections into one decision
+        self.voter: GestureVoter = GestureVoter()
 
     def _get_last_gesture(self) -> EnumGesture:
-        return EnumGesture.from_gesture(self._last_gesture_category, self._last_handedness)
+        if self.voter.decision is not None:
+            return self.voter.decision.gesture
+        with self._lock:
+            return EnumGesture.from_gesture(self._last_gesture_category, self._last_handedness)
 
-    def _reset(self, gestures_to_spot: list[EnumGesture]):
-        self._running = True
-        self._last_gesture_category = None
-        self._last_handedness = None
-        self._gestures_to_spot = gestures_to_spot
+    def _reset(self, gestures_to_spot: list[EnumGesture], ignore_for: float = 0.0):
+        with self._lock:
+            self._decision = Future()
+            self._last_gesture_category = None
+            self._last_handedness = None
+            self._gestures_to_spot = gestures_to_spot
+            self._accept_after = time.time() + ignore_for
+        self.frame_controller.reset_counters()
+        self.voter.reset(gestures_to_spot)
 
     def _stop(self):
-        self._running = False
+        """
+        End the current recognition. Safe to call from any thread, any number of times.
+        """
+        try:
+            self._decision.set_result(None)
+        except InvalidStateError:
+            pass
+
+    def cancel(self):
+        """
+        End a get_gesture call running on another thread early; it returns the last gesture seen (usually INVALID).
+        """
+        self._stop()
 
     def _create_recognizer(self):
         options = GestureRecognizerOptions(
@@ -47,28 +106,40 @@ class VideoGestureRecogniser:
         )
         return GestureRecognizer.create_from_options(options)
 
-    def _send_to_recognizer(self, frame: mp.Image, recognizer: GestureRecognizer):
+    def _send_to_recognizer(self, frame: np.ndarray, recognizer: GestureRecognizer):
         """
         Convert and send to recognizer asynchronously.
         """
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        rgb_frame = self.frame_converter.convert(frame, self.frame_controller.target_size(frame.shape))
+        # mp.Image copies the pixels into its own immutable frame and cannot be refilled, so one is needed per frame
         mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
-        timestamp_ms = int(1000 * time.time())
+        timestamp_ms = max(int(1000 * time.time()), self._last_timestamp_ms + 1)
+        self._last_timestamp_ms = timestamp_ms
+        self.frame_controller.on_sent(timestamp_ms)
         recognizer.recognize_async(mp_image, timestamp_ms)
 
     def _result_callback(self, result: GestureRecognizerResult, output_image: mp.Image, timestamp_ms: int):
         """
-        Run for each picture analysed by the recognizer. If a gesture to spot is detected, stop the recognition.
+        Run for each picture analysed by the recognizer. Every frame votes for the gestures in it (frames without a
+        hand too, so old detections fade). Once the votes settle on a gesture to spot, stop the recognition.
         """
-        if len(result.gestures) < 1:
-            # then no hand detected
-            return
-        # set the last gesture
-        self._last_gesture_category = result.gestures[0][0].category_name
-        self._last_handedness = result.handedness[0][0].category_name
+        self.frame_controller.on_result(timestamp_ms)
+        count("recognition.frames_recognised")
+        with self._lock:
+            if timestamp_ms < 1000 * self._accept_after:
+                return
+
+        hands: list[tuple[str, float, str, float]] = [
+            (gestures[0].category_name, gestures[0].score, handedness[0].category_name, handedness[0].score)
+            for gestures, handedness in zip(result.gestures, result.handedness) if gestures and handedness
+        ]
+        if hands:
+            with self._lock:
+                # set the last gesture
+                self._last_gesture_category, _, self._last_handedness, _ = hands[0]
 
-        # victory set as a special case for stopping the loop
-        if self._get_last_gesture() in self._gestures_to_spot or self._get_last_gesture() == EnumGesture.Victory:
+        # victory can always be chosen, as a special case for stopping the loop
+        if self.voter.add_frame(hands) is not None:
             self._stop()
 
     def timeout_stop(self, start_time: float, timeout_duration: float):
@@ -78,35 +149,163 @@ class VideoGestureRecogniser:
         if time.time() - start_time > timeout_duration:
             raise TimeoutError(f"Gesture recognition timed out after {timeout_duration} seconds.")
 
-    def _start_recognition(self):
+    def _open_frame_source(self) -> AbstractContextManager:
+        if self.frame_source is not None:
+            return self.frame_source()
+        return video_capture_manager(self.camera_index, destroy_windows=not self.headless)
+
+    def open_session(self):
+        """
+        Load the recognizer model and open the camera once, to be reused by every get_gesture call until
+        close_session(). Without a session, each get_gesture call opens and closes both.
+        """
+        if self._session is not None:
+            return
+        session = ExitStack()
+        try:
+            self._recognizer = session.enter_context(self._create_recognizer())
+            self._capture = session.enter_context(self._open_frame_source())
+        except BaseException:
+            session.close()
+            self._recognizer = None
+            self._capture = None
+            raise
+        # keep as few frames as possible queued in the driver, so a resumed session does not start on old frames
+        self._capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        # stopped before the camera is released (the stack unwinds in reverse)
+        self._grabber = session.enter_context(FrameGrabber(self._capture))
+        self._session = session
+
+    def close_session(self):
+        """
+        Release the camera and the recognizer of the session.
+        """
+        if self._session is None:
+            return
+        try:
+            self._session.close()
+        finally:
+            self._session = None
+            self._recognizer = None
+            self._capture = None
+            self._grabber = None
+
+    @contextmanager
+    def session(self) -> Iterator['VideoGestureRecogniser']:
+        """
+        Keep the recognizer and camera open for the duration of the with statement (e.g. a whole game), so the model
+        load and camera warm-up are only paid once.
+        """
+        self.open_session()
+        try:
+            yield self
+        finally:
+            self.close_session()
+
+    def pause(self):
+        """
+        Stop reading the camera between turns without releasing it. The next get_gesture call resumes the session.
+        """
+        if self._grabber is not None:
+            self._grabber.pause()
+
+    def resume(self):
+        """
+        Resume a paused session, dropping the frames the camera buffered while it was paused.
+        """
+        if self._grabber is not None:
+            self._grabber.resume()
+
+    def _start_recognition(self, timeout: float = TIMEOUT_TIME):
         """
         Start the video capture and gesture recognition loop. This loop stops when a gesture to spot is detected. The
         code for this can be found in the _result_callback method.
-        Raises TimeoutError if no gesture is detected within 30 seconds.
+        Uses the open session if there is one, otherwise opens the recognizer and camera just for this call.
+        Raises TimeoutError if no gesture is detected within timeout seconds.
         """
-        start = time.time()
-        with self._create_recognizer() as recognizer, video_capture_manager(self.camera_index) as cap:
-            while self._running:
-
-                ret, frame = cap.read()
-                self.timeout_stop(start, TIMEOUT_TIME)
+        if self._session is not None:
+            self.resume()
+            self._recognition_loop(self._recognizer, self._grabber, timeout)
+            return
+        with self._create_recognizer() as recognizer, self._open_frame_source() as cap, \
+                FrameGrabber(cap) as grabber:
+            self._recognition_loop(recognizer, grabber, timeout)
 
-                if not ret:
-                    print("Failed to grab frame from camera.")
-                    continue
+    def _recognition_loop(self, recognizer: GestureRecognizer, grabber: FrameGrabber, timeout: float):
+        """
+        Feed camera frames to the recognizer until a gesture to spot is detected. The camera is read on the grabber's
+        thread; this loop sleeps until a new frame arrives or the result callback completes the decision.
+        Raises EndOfFrames if a replayed source ends before a decision is made.
+        """
+        start = time.time()
+        decision = self._decision
+        decision.add_done_callback(lambda _: grabber.interrupt())
+        # only frames read from now on, not the last one read before the session was paused
+        sequence = grabber.sequence
+        while not decision.done():
+            self.timeout_stop(start, timeout)
+            try:
+                latest = grabber.read_latest(sequence, timeout=max(0.0, start + timeout - time.time()))
+            except EndOfFrames:
+                # the last frames may still be recognised and decide
+                wait([decision], timeout=min(config.FRAME_RESULT_TIMEOUT_MS / 1000,
+                                             max(0.0, start + timeout - time.time())))
+                if decision.done():
+                    break
+                raise
+            if latest is None:
+                continue
+            sequence, frame = latest
 
-                self._send_to_recognizer(frame, recognizer)
+            if self.frame_controller.should_send():
+                with span("send_frame", "recognition"):
+                    self._send_to_recognizer(frame, recognizer)
+                count("recognition.frames_sent")
+            else:
+                count("recognition.frames_dropped")
 
+            if not self.headless:
                 cv2.imshow(WINDOW_NAME, frame)
                 if cv2.waitKey(1) & 0xFF == ord("q"):
                     break
 
-    def get_gesture(self, gestures_to_spot: list[EnumGesture]) -> EnumGesture:
+    def get_gesture(self, gestures_to_spot: list[EnumGesture], timeout: float = TIMEOUT_TIME,
+                    ignore_for: float = 0.0) -> EnumGesture:
         """
         Start the gesture recognition process and return the first gesture detected that is in the gestures_to_spot list.
         :param gestures_to_spot:
+        :param timeout: seconds to wait for a gesture before raising TimeoutError
+        :param ignore_for: seconds at the start during which detected gestures are ignored
         :return:
         """
-        self._reset(gestures_to_spot)
-        self._start_recognition()
+        self._reset(gestures_to_spot, ignore_for)
+        gesture_names = [gesture.name for gesture in gestures_to_spot]
+        with span("get_gesture", "recognition", gestures=gesture_names) as gesture_span:
+            try:
+                self._start_recognition(timeout)
+            finally:
+                stats = self.frame_stats
+                gesture_span.set("frames_sent", stats.frames_sent)
+                gesture_span.set("frames_dropped", stats.frames_dropped)
+                gesture_span.set("fps", round(stats.fps, 1))
+                if self.voter.decision is not None:
+                    decision = self.voter.decision
+                    gesture_span.set("gesture", decision.gesture.name)
+                    gesture_span.set("confidence", round(decision.confidence, 2))
+                    gesture_span.set("frames_voted", decision.frames)
+                    gesture_span.set("frames_with_hand", decision.frames_with_hand)
         return self._get_last_gesture()
+
+    @property
+    def decision_metrics(self) -> Optional[DecisionMetrics]:
+        """
+        How the gesture of the current (or last) get_gesture call was decided, None if no gesture was chosen.
+        """
+        return self.voter.decision
+
+    @property
+    def frame_stats(self) -> FrameStats:
+        """
+        Effective recognition FPS, frame latency and dropped frames of the current (or last) get_gesture call.
+        """
+        return self.frame_controller.stats
@@ -1,3 +1,8 @@
-from .game_save import GameSaver
+from .game_save import GameSaver, SaveCancelled
 from .game_load import GameLoader
+from .game_archive import GameArchive, AudioHandle
+from .mapped_graph import MappedBinaryGraph
+from .audio_codec import AudioCodec
+from .extraction_cache import ExtractionCache
+from .speech_cache import SpeechCache, SpeechCacheReport
 from . import test_graphs
\ No newline at end of file
@@ -0,0 +1,27 @@
+import os
+from enum import Enum
+
+
+class AudioCodec(str, Enum):
+    """
+    Codec the node audio is written with. The value is also the file extension (soundfile picks the format from it).
+    """
+    WAV = "wav"
+    FLAC = "flac"
+    OGG = "ogg"
+
+    @property
+    def extension(self) -> str:
+        return "." + self.value
+
+    @property
+    def is_compressed(self) -> bool:
+        return self != AudioCodec.WAV
+
+    @staticmethod
+    def from_filename(filename: str) -> 'AudioCodec':
+        """
+        Gives the codec of an audio file from its extension (e.g. "node_1.flac" -> FLAC).
+        """
+        return AudioCodec(os.path.splitext(filename)[1].lstrip(".").lower())
+
@@ -1 +1,37 @@
+import os
+
 FILE_EXTENSION = ".noui"
+GRAPH_FILENAME = "graph.json"
+BINARY_GRAPH_FILENAME = "graph.bin"
+# signatures of graph.json / graph.bin, proving the game was saved by this installation
+SIGNATURE_FILENAME = "graph.sig"
+
+# also write graph.bin, a compact binary copy of graph.json that loaders can memory-map
+WRITE_BINARY_GRAPH = True
+# graph.bin is also signed in blocks of this many bytes, so a mapped graph is verified one block at a time as it is read
+GRAPH_SIGNATURE_BLOCK_SIZE = 64 * 1024
+
+# codec of the node audio written on save: "flac" (lossless), "ogg" (Vorbis, smallest) or "wav" (uncompressed)
+AUDIO_CODEC = "flac"
+
+# extracted games are cached here, keyed by archive content, and reused across loads and launches
+EXTRACTION_CACHE_FOLDER = os.path.join(os.path.dirname(__file__), "cache", "extracted")
+EXTRACTION_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# narration audio synthesized by any save, keyed by narration text, voice and model
+SPEECH_CACHE_FOLDER = os.path.join(os.path.dirname(__file__), "cache", "speech")
+
+# number of narrations synthesized together in one TTS generate call
+TTS_BATCH_SIZE = 8
+
+# processes synthesizing audio in parallel (1 = in the saving process) and torch threads per process (None = share
+# the cores evenly between the processes)
+TTS_WORKERS = 1
+TTS_TORCH_THREADS = None
+
+# key the graph signatures are made with; games signed with it are trusted and loaded without full validation
+SIGNING_KEY_PATH = os.path.join(os.path.dirname(__file__), "cache", "signing.key")
+
+# refuse to save games where a player can get stuck (dead ends, loops with no way out, no reachable win), before any
+# audio is synthesized
+CHECK_GRAPH_BEFORE_SAVE = True
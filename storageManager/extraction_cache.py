@@ -0,0 +1,319 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+import zipfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+
+from . import config
+
+CHUNK_SIZE = 1024 * 1024
+SIZE_FILENAME = ".size"
+CONTENT_FOLDER = "game"
+# lease files of the entries in use (<entry>.<random>), and the lock taken while leasing or evicting
+LEASE_FOLDER = ".leases"
+LOCK_FILENAME = ".lock"
+# archive path -> [size, mtime_ns, sha256] of the archives hashed so far, so a later launch does not rehash them
+HASH_INDEX_FILENAME = ".hashes.json"
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock(file: BinaryIO, blocking: bool) -> bool:
+        file.seek(0)
+        try:
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            if blocking:
+                raise
+            return False
+        return True
+
+    def _unlock(file: BinaryIO):
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock(file: BinaryIO, blocking: bool) -> bool:
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        return True
+
+    def _unlock(file: BinaryIO):
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class ExtractionCache:
+    """
+    On-disk cache of extracted game archives, keyed by the SHA-256 of the archive contents. Each archive is extracted
+    once into its own entry folder and reused by every later load, in this process or a later launch. Entries are
+    populated atomically (extract into a private folder, then rename into place), so concurrent loads of the same game
+    never see a half-extracted folder and loads of different games never touch each other's files. When the cache
+    grows past max_bytes, the least recently used entries are evicted.
+    Every folder given by extract() is leased until release() is called with it: the lease is a locked file, so entries
+    in use by any cache object of any process are never evicted, and the lease of a process that died without
+    releasing it is unlocked by the OS and cleaned up by the next eviction.
+    """
+
+    def __init__(self, cache_folder: str = config.EXTRACTION_CACHE_FOLDER,
+                 max_bytes: int = config.EXTRACTION_CACHE_MAX_BYTES):
+        """
+        :param cache_folder: directory holding the cache entries
+        :param max_bytes: size cap for the whole cache; entries in use are never evicted
+        """
+        self.cache_folder = cache_folder
+        self.max_bytes = max_bytes
+        # (path, size, mtime) -> content hash, so replaying an unchanged archive does not rehash it
+        self._hash_memo: dict[tuple[str, int, int], str] = {}
+        self._hash_index_path = os.path.join(self.cache_folder, HASH_INDEX_FILENAME)
+        # game folder -> the open (and locked) lease files this object holds on its entry, one per extract() call
+        self._leases: dict[str, list[BinaryIO]] = {}
+        self._lease_folder = os.path.join(self.cache_folder, LEASE_FOLDER)
+        os.makedirs(self._lease_folder, exist_ok=True)
+
+    def archive_hash(self, zip_path: str) -> str:
+        """
+        Computes the SHA-256 of the archive contents. The hash is kept in an index in the cache folder, and the archive
+        is only read again once its size or modification time changes, also across launches.
+        :param zip_path: path to the zipped game file
+        :return: hex digest identifying the archive contents
+        """
+        stat = os.stat(zip_path)
+        memo_key = (os.path.abspath(zip_path), stat.st_size, stat.st_mtime_ns)
+        if memo_key in self._hash_memo:
+            return self._hash_memo[memo_key]
+
+        indexed = self._read_hash_index().get(memo_key[0])
+        if indexed is not None and tuple(indexed[:2]) == memo_key[1:]:
+            self._hash_memo[memo_key] = indexed[2]
+            return indexed[2]
+
+        digest = hashlib.sha256()
+        with open(zip_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        self._hash_memo[memo_key] = digest.hexdigest()
+        self._add_to_hash_index(memo_key, self._hash_memo[memo_key])
+        return self._hash_memo[memo_key]
+
+    def _read_hash_index(self) -> dict[str, list]:
+        try:
+            with open(self._hash_index_path, 'r', encoding="utf-8") as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            # missing or damaged: the archives are hashed again
+            return {}
+        return index if isinstance(index, dict) else {}
+
+    def _add_to_hash_index(self, memo_key: tuple[str, int, int], digest: str):
+        """
+        Records the hash of an archive in the index, dropping the archives that no longer exist. The index is updated
+        under the cache lock and replaced atomically, so concurrent launches never read a half-written one.
+        """
+        path, size, mtime_ns = memo_key
+        with self._locked():
+            index = {indexed_path: entry for indexed_path, entry in self._read_hash_index().items()
+                     if os.path.exists(indexed_path)}
+            index[path] = [size, mtime_ns, digest]
+            tmp_path = f"{self._hash_index_path}.{uuid.uuid4().hex}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding="utf-8") as file:
+                    json.dump(index, file)
+                os.replace(tmp_path, self._hash_index_path)
+            except OSError:
+                # the index only saves time; the hash is still returned
+                pass
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def extract(self, zip_path: str) -> str:
+        """
+        Gives the folder holding the extracted contents of the archive, extracting it only on a cache miss. The entry
+        is leased, so it is not evicted until release() is called with the folder.
+        :param zip_path: path to the zipped game file
+        :return: path to the extracted game folder inside the cache
+        """
+        entry_name = self.archive_hash(zip_path)
+        entry_path = os.path.join(self.cache_folder, entry_name)
+        # leased under the cache lock, so an eviction running now either sees the lease or is done with the entry
+        with self._locked():
+            lease = self._acquire_lease(entry_name)
+        try:
+            if not os.path.isdir(entry_path):
+                self._populate(zip_path, entry_path)
+            self._touch(entry_path)
+            self.evict()
+            game_folder = self._game_folder(entry_path)
+        except BaseException:
+            self._release_lease(lease)
+            raise
+        self._leases.setdefault(game_folder, []).append(lease)
+        return game_folder
+
+    def release(self, game_folder: str):
+        """
+        Gives up the lease taken by one extract() call that returned game_folder, so the entry can be evicted again
+        once nothing else uses it.
+        """
+        leases = self._leases.get(game_folder)
+        if not leases:
+            return
+        self._release_lease(leases.pop())
+        if not leases:
+            del self._leases[game_folder]
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """
+        Holds the lock of the whole cache, shared by every cache object on the folder in any process.
+        """
+        with open(os.path.join(self.cache_folder, LOCK_FILENAME), 'a+b') as file:
+            _lock(file, blocking=True)
+            try:
+                yield
+            finally:
+                _unlock(file)
+
+    def _acquire_lease(self, entry_name: str) -> BinaryIO:
+        lease = open(os.path.join(self._lease_folder, f"{entry_name}.{uuid.uuid4().hex}"), 'a+b')
+        _lock(lease, blocking=True)
+        return lease
+
+    def _release_lease(self, lease: BinaryIO):
+        lease.close()
+        try:
+            os.remove(lease.name)
+        except OSError:
+            # already cleaned up by an eviction that found it unlocked
+            pass
+
+    def _entries_in_use(self) -> set[str]:
+        """
+        Names of the entries with a lease held by a live process. Leases left behind by processes that ended without
+        releasing them are no longer locked, and are removed.
+        """
+        in_use = set()
+        for name in os.listdir(self._lease_folder):
+            entry_name = name.split(".")[0]
+            if entry_name in in_use:
+                continue
+            path = os.path.join(self._lease_folder, name)
+            try:
+                with open(path, 'a+b') as file:
+                    if not _lock(file, blocking=False):
+                        in_use.add(entry_name)
+                        continue
+                    _unlock(file)
+                os.remove(path)
+            except OSError:
+                # released (or cleaned up) concurrently
+                continue
+        return in_use
+
+    def _populate(self, zip_path: str, entry_path: str):
+        """
+        Extracts the archive into a private folder and renames it into place. If another process populated the same
+        entry in the meantime, its copy is kept and ours is discarded.
+        """
+        staging_path = os.path.join(self.cache_folder, f".tmp-{uuid.uuid4().hex}")
+        content_path = os.path.join(staging_path, CONTENT_FOLDER)
+        try:
+            with zipfile.ZipFile(zip_path, 'r') as zf:
+                zf.extractall(content_path)
+                size = sum(info.file_size for info in zf.infolist())
+            with open(os.path.join(staging_path, SIZE_FILENAME), 'w') as file:
+                file.write(str(size))
+            os.rename(staging_path, entry_path)
+        except OSError:
+            if not os.path.isdir(entry_path):
+                raise
+        finally:
+            shutil.rmtree(staging_path, ignore_errors=True)
+
+    def _game_folder(self, entry_path: str) -> str:
+        """
+        If the archive contained a single top-level folder, return that folder.
+        """
+        content_path = os.path.join(entry_path, CONTENT_FOLDER)
+        extracted = os.listdir(content_path)
+        if len(extracted) == 1 and os.path.isdir(os.path.join(content_path, extracted[0])):
+            return os.path.join(content_path, extracted[0])
+        return content_path
+
+    def _touch(self, entry_path: str):
+        """
+        Marks the entry as used now, for LRU eviction.
+        """
+        now = time.time()
+        os.utime(entry_path, (now, now))
+
+    def _entry_size(self, entry_path: str) -> int:
+        try:
+            with open(os.path.join(entry_path, SIZE_FILENAME), 'r') as file:
+                return int(file.read())
+        except (OSError, ValueError):
+            return 0
+
+    def _entries(self) -> list[str]:
+        """
+        Completed cache entries (staging folders and trash are skipped).
+        """
+        return [
+            os.path.join(self.cache_folder, name)
+            for name in os.listdir(self.cache_folder)
+            if not name.startswith(".") and os.path.isdir(os.path.join(self.cache_folder, name))
+        ]
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits within max_bytes. Entries in use are skipped.
+        """
+        with self._locked():
+            entries = []
+            for entry in self._entries():
+                try:
+                    entries.append((os.stat(entry).st_mtime, entry))
+                except FileNotFoundError:
+                    # evicted concurrently by another process
+                    continue
+            total = sum(self._entry_size(entry) for _, entry in entries)
+            if total <= self.max_bytes:
+                return
+
+            in_use = self._entries_in_use()
+            for _, entry in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if os.path.basename(entry) in in_use:
+                    continue
+                size = self._entry_size(entry)
+                self._remove(entry)
+                total -= size
+
+    def _remove(self, entry_path: str):
+        """
+        Renames the entry out of the way first so no other load can pick it up half-deleted.
+        """
+        trash_path = os.path.join(self.cache_folder, f".trash-{uuid.uuid4().hex}")
+        try:
+            os.rename(entry_path, trash_path)
+        except OSError:
+            return
+        shutil.rmtree(trash_path, ignore_errors=True)
+
+    def clear(self):
+        """
+        Removes every entry from the cache that is not in use.
+        """
+        with self._locked():
+            in_use = self._entries_in_use()
+            for entry in self._entries():
+                if os.path.basename(entry) not in in_use:
+                    self._remove(entry)
@@ -0,0 +1,157 @@
+import locale
+import os
+import zipfile
+from typing import IO, Optional
+
+from . import config
+from .integrity import BlockSignatures
+from .mapped_graph import MappedBinaryGraph
+
+AUDIO_FOLDER = "audio"
+
+
+def decode_graph_json(data: bytes) -> str:
+    """
+    Decodes the bytes of a graph.json file. Games are saved as UTF-8; older ones were written with the platform's
+    default encoding, the same one open() reads them back with.
+    """
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode(locale.getpreferredencoding(False))
+
+
+class AudioHandle:
+    """
+    Lazy reference to a single audio member inside a game archive. Nothing is read from disk until open() or read()
+    is called, so holding one handle per node costs no I/O.
+    """
+
+    def __init__(self, zip_path: str, member_name: str):
+        """
+        :param zip_path: path to the zipped game file
+        :param member_name: full name of the audio member inside the archive (e.g. "my_game/audio/node_1.wav")
+        """
+        self.zip_path = zip_path
+        self.member_name = member_name
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.member_name)
+
+    def open(self) -> IO[bytes]:
+        """
+        Opens the audio member for streaming. The archive stays open until the returned stream is closed.
+        :return: a binary file-like object over the (decompressed) audio member
+        """
+        zf = zipfile.ZipFile(self.zip_path, 'r')
+        try:
+            # the member stream keeps the underlying file open after the ZipFile itself is closed
+            return zf.open(self.member_name, 'r')
+        finally:
+            zf.close()
+
+    def read(self) -> bytes:
+        """
+        Reads the whole audio member into memory.
+        :return: the audio file contents
+        """
+        with zipfile.ZipFile(self.zip_path, 'r') as zf:
+            return zf.read(self.member_name)
+
+    def __repr__(self):
+        return f"AudioHandle({self.zip_path!r}, {self.member_name!r})"
+
+
+class GameArchive:
+    """
+    Read-only view of a zipped game file. Only the zip central directory is read on construction; the graph and the
+    audio members are read straight out of the archive on demand, without extracting anything to disk.
+    """
+
+    def __init__(self, zip_path: str):
+        """
+        :param zip_path: path to the zipped game file
+        """
+        self.zip_path = zip_path
+        with zipfile.ZipFile(zip_path, 'r') as zf:
+            self._names: list[str] = zf.namelist()
+
+        graph_members = [n for n in self._names if os.path.basename(n) == config.GRAPH_FILENAME]
+        if not graph_members:
+            raise FileNotFoundError(f"No {config.GRAPH_FILENAME} found in {zip_path}")
+        self.graph_member: str = graph_members[0]
+        # folder inside the archive holding graph.json and audio/ ("" when the archive has no top-level folder)
+        self.prefix: str = os.path.dirname(self.graph_member)
+
+    @property
+    def game_name(self) -> str:
+        """
+        Name of the game: the top-level folder inside the archive, or the archive file name if there is none.
+        """
+        if self.prefix:
+            return os.path.basename(self.prefix)
+        return os.path.splitext(os.path.basename(self.zip_path))[0]
+
+    def _member_path(self, *parts: str) -> str:
+        return "/".join(p for p in (self.prefix, *parts) if p)
+
+    def read_graph(self) -> str:
+        """
+        Reads the graph.json member without extracting the archive.
+        :return: the JSON text of the graph
+        """
+        with zipfile.ZipFile(self.zip_path, 'r') as zf:
+            return decode_graph_json(zf.read(self.graph_member))
+
+    def read_file(self, filename: str) -> Optional[bytes]:
+        """
+        Reads a file of the game folder (e.g. "graph.json") straight out of the archive.
+        :param filename: name of the file relative to the game folder
+        :return: the file contents, or None if the archive does not contain it
+        """
+        member_name = self._member_path(filename)
+        if member_name not in self._names:
+            return None
+        with zipfile.ZipFile(self.zip_path, 'r') as zf:
+            return zf.read(member_name)
+
+    @property
+    def binary_graph_member(self) -> Optional[str]:
+        """
+        Name of the binary graph member, or None for archives saved without one.
+        """
+        member_name = self._member_path(config.BINARY_GRAPH_FILENAME)
+        return member_name if member_name in self._names else None
+
+    def open_binary_graph(self, block_signatures: Optional[BlockSignatures] = None) -> MappedBinaryGraph:
+        """
+        Memory-maps the binary graph straight out of the archive. Close the result when done with it.
+        Raises FileNotFoundError if the archive has no binary graph.
+        :param block_signatures: verify the blocks of the graph as they are read
+        """
+        if self.binary_graph_member is None:
+            raise FileNotFoundError(f"No {config.BINARY_GRAPH_FILENAME} found in {self.zip_path}")
+        return MappedBinaryGraph.from_archive(self.zip_path, self.binary_graph_member, block_signatures)
+
+    def audio(self, audio_filename: str) -> AudioHandle:
+        """
+        Gives a lazy handle for the audio file of a node.
+        :param audio_filename: the node's audio filename (e.g. "node_1.wav")
+        :return: a lazy handle for the member; raises KeyError if the archive does not contain it
+        """
+        member_name = self._member_path(AUDIO_FOLDER, audio_filename)
+        if member_name not in self._names:
+            raise KeyError(f"{audio_filename} not found in {self.zip_path}")
+        return AudioHandle(self.zip_path, member_name)
+
+    def audio_handles(self) -> dict[str, AudioHandle]:
+        """
+        Lazy handles for every audio member in the archive, keyed by audio filename.
+        """
+        audio_prefix = self._member_path(AUDIO_FOLDER) + "/"
+        return {
+            name[len(audio_prefix):]: AudioHandle(self.zip_path, name)
+            for name in self._names
+            if name.startswith(audio_prefix) and not name.endswith("/")
+        }
@@ -1,11 +1,18 @@
+import json
 import os
-import shutil
-import zipfile
+from typing import Callable, Optional
 
-from graph import Node
-from graph.serial_graph import SerialGraph
+from . import config, integrity
+from gesture import EnumGesture
+from graph import GraphStore, Node
+from graph.serial_graph import SerialGraph, SCHEMA_VERSION
+from .extraction_cache import ExtractionCache
+from .game_archive import GameArchive, decode_graph_json
+from .integrity import BlockSignatures
+from .mapped_graph import MappedBinaryGraph
+from tracing import traced
 
-TEMP_FOLDER = os.path.join(os.path.dirname(__file__), "temporary")
+GESTURES_BY_VALUE: dict[str, EnumGesture] = {gesture.value: gesture for gesture in EnumGesture}
 
 
 class GameLoader:
@@ -13,62 +20,209 @@ class GameLoader:
     Class responsible for loading a game from a zipped game folder (containing the graph and corresponding audio files).
     """
 
-    def _prepare_temp_folder(self, zip_path: str) -> str:
+    def __init__(self, extraction_cache: Optional[ExtractionCache] = None):
         """
-        Wipes and recreates the 'temporary' folder, then extracts the given zip archive into it.
-        :param zip_path: path to the zipped game folder
-        :return: path to the extracted game folder inside 'temporary'
+        :param extraction_cache: cache the archives are extracted into; a default one is created on first use
         """
-        if os.path.exists(TEMP_FOLDER):
-            shutil.rmtree(TEMP_FOLDER)
-        os.makedirs(TEMP_FOLDER)
+        self._extraction_cache: Optional[ExtractionCache] = extraction_cache
+
+    @property
+    def extraction_cache(self) -> ExtractionCache:
+        if self._extraction_cache is None:
+            self._extraction_cache = ExtractionCache()
+        return self._extraction_cache
 
-        with zipfile.ZipFile(zip_path, 'r') as zf:
-            zf.extractall(TEMP_FOLDER)
+    @traced("extract_game", "storage")
+    def _prepare_game_folder(self, zip_path: str) -> str:
+        """
+        Gives a folder with the extracted contents of the given zip archive. The archive is only extracted the first
+        time its contents are seen; replaying the same game reuses the cached folder.
+        :param zip_path: path to the zipped game folder
+        :return: path to the extracted game folder inside the extraction cache
+        """
+        return self.extraction_cache.extract(zip_path)
 
-        # If the zip contained a single top-level folder, return that folder
-        extracted = os.listdir(TEMP_FOLDER)
-        if len(extracted) == 1 and os.path.isdir(os.path.join(TEMP_FOLDER, extracted[0])):
-            return os.path.join(TEMP_FOLDER, extracted[0])
-        return TEMP_FOLDER
+    def release(self, game_folder: str):
+        """
+        Tells the extraction cache that the game folder given by load_graph is no longer used, so it may be evicted.
+        """
+        self.extraction_cache.release(game_folder)
 
+    @traced("load_graph", "storage")
     def load_graph(self, game_zip: str) -> tuple[Node, str]:
         """
         Loads the graph from a zipped game folder and reconstructs the game structure.
         The zip should contain a graph.json file and corresponding audio files.
+        The game folder is kept in the extraction cache until release() is called with it.
         :param game_zip: path to the zipped game folder
-        :return:
+        :return: the root node and the extracted game folder
+        """
+        game_folder = self._prepare_game_folder(game_zip)
+
+        def read_file(filename: str) -> Optional[bytes]:
+            path = os.path.join(game_folder, filename)
+            if not os.path.exists(path):
+                return None
+            with open(path, 'rb') as file:
+                return file.read()
+
+        def open_binary_graph(block_signatures: Optional[BlockSignatures]) -> Optional[MappedBinaryGraph]:
+            path = os.path.join(game_folder, config.BINARY_GRAPH_FILENAME)
+            return MappedBinaryGraph(path, block_signatures=block_signatures) if os.path.exists(path) else None
+
+        try:
+            root = self._load_root(read_file, open_binary_graph)
+        except BaseException:
+            self.release(game_folder)
+            raise
+        return root, game_folder
+
+    @traced("load_graph_lazy", "storage")
+    def load_graph_lazy(self, game_zip: str) -> tuple[Node, GameArchive]:
+        """
+        Loads only the graph from a zipped game folder, reading graph.json straight out of the archive. Nothing is
+        extracted to disk; the audio files stay in the archive and can be opened on demand through the returned
+        GameArchive (e.g. archive.audio(node.audio_filename)).
+        :param game_zip: path to the zipped game folder
+        :return: the root node and the archive view
+        """
+        archive = GameArchive(game_zip)
+
+        def open_binary_graph(block_signatures: Optional[BlockSignatures]) -> Optional[MappedBinaryGraph]:
+            if archive.binary_graph_member is None:
+                return None
+            return archive.open_binary_graph(block_signatures)
+
+        root = self._load_root(archive.read_file, open_binary_graph)
+        return root, archive
+
+    def open_binary_graph(self, game_zip: str) -> MappedBinaryGraph:
+        """
+        Memory-maps the binary graph of a zipped game folder without building any nodes, so single nodes can be
+        resolved on demand (e.g. graph.serial_node(graph.root_index)). Close the result when done with it.
+        Games signed in blocks by this installation are verified as their blocks are read, which raises ValueError on a
+        block that was modified; other games are read unverified.
+        :param game_zip: path to the zipped game folder; raises FileNotFoundError if it has no binary graph
+        :return: the mapped binary graph
+        """
+        archive = GameArchive(game_zip)
+        manifest = archive.read_file(config.SIGNATURE_FILENAME)
+        schema_version, _ = integrity.read_manifest(manifest)
+        block_signatures = integrity.read_block_signatures(manifest).get(config.BINARY_GRAPH_FILENAME) \
+            if schema_version == SCHEMA_VERSION else None
+        return archive.open_binary_graph(block_signatures)
+
+    @traced("build_graph", "storage")
+    def _load_root(self, read_file: Callable[[str], Optional[bytes]],
+                   open_binary_graph: Callable[[Optional[BlockSignatures]], Optional[MappedBinaryGraph]]) -> Node:
+        """
+        Picks the fastest safe way to rebuild the graph. Games signed by this installation with the current schema are
+        trusted: their binary graph is used if present, otherwise graph.json is decoded without validation. Anything
+        else (older games, games from elsewhere, modified files) goes through strict pydantic validation.
+        :param read_file: reads a file of the game folder, giving None if it does not exist
+        :param open_binary_graph: maps the binary graph (verifying the given block signatures as it is read), giving None
+        if the game has none
+        :return: the root node
+        """
+        manifest = read_file(config.SIGNATURE_FILENAME)
+        schema_version, signatures = integrity.read_manifest(manifest)
+        trusted = schema_version == SCHEMA_VERSION
+
+        if trusted and config.BINARY_GRAPH_FILENAME in signatures:
+            root = self._build_graph_from_binary(
+                open_binary_graph, signatures[config.BINARY_GRAPH_FILENAME],
+                integrity.read_block_signatures(manifest).get(config.BINARY_GRAPH_FILENAME))
+            if root is not None:
+                return root
+
+        graph_json = read_file(config.GRAPH_FILENAME)
+        if graph_json is None:
+            raise FileNotFoundError(f"No {config.GRAPH_FILENAME} found in the game")
+        if trusted and integrity.verify(graph_json, signatures.get(config.GRAPH_FILENAME)):
+            return self._build_graph_trusted(graph_json)
+        return self._build_graph(decode_graph_json(graph_json))
+
+    def _build_graph_from_binary(self, open_binary_graph: Callable[[Optional[BlockSignatures]],
+                                                                  Optional[MappedBinaryGraph]],
+                                 signature: str, block_signatures: Optional[BlockSignatures]) -> Optional[Node]:
+        """
+        Builds the connected nodes from a binary graph, checking its signature. With block signatures, each block is
+        verified as it is read instead of hashing the whole file up front (games saved before blocks were signed).
+        :param open_binary_graph: maps the binary graph
+        :param signature: the binary graph's signature from the manifest
+        :param block_signatures: the binary graph's block signatures from the manifest, if it has any
+        :return: the root node, or None if there is no valid binary graph (the caller falls back to graph.json)
+        """
+        try:
+            mapped_graph = open_binary_graph(block_signatures)
+            if mapped_graph is None:
+                return None
+            with mapped_graph as binary_graph:
+                if block_signatures is None and not integrity.verify(mapped_graph.data, signature):
+                    print("Binary graph signature does not match, loading graph.json instead")
+                    return None
+                return binary_graph.to_nodes()
+        except ValueError as e:
+            print(f"Ignoring unreadable binary graph, loading graph.json instead: {e}")
+            return None
+
+    def _build_graph_trusted(self, graph_json: bytes) -> Node:
         """
-        game_folder = self._prepare_temp_folder(game_zip)
+        Rebuilds the nodes from a trusted graph.json with a plain JSON decode, skipping pydantic validation.
+        Only for graphs whose signature was verified: malformed input is not checked for.
+        :param graph_json: contents of a signed graph.json file
+        :return: the root node
+        """
+        serial_nodes: dict[str, dict] = json.loads(graph_json)["nodes"]
+
+        # works on the store directly: no node views are created while loading
+        store: GraphStore = GraphStore()
+        store_ids: dict[int, int] = {}
+        for node_id, serial_node in serial_nodes.items():
+            store_ids[int(node_id)] = store.add_node(
+                serial_node["text"], serial_node["left_option"], serial_node["right_option"],
+                serial_node["audio_filename"], serial_node["is_win"],
+            )
 
-        graph_path = os.path.join(game_folder, "graph.json")
-        with open(graph_path, 'r') as file:
-            serial_graph: SerialGraph = SerialGraph.model_validate_json(file.read().strip())
+        for node_id, serial_node in serial_nodes.items():
+            store_id = store_ids[int(node_id)]
+            for gesture, adjacent_node_id in serial_node["adjacency_list"].items():
+                store.set_successor(store_id, GESTURES_BY_VALUE[gesture], store_ids[adjacent_node_id])
+        return Node.view(store, 0)
+
+    def _build_graph(self, graph_json: str) -> Node:
+        """
+        Parses the graph JSON with strict validation and reconstructs the connected nodes.
+        :param graph_json: contents of a graph.json file
+        :return: the root node
+        """
+        serial_graph: SerialGraph = SerialGraph.model_validate_json(graph_json.strip(), strict=True)
 
         root, nodes = self._load_nodes(serial_graph)
         self._establish_connections(serial_graph, nodes)
-
-        return root, game_folder
+        return root
 
 
     def _load_nodes(self, serial_graph: SerialGraph) -> tuple[Node, dict[int, Node]]:
         """
-        Load nodes without connections. Gives back the root node and a dictionary of all nodes.
+        Load nodes without connections into a new graph store. Gives back the root node and a dictionary of all nodes,
+        keyed by their ID in the file (nodes get new, dense IDs in the store).
         :param serial_graph:
         :return:
         """
+        store: GraphStore = GraphStore()
         root: Node | None = None
         nodes: dict[int, Node] = {}
         for node_id, serial_node in serial_graph.nodes.items():
             node: Node = Node(
                 serial_node.text,
                 serial_node.left_option,
-                serial_node.right_option
+                serial_node.right_option,
+                store
             )
-            node.id = int(node_id)
             node.audio_filename = serial_node.audio_filename
             node.is_win = serial_node.is_win
-            nodes[node.id] = node
+            nodes[int(node_id)] = node
             if root is None:
                 root = node
         return root, nodes
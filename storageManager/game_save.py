@@ -1,12 +1,38 @@
+import itertools
+import json
 import os
+import shutil
 import tempfile
+import threading
+import time
+import uuid
 import zipfile
+from contextlib import closing
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional
 
-from . import config
-from graph import Node
-from graph.serial_graph import SerialGraph
+from . import config, integrity
+from .audio_codec import AudioCodec
+from .game_archive import GameArchive
+from .speech_cache import SpeechCache, SpeechCacheReport
+from .zip_utils import copy_member_raw, zip_compress_type
+from graph import GraphStore, Node
+from graph.analysis import GraphReport, GraphValidationError, analyze_graph
+from graph.binary_graph import BinaryGraphWriter
+from graph.serial_graph import SerialGraph, SCHEMA_VERSION
 from graph.serial_node import SerialNode
 from text2speech import Talker
+from text2speech.synthesis_pool import SynthesisJob, SynthesisPool, SynthesisProgress
+from tracing import count, span, traced
+
+NARRATION_DESCRIPTION = "A calm and soothing narration voice"
+
+ProgressCallback = Callable[[SynthesisProgress], None]
+
+
+class SaveCancelled(Exception):
+    """
+    Raised by GameSaver.save_game when saving is cancelled through its cancel_event.
+    """
 
 
 class GameSaver:
@@ -14,34 +40,95 @@ class GameSaver:
     Class responsible for saving the game into a zipped game folder (containing the graph and corresponding audio files).
     """
 
-    def save_game(self, path_to_save: str, game_name: str, root: Node):
+    def __init__(self, speech_cache: Optional[SpeechCache] = None, workers: int = config.TTS_WORKERS,
+                 torch_threads: Optional[int] = config.TTS_TORCH_THREADS,
+                 audio_codec: AudioCodec = AudioCodec(config.AUDIO_CODEC),
+                 talker_factory: Callable[[], Talker] = Talker):
+        """
+        :param speech_cache: cache of previously synthesized narration; a default one is created on first use
+        :param workers: number of processes synthesizing audio; 1 synthesizes in this process
+        :param torch_threads: torch threads per worker process; None shares the CPU cores evenly between workers
+        :param audio_codec: codec the node audio is written with
+        :param talker_factory: creates the Talker that synthesizes the narration (e.g. a stand-in for benchmarks; the
+        worker processes always use a real Talker)
+        """
+        self._speech_cache: Optional[SpeechCache] = speech_cache
+        self.audio_codec: AudioCodec = audio_codec
+        self.workers: int = workers
+        self.torch_threads: Optional[int] = torch_threads
+        self.talker_factory: Callable[[], Talker] = talker_factory
+        # hit/miss report of the speech cache for the last save
+        self.last_audio_report: Optional[SpeechCacheReport] = None
+        # problems found in the graph of the last save that did not stop it (e.g. unreachable nodes)
+        self.last_graph_warnings: list[str] = []
+
+    @property
+    def speech_cache(self) -> SpeechCache:
+        if self._speech_cache is None:
+            self._speech_cache = SpeechCache()
+        return self._speech_cache
+
+    @traced("save_game", "storage")
+    def save_game(self, path_to_save: str, game_name: str, root: Node, incremental: bool = True,
+                  progress_callback: Optional[ProgressCallback] = None,
+                  cancel_event: Optional[threading.Event] = None) -> str:
         """
         Saves the game to the given path as a zip archive. Only the zip file is written to path_to_save;
         a temporary directory is used for staging and is removed afterwards.
+        If the game was saved before, the existing archive is diffed against the new graph: audio of nodes whose
+        narration did not change is carried over byte-for-byte and only new or changed nodes are synthesized.
+        The new archive is written next to the old one and swapped in atomically once it is complete.
         :param path_to_save: the directory where the game zip should be created
         :param game_name: the name of the game, which will be used as the name of the zip file
         :param root: the root node of the graph representing the game
-        :return:
+        :param incremental: reuse the audio already in an existing archive at the same path
+        :param progress_callback: called with a SynthesisProgress event after the audio of every node is ready
+        :param cancel_event: when set (e.g. from another thread), the save stops with SaveCancelled and leaves no partial
+        output behind; an existing archive at the same path is left untouched. Synthesizing in this process, the batch
+        being generated (up to config.TTS_BATCH_SIZE nodes) is finished first; worker processes are stopped right away
+        :return: path of the written game zip
         """
         zip_path: str = os.path.join(path_to_save, game_name + config.FILE_EXTENSION)
 
         self._check_zip_path(zip_path)
+        self.last_graph_warnings = self._check_graph(root) if config.CHECK_GRAPH_BEFORE_SAVE else []
 
         with tempfile.TemporaryDirectory() as tmp_dir:
             stage_path: str = os.path.join(tmp_dir, game_name)
             os.makedirs(os.path.join(stage_path, "audio"))
 
-            serialized_graph: SerialGraph = self._serialize_graph(root)
-            self.save_graph(stage_path, serialized_graph)
-            self._generate_audio(serialized_graph, stage_path)
+            audio_filenames: dict[int, str] = {}
+            carried_audio: dict[str, str] = {}
+            previous_archive_error: Optional[str] = None
+            if incremental and os.path.exists(zip_path):
+                try:
+                    audio_filenames, carried_audio = self._reuse_previous_audio(zip_path, root)
+                except Exception as e:
+                    # an unreadable previous archive is replaced by a full save
+                    previous_archive_error = str(e)
+            unchanged_nodes: list[int] = list(audio_filenames)
+            total: int = sum(1 for node_id in self._iter_node_ids(root) if node_id not in audio_filenames)
+
+            narrations = self._iter_narrations(root, audio_filenames, carried_audio)
+            report = self._generate_audio(narrations, total, stage_path, progress_callback, cancel_event)
+            report.carried = unchanged_nodes
+            report.previous_archive_error = previous_archive_error
+
+            self._check_cancelled(cancel_event)
+            self._zip_folder_to(stage_path, zip_path, root, audio_filenames,
+                                zip_path if carried_audio else None, carried_audio)
 
-            self._zip_folder_to(stage_path, zip_path)
+        return zip_path
+
+    def _check_cancelled(self, cancel_event: Optional[threading.Event]):
+        if cancel_event is not None and cancel_event.is_set():
+            raise SaveCancelled("Saving was cancelled.")
 
 
     def _check_zip_path(self, zip_path: str):
         """
-        Ensures the destination zip path is available. If a valid game zip already exists it is removed so it can be
-        overwritten. If an unrelated file occupies the path, an exception is raised.
+        Ensures the destination zip path is available. A valid game zip already at the path is kept until the new
+        archive replaces it. If an unrelated file occupies the path, an exception is raised.
         :param zip_path: full path to the target zip file
         :return:
         """
@@ -51,24 +138,108 @@ class GameSaver:
                     f"A file '{zip_path}' already exists but is not a valid game zip. "
                     "Please choose a different name or delete the existing file."
                 )
-            os.remove(zip_path)
 
 
-    def _zip_folder_to(self, folder_path: str, zip_path: str):
+    @traced("check_graph", "storage")
+    def _check_graph(self, root: Node) -> list[str]:
+        """
+        Makes sure the game can be won from every reachable node, so a broken game fails before any audio is generated.
+        Raises GraphValidationError otherwise.
+        :param root: the root node of the graph
+        :return: the problems found that do not stop the game from being played
+        """
+        def describe(node_id: int) -> str:
+            return f'"{Node.view(root.store, node_id).getText()[:40]}"'
+
+        report: GraphReport = analyze_graph(root)
+        if not report.is_playable:
+            raise GraphValidationError(report, describe)
+        return report.warnings(describe)
+
+
+    @traced("reuse_previous_audio", "storage")
+    def _reuse_previous_audio(self, zip_path: str, root: Node) -> tuple[dict[int, str], dict[str, str]]:
         """
-        Writes the contents of folder_path into a new zip archive at zip_path.
+        Matches the nodes of the new graph against the graph stored in the existing archive by their narration. Nodes
+        whose narration is unchanged are pointed at the audio file already in the archive.
+        Matching by narration instead of by node ID also carries over the audio of nodes whose ID changed (e.g. after a
+        node before them was deleted in the editor) and of new nodes that repeat an existing narration.
+        Raises an exception if the existing archive cannot be read.
+        :param zip_path: path to the existing game zip
+        :param root: the root node of the new graph
+        :return: node ID -> audio filename of the unchanged nodes, and audio filename -> name of the member holding it
+        in the existing archive
+        """
+        archive = GameArchive(zip_path)
+        previous_graph = SerialGraph.model_validate_json(archive.read_graph())
+        previous_audio = archive.audio_handles()
+
+        narration_audio: dict[str, str] = {}
+        for previous_node in previous_graph.nodes.values():
+            # audio in another codec is synthesized again, so the whole archive keeps using one codec
+            if previous_node.audio_filename.endswith(self.audio_codec.extension) \
+                    and previous_node.audio_filename in previous_audio:
+                narration_audio[self._build_narration(previous_node)] = previous_node.audio_filename
+
+        audio_filenames: dict[int, str] = {}
+        carried_audio: dict[str, str] = {}
+        for serial_node in self._iter_serial_nodes(root):
+            audio_filename = narration_audio.get(self._build_narration(serial_node))
+            if audio_filename is not None:
+                audio_filenames[serial_node.id] = audio_filename
+                carried_audio[audio_filename] = previous_audio[audio_filename].member_name
+        return audio_filenames, carried_audio
+
+
+    @traced("zip_game", "storage")
+    def _zip_folder_to(self, folder_path: str, zip_path: str, root: Node, audio_filenames: dict[int, str],
+                       previous_zip_path: Optional[str] = None, carried_audio: Optional[dict[str, str]] = None):
+        """
+        Writes the graph of root and the contents of folder_path into a new zip archive at zip_path.
         The archive entries are relative to folder_path's parent so the game name
         is preserved as the top-level folder inside the zip.
+        The graph files are streamed straight into their archive members, without being staged on disk.
+        The archive is written to a temporary file in the same directory and then moved over zip_path, so an existing
+        archive is only replaced by a complete one.
         :param folder_path: the staging folder to zip
         :param zip_path: destination zip file path
+        :param root: the root node of the graph
+        :param audio_filenames: node ID -> audio filename, for nodes whose audio is carried over
+        :param previous_zip_path: archive the carried over audio members are copied from
+        :param carried_audio: audio filename -> member in previous_zip_path, copied without recompression
         :return:
         """
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
-            for dirpath, _, filenames in os.walk(folder_path):
-                for filename in filenames:
-                    file_full_path = os.path.join(dirpath, filename)
-                    arcname = os.path.relpath(file_full_path, os.path.dirname(folder_path))
-                    zf.write(file_full_path, arcname)
+        game_name = os.path.basename(folder_path)
+        tmp_path = f"{zip_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+                def open_member(filename: str) -> BinaryIO:
+                    member = zipfile.ZipInfo("/".join((game_name, filename)), date_time=time.localtime()[:6])
+                    member.compress_type = zip_compress_type(filename)
+                    return zf.open(member, 'w')
+
+                self._write_graph(open_member, root, audio_filenames)
+
+                with span("zip_audio", "storage") as zip_span:
+                    for dirpath, _, filenames in os.walk(folder_path):
+                        for filename in filenames:
+                            file_full_path = os.path.join(dirpath, filename)
+                            arcname = os.path.relpath(file_full_path, os.path.dirname(folder_path))
+                            zf.write(file_full_path, arcname, zip_compress_type(filename))
+                            count("zip.files")
+                    zip_span.set("files", len(zf.infolist()))
+
+                if carried_audio:
+                    with span("copy_carried_audio", "storage", files=len(carried_audio)), \
+                            zipfile.ZipFile(previous_zip_path, 'r') as previous_zf:
+                        for audio_filename, member_name in carried_audio.items():
+                            arcname = "/".join((game_name, "audio", audio_filename))
+                            copy_member_raw(previous_zf, zf, previous_zf.getinfo(member_name), arcname)
+
+            os.replace(tmp_path, zip_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
     def _is_game_zip(self, path: str) -> bool:
         """
@@ -86,37 +257,135 @@ class GameSaver:
             return has_graph and has_audio
 
 
-    def save_graph(self, path_to_save: str, serialized_graph: SerialGraph):
+    def save_graph(self, path_to_save: str, root: Node, audio_filenames: Optional[dict[int, str]] = None):
         """
-        Saves the graph to a JSON file.
+        Saves the graph to a JSON file, and (if enabled in the config) to the compact binary graph file next to it,
+        together with a manifest signing both files.
         :param path_to_save: path to the directory where the graph should be saved
-        :param serialized_graph: the graph in a serialized format (dictionary) to be saved as JSON
+        :param root: the root node of the graph
+        :param audio_filenames: node ID -> audio filename, overriding the default audio filename of those nodes
         :return:
         """
-        graph_path: str = os.path.join(path_to_save, "graph.json")
-        with open(graph_path, 'w') as file:
-            file.write(serialized_graph.model_dump_json(indent=4))
+        self._write_graph(lambda filename: open(os.path.join(path_to_save, filename), 'wb'), root, audio_filenames)
 
 
-    def _serialize_graph(self, root: Node) -> SerialGraph:
+    @traced("write_graph", "storage")
+    def _write_graph(self, open_file: Callable[[str], BinaryIO], root: Node,
+                     audio_filenames: Optional[dict[int, str]] = None):
         """
-        Serializes the graph starting from the root node using DFS. Each node is stored in a dictionary with its ID as
-        the key and its details (text, audio path, adjacency list) as the value. The adjacency list is represented as a
-        dictionary mapping gesture strings to adjacent node IDs.
-        :param root:
-        :return: dictionary of serialized nodes
+        Writes the graph files, streaming the nodes one at a time so the whole graph is never held in memory as
+        serialized nodes or as one big string. Files are signed as they are written.
+        :param open_file: opens a graph file (e.g. "graph.json") for binary writing
+        :param root: the root node of the graph
+        :param audio_filenames: node ID -> audio filename, overriding the default audio filename of those nodes
+        :return:
         """
-        serial_graph: SerialGraph = SerialGraph(nodes={})
+        signatures: dict[str, str] = {}
+        block_signatures: dict[str, integrity.BlockSignatures] = {}
+        binary_writer: Optional[BinaryGraphWriter] = BinaryGraphWriter(root.get_id()) \
+            if config.WRITE_BINARY_GRAPH else None
+        try:
+            with open_file(config.GRAPH_FILENAME) as file:
+                writer = integrity.SigningWriter(file)
+                self._write_graph_json(writer, root, audio_filenames, binary_writer)
+                signatures[config.GRAPH_FILENAME] = writer.signature
 
-        def dfs(node: Node):
-            if node.get_id() in serial_graph.nodes:
-                return
-            serial_graph.nodes[node.get_id()] = self._serialize_node(node)
-            for adjacent_node in node.adjacencyList.values():
-                dfs(adjacent_node)
+            if binary_writer is not None:
+                with open_file(config.BINARY_GRAPH_FILENAME) as file:
+                    # also signed in blocks, so loaders only verify the parts of the graph they read
+                    writer = integrity.SigningWriter(file, config.GRAPH_SIGNATURE_BLOCK_SIZE)
+                    binary_writer.write_to(writer)
+                    signatures[config.BINARY_GRAPH_FILENAME] = writer.signature
+                    block_signatures[config.BINARY_GRAPH_FILENAME] = writer.block_signatures
+        finally:
+            if binary_writer is not None:
+                binary_writer.close()
 
-        dfs(root)
-        return serial_graph
+        # signed so this installation can load the graph again without re-validating it
+        with open_file(config.SIGNATURE_FILENAME) as file:
+            file.write(integrity.create_manifest(SCHEMA_VERSION, signatures, block_signatures).encode("utf-8"))
+
+
+    def _write_graph_json(self, file: integrity.SigningWriter, root: Node, audio_filenames: Optional[dict[int, str]],
+                          binary_writer: Optional[BinaryGraphWriter] = None):
+        """
+        Writes graph.json one node record at a time, in the layout of SerialGraph. The root is the first node.
+        :param file: binary file to write to
+        :param root: the root node of the graph
+        :param audio_filenames: node ID -> audio filename, overriding the default audio filename of those nodes
+        :param binary_writer: if given, every node is also added to it
+        :return:
+        """
+        file.write(f'{{"schema_version": {SCHEMA_VERSION}, "nodes": {{'.encode("utf-8"))
+        separator = "\n    "
+        for serial_node in self._iter_serial_nodes(root, audio_filenames):
+            file.write(f'{separator}"{serial_node.id}": {serial_node.model_dump_json()}'.encode("utf-8"))
+            separator = ",\n    "
+            if binary_writer is not None:
+                binary_writer.add(serial_node)
+        file.write(f'\n}}, "audio_codec": {json.dumps(self.audio_codec.value)}}}\n'.encode("utf-8"))
+
+
+    def _iter_node_ids(self, root: Node) -> Iterator[int]:
+        """
+        Traverses the graph starting from the root node, yielding the node IDs in DFS preorder (the root first). The
+        traversal keeps an explicit stack instead of recursing, so stories of any depth can be saved.
+        :param root: the root node of the graph
+        :return: iterator of node IDs, each node exactly once
+        """
+        store: GraphStore = root.store
+        visited: bytearray = bytearray(len(store))
+        # one iterator over the adjacent node IDs per node on the current path
+        stack: list[Iterator[int]] = [iter((root.get_id(),))]
+        while stack:
+            node_id: Optional[int] = next(stack[-1], None)
+            if node_id is None:
+                stack.pop()
+                continue
+            if visited[node_id]:
+                continue
+            visited[node_id] = 1
+
+            yield node_id
+            stack.append(target_id for _, target_id in store.successors(node_id))
+
+
+    def _iter_serial_nodes(self, root: Node, audio_filenames: Optional[dict[int, str]] = None) -> Iterator[SerialNode]:
+        """
+        Serializes the graph starting from the root node, yielding the nodes one at a time in the order of
+        _iter_node_ids.
+        :param root: the root node of the graph
+        :param audio_filenames: node ID -> audio filename, overriding the default audio filename of those nodes
+        :return: iterator of serialized nodes, each node exactly once
+        """
+        store: GraphStore = root.store
+        for node_id in self._iter_node_ids(root):
+            serial_node = self._serialize_node(Node.view(store, node_id))
+            if audio_filenames and node_id in audio_filenames:
+                serial_node.audio_filename = audio_filenames[node_id]
+            yield serial_node
+
+
+    def _iter_narrations(self, root: Node, audio_filenames: dict[int, str],
+                         carried_audio: dict[str, str]) -> Iterator[tuple[int, str, str]]:
+        """
+        Yields the nodes that still need audio one at a time, serializing each only when it is reached, so the nodes
+        to synthesize are never all held in memory.
+        A new node that would take the audio filename of a carried over one gets a free filename, added to
+        audio_filenames.
+        :param root: the root node of the graph
+        :param audio_filenames: node ID -> audio filename of the nodes whose audio is carried over; they are skipped
+        :param carried_audio: audio filename -> member in the previous archive, of the carried over audio
+        :return: iterator of (node ID, narration, audio filename)
+        """
+        for serial_node in self._iter_serial_nodes(root):
+            if serial_node.id in audio_filenames:
+                continue
+            # node IDs are reused between saves, so a new node must not take the file of a carried over one
+            if serial_node.audio_filename in carried_audio:
+                serial_node.audio_filename = self._get_free_audio_filename(serial_node.id, carried_audio)
+                audio_filenames[serial_node.id] = serial_node.audio_filename
+            yield serial_node.id, self._build_narration(serial_node), serial_node.audio_filename
 
 
     def _get_node_audio_filename(self, node_id: int) -> str:
@@ -125,7 +394,20 @@ class GameSaver:
         :param node_id: the ID of the node for which to generate the audio file path
         :return: the file path for the node's audio file
         """
-        return f"node_{node_id}.wav"
+        return f"node_{node_id}{self.audio_codec.extension}"
+
+
+    def _get_free_audio_filename(self, node_id: int, taken: dict[str, str]) -> str:
+        """
+        Gives an audio filename for the node that is not one of the taken filenames.
+        :param node_id: the ID of the node
+        :param taken: filenames already in use (as keys)
+        :return: the first free name of node_<id>_1, node_<id>_2, ...
+        """
+        suffix = 1
+        while f"node_{node_id}_{suffix}{self.audio_codec.extension}" in taken:
+            suffix += 1
+        return f"node_{node_id}_{suffix}{self.audio_codec.extension}"
 
 
     def _serialize_node(self, node: Node) -> SerialNode:
@@ -145,26 +427,141 @@ class GameSaver:
         )
 
 
-    def _generate_audio(self, serial_graph: SerialGraph, game_path: str):
+    def _build_narration(self, serial_node: SerialNode) -> str:
+        """
+        Builds the full text spoken for a node: its text followed by the options and how to choose them.
+        :param serial_node: the node to narrate
+        :return: the narration text
+        """
+        text_parts = [serial_node.text]
+        if serial_node.left_option or serial_node.right_option:
+            text_parts.append("...You have two options.")
+        if serial_node.left_option:
+            text_parts.append(f"Do {serial_node.left_option} by raising your left hand.")
+        if serial_node.right_option:
+            text_parts.append(f"Do {serial_node.right_option} by raising your right hand.")
+
+        return " ".join(text_parts).strip()
+
+
+    @traced("generate_audio", "tts")
+    def _generate_audio(self, narrations: Iterable[tuple[int, str, str]], total: int, game_path: str,
+                        progress_callback: Optional[ProgressCallback] = None,
+                        cancel_event: Optional[threading.Event] = None) -> SpeechCacheReport:
         """
         Generates audio files for each node in the graph using the Talker class. The audio files are saved in the specified
-        audio directory with filenames corresponding to their node IDs.
-        :param serial_graph: the serialized graph containing all nodes for which audio needs to be generated
-        :return:
+        audio directory with filenames corresponding to their node IDs. Narration that was synthesized before (by any
+        save of any game) is taken from the speech cache instead of being synthesized again, and narration shared by
+        several nodes is synthesized once.
+        With more than one worker, the remaining nodes are synthesized on a pool of worker processes.
+        The narrations are consumed as synthesis goes on, so only the nodes being synthesized are held in memory.
+        :param narrations: (node ID, narration, audio filename) of every node for which audio needs to be generated
+        :param total: the number of narrations, for the progress events
+        :param progress_callback: called with a SynthesisProgress event after every node
+        :param cancel_event: checked between batches of up to config.TTS_BATCH_SIZE nodes (and between nodes taken from
+        the cache); raises SaveCancelled once it is set
+        :return: hit/miss report of the speech cache
+        """
+        report: SpeechCacheReport = SpeechCacheReport()
+        self.last_audio_report = report
+        if total == 0:
+            return report
+
+        talker: Talker = self.talker_factory()
+        description: str = NARRATION_DESCRIPTION
+        sampling_rate: int = talker.sampling_rate
+        completed: int = 0
+
+        # cache key and output file of the jobs not finished yet
+        cache_keys: dict[int, str] = {}
+        outputs: dict[int, str] = {}
+        # cache key -> (node ID, output file) of the other nodes with the same narration as the job synthesizing it
+        duplicates: dict[str, list[tuple[int, str]]] = {}
+
+        def iter_jobs() -> Iterator[SynthesisJob]:
+            nonlocal completed
+            for node_id, full_text, audio_filename in narrations:
+                self._check_cancelled(cancel_event)
+                output_file: str = os.path.join(game_path, "audio", audio_filename)
+
+                cache_key = SpeechCache.key(full_text, description, talker.model_name, sampling_rate)
+                if cache_key in duplicates:
+                    duplicates[cache_key].append((node_id, output_file))
+                    continue
+                # also finds the narration of a job that already finished
+                if self.speech_cache.fetch(cache_key, output_file):
+                    report.hits.append(node_id)
+                    completed += 1
+                    self._report_progress(progress_callback, SynthesisProgress(node_id, completed, total, cached=True))
+                    continue
+
+                cache_keys[node_id] = cache_key
+                outputs[node_id] = output_file
+                duplicates[cache_key] = []
+                yield SynthesisJob(node_id, full_text, output_file)
+
+        if self.workers > 1 and total > 1:
+            pool = SynthesisPool(self.workers, talker.model_name, talker.device, self.torch_threads,
+                                 config.TTS_BATCH_SIZE)
+            events = pool.synthesize(iter_jobs(), description, cancel_event, total)
+        else:
+            events = self._synthesize_in_process(talker, iter_jobs(), description, cancel_event)
+
+        failed: list[int] = []
+        # closed before leaving, also on cancel or error, so no worker still writes into the staging folder once the
+        # caller deletes it
+        with closing(events):
+            for event in events:
+                self._check_cancelled(cancel_event)
+                cache_key = cache_keys.pop(event.node_id)
+                output_file = outputs.pop(event.node_id)
+                if event.error is None:
+                    self.speech_cache.store(cache_key, output_file)
+                    report.misses.append(event.node_id)
+                else:
+                    failed.append(event.node_id)
+                completed += 1
+                event.completed = completed
+                event.total = total
+                self._report_progress(progress_callback, event)
+
+                for node_id, duplicate_file in duplicates.pop(cache_key):
+                    if event.error is None:
+                        if not self.speech_cache.fetch(cache_key, duplicate_file):
+                            shutil.copyfile(output_file, duplicate_file)
+                        report.hits.append(node_id)
+                    else:
+                        failed.append(node_id)
+                    completed += 1
+                    self._report_progress(progress_callback, SynthesisProgress(
+                        node_id, completed, total, cached=event.error is None, error=event.error))
+        self._check_cancelled(cancel_event)
+
+        if failed:
+            raise RuntimeError(f"Audio synthesis failed for {len(failed)} node(s): {failed}")
+        return report
+
+
+    def _synthesize_in_process(self, talker: Talker, jobs: Iterable[SynthesisJob], description: str,
+                               cancel_event: Optional[threading.Event] = None) -> Iterator[SynthesisProgress]:
         """
-        talker: Talker = Talker()
-        description: str = "A calm and soothing narration voice"
-
-        for node_id, serial_node in serial_graph.nodes.items():
-            text_parts = [serial_node.text]
-            if serial_node.left_option or serial_node.right_option:
-                text_parts.append("...You have two options.")
-            if serial_node.left_option:
-                text_parts.append(f"Do {serial_node.left_option} by raising your left hand.")
-            if serial_node.right_option:
-                text_parts.append(f"Do {serial_node.right_option} by raising your right hand.")
-            
-            full_text = " ".join(text_parts).strip()
-            output_file: str = os.path.join(game_path, "audio", self._get_node_audio_filename(node_id))
-
-            talker.generate_speech(full_text, description, output_file)
+        Synthesizes the jobs on the given talker, one batch at a time, yielding progress after each batch. Jobs are
+        taken from the iterable one batch at a time.
+        """
+        completed = 0
+        remaining_jobs: Iterator[SynthesisJob] = iter(jobs)
+        while True:
+            self._check_cancelled(cancel_event)
+            batch = list(itertools.islice(remaining_jobs, config.TTS_BATCH_SIZE))
+            if not batch:
+                return
+            talker.generate_speech_batch([(job.text, job.output_file) for job in batch], description,
+                                         config.TTS_BATCH_SIZE)
+            for job in batch:
+                completed += 1
+                yield SynthesisProgress(job.node_id, completed, completed)
+
+
+    def _report_progress(self, progress_callback: Optional[ProgressCallback], progress: SynthesisProgress):
+        if progress_callback is not None:
+            progress_callback(progress)
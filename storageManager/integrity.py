@@ -0,0 +1,215 @@
+import hashlib
+import hmac
+import json
+import math
+import os
+import secrets
+from typing import BinaryIO, Optional, Union
+
+from . import config
+
+Data = Union[bytes, memoryview]
+# block size, and the signature of every block of a file
+BlockSignatures = tuple[int, list[str]]
+
+
+def _signing_key(create: bool) -> Optional[bytes]:
+    """
+    Reads this installation's signing key, creating it if asked to and it does not exist yet.
+    """
+    try:
+        with open(config.SIGNING_KEY_PATH, 'rb') as file:
+            return file.read()
+    except FileNotFoundError:
+        if not create:
+            return None
+
+    os.makedirs(os.path.dirname(config.SIGNING_KEY_PATH), exist_ok=True)
+    key = secrets.token_bytes(32)
+    try:
+        # O_EXCL so two processes creating the key at once agree on a single key
+        fd = os.open(config.SIGNING_KEY_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(config.SIGNING_KEY_PATH, 'rb') as file:
+            return file.read()
+    with os.fdopen(fd, 'wb') as file:
+        file.write(key)
+    return key
+
+
+def signer() -> hmac.HMAC:
+    """
+    Incremental signer with this installation's key, for data that is written in pieces. hexdigest() gives the same
+    signature sign() would give for all the data passed to update().
+    """
+    return hmac.new(_signing_key(create=True), digestmod=hashlib.sha256)
+
+
+def sign(data: Data) -> str:
+    """
+    Signs data with this installation's key.
+    :return: hex HMAC-SHA256 of the data
+    """
+    data_signer = signer()
+    data_signer.update(data)
+    return data_signer.hexdigest()
+
+
+def _block_signer(key: bytes, block_index: int) -> hmac.HMAC:
+    # the index is signed with the block, so blocks cannot be swapped
+    return hmac.new(key, block_index.to_bytes(8, "little"), hashlib.sha256)
+
+
+class SigningWriter:
+    """
+    Wraps a binary file so that everything written to it is signed on the way, as a whole and optionally also in
+    fixed-size blocks (see BlockVerifier).
+    """
+
+    def __init__(self, file: BinaryIO, block_size: Optional[int] = None):
+        """
+        :param block_size: also sign every block of this many bytes on its own; None to sign the whole file only
+        """
+        self.file = file
+        self._signer = signer()
+        self.block_size: Optional[int] = block_size
+        self._key: bytes = _signing_key(create=True)
+        self._block_signatures: list[str] = []
+        # signer of the block being written and how many of its bytes were written so far
+        self._block_signer: Optional[hmac.HMAC] = None
+        self._block_filled: int = 0
+
+    def write(self, data: Data) -> int:
+        self._signer.update(data)
+        if self.block_size:
+            self._sign_blocks(memoryview(data))
+        return self.file.write(data)
+
+    def _sign_blocks(self, data: memoryview):
+        while data:
+            if self._block_signer is None:
+                self._block_signer = _block_signer(self._key, len(self._block_signatures))
+                self._block_filled = 0
+            taken = min(len(data), self.block_size - self._block_filled)
+            self._block_signer.update(data[:taken])
+            self._block_filled += taken
+            data = data[taken:]
+            if self._block_filled == self.block_size:
+                self._block_signatures.append(self._block_signer.hexdigest())
+                self._block_signer = None
+
+    @property
+    def block_signatures(self) -> Optional[BlockSignatures]:
+        """
+        Block size and signature of every block written so far (the last one may be partial), None if not signing
+        blocks.
+        """
+        if not self.block_size:
+            return None
+        partial = [self._block_signer.hexdigest()] if self._block_signer is not None else []
+        return self.block_size, self._block_signatures + partial
+
+    @property
+    def signature(self) -> str:
+        """
+        Signature of everything written so far.
+        """
+        return self._signer.hexdigest()
+
+
+def verify(data: Data, signature: Optional[str]) -> bool:
+    """
+    Checks that data was signed with this installation's key, i.e. that it was written by us and not modified since.
+    """
+    if not signature:
+        return False
+    key = _signing_key(create=False)
+    if key is None:
+        return False
+    return hmac.compare_digest(hmac.new(key, data, hashlib.sha256).hexdigest(), signature)
+
+
+class BlockVerifier:
+    """
+    Checks data signed in blocks by a SigningWriter lazily: a block is verified the first time a range in it is read,
+    so reading a few records of a large memory-mapped file only hashes the blocks they are in.
+    """
+
+    def __init__(self, data: Data, block_signatures: BlockSignatures):
+        """
+        :param data: the signed data
+        :param block_signatures: block size and block signatures from the manifest; raises ValueError if they do not
+        cover the data or there is no signing key
+        """
+        self.block_size, self._signatures = block_signatures
+        if self.block_size <= 0 or len(self._signatures) != math.ceil(len(data) / self.block_size):
+            raise ValueError("Block signatures do not match the size of the data")
+        self._key: Optional[bytes] = _signing_key(create=False)
+        if self._key is None:
+            raise ValueError("No signing key to verify the data with")
+        self._data = data
+        self._verified = bytearray(len(self._signatures))
+
+    def check(self, start: int, end: int):
+        """
+        Verifies the blocks holding data[start:end] that were not verified yet. Raises ValueError if one does not match
+        its signature, or if the range is not inside the data.
+        """
+        if not 0 <= start < end <= len(self._data):
+            raise ValueError(f"Range {start}:{end} is outside the signed data")
+        for block in range(start // self.block_size, (end - 1) // self.block_size + 1):
+            if self._verified[block]:
+                continue
+            block_signer = _block_signer(self._key, block)
+            block_signer.update(self._data[block * self.block_size:(block + 1) * self.block_size])
+            if not hmac.compare_digest(block_signer.hexdigest(), self._signatures[block]):
+                raise ValueError(f"Signature of block {block} does not match")
+            self._verified[block] = 1
+
+
+def create_manifest(schema_version: int, signatures: dict[str, str],
+                    block_signatures: Optional[dict[str, BlockSignatures]] = None) -> str:
+    """
+    Builds the signature manifest stored next to the graph.
+    :param schema_version: schema version of the signed graph
+    :param signatures: file name -> signature of every signed file
+    :param block_signatures: file name -> block signatures of the files also signed in blocks
+    :return: the manifest as JSON
+    """
+    manifest = {"schema_version": schema_version, "signatures": signatures}
+    if block_signatures:
+        manifest["block_signatures"] = {
+            filename: {"block_size": block_size, "blocks": blocks}
+            for filename, (block_size, blocks) in block_signatures.items()
+        }
+    return json.dumps(manifest)
+
+
+def read_manifest(manifest_json: Optional[bytes]) -> tuple[Optional[int], dict[str, str]]:
+    """
+    Parses a signature manifest. Missing or malformed manifests give no version and no signatures.
+    :return: schema version and file name -> signature
+    """
+    if not manifest_json:
+        return None, {}
+    try:
+        manifest = json.loads(manifest_json)
+        return int(manifest["schema_version"]), dict(manifest["signatures"])
+    except (ValueError, KeyError, TypeError):
+        return None, {}
+
+
+def read_block_signatures(manifest_json: Optional[bytes]) -> dict[str, BlockSignatures]:
+    """
+    Reads the block signatures of a signature manifest. Manifests written before files were signed in blocks have none.
+    :return: file name -> block signatures
+    """
+    if not manifest_json:
+        return {}
+    try:
+        return {
+            filename: (int(entry["block_size"]), [str(block) for block in entry["blocks"]])
+            for filename, entry in json.loads(manifest_json).get("block_signatures", {}).items()
+        }
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return {}
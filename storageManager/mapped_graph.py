@@ -0,0 +1,79 @@
+import mmap
+import os
+import zipfile
+from typing import Optional
+
+from graph.binary_graph import BinaryGraph
+from .integrity import BlockSignatures, BlockVerifier
+from .zip_utils import member_data_offset
+
+
+class MappedBinaryGraph:
+    """
+    A BinaryGraph read through a read-only memory map of a file. Only the pages that are actually touched get read
+    from disk. Use as a context manager, or call close() when done.
+    """
+
+    def __init__(self, path: str, offset: int = 0, size: Optional[int] = None,
+                 block_signatures: Optional[BlockSignatures] = None):
+        """
+        :param path: file holding the binary graph (a graph.bin file, or a game zip with graph.bin stored uncompressed)
+        :param offset: where the binary graph starts in the file
+        :param size: length of the binary graph; defaults to the rest of the file
+        :param block_signatures: if given, every block of the graph is verified against its signature the first time
+        it is read, and reading a block that does not match raises ValueError
+        """
+        self._file = open(path, 'rb')
+        try:
+            file_size = os.fstat(self._file.fileno()).st_size
+            if size is None:
+                size = file_size - offset
+            if size <= 0 or offset + size > file_size:
+                raise ValueError(f"No binary graph at offset {offset} of {path}")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)[offset:offset + size]
+            verifier = BlockVerifier(self._view, block_signatures) if block_signatures is not None else None
+            self.graph = BinaryGraph(self._view, verifier.check if verifier is not None else None)
+        except BaseException:
+            self.close()
+            raise
+
+    @property
+    def data(self) -> memoryview:
+        """
+        The raw bytes of the binary graph (e.g. to check its signature without copying it).
+        """
+        return self._view
+
+    @staticmethod
+    def from_archive(zip_path: str, member_name: str,
+                     block_signatures: Optional[BlockSignatures] = None) -> 'MappedBinaryGraph':
+        """
+        Maps a binary graph member of a zip archive in place. The member must be stored without compression.
+        :param block_signatures: verify the blocks of the graph as they are read (see __init__)
+        """
+        with zipfile.ZipFile(zip_path, 'r') as zf:
+            info = zf.getinfo(member_name)
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{member_name} is compressed and cannot be memory-mapped")
+            offset = member_data_offset(zf, info)
+        return MappedBinaryGraph(zip_path, offset, info.file_size, block_signatures)
+
+    def close(self):
+        # the memoryviews have to be released before the map can be closed
+        graph = getattr(self, "graph", None)
+        if graph is not None:
+            graph.release()
+        view = getattr(self, "_view", None)
+        if view is not None:
+            view.release()
+        mapped = getattr(self, "_map", None)
+        if mapped is not None:
+            mapped.close()
+        self._file.close()
+
+    def __enter__(self) -> BinaryGraph:
+        return self.graph
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
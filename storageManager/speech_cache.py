@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from . import config
+
+
+@dataclass
+class SpeechCacheReport:
+    """
+    Hit/miss report of the speech cache for one save, and the nodes whose audio was carried over from the archive
+    being replaced.
+    """
+    hits: list[int] = field(default_factory=list)
+    misses: list[int] = field(default_factory=list)
+    carried: list[int] = field(default_factory=list)
+    # why the archive being replaced could not be reused, if it could not
+    previous_archive_error: Optional[str] = None
+
+    def __str__(self):
+        total = len(self.hits) + len(self.misses)
+        lines = [f"TTS cache: {len(self.hits)}/{total} nodes reused, {len(self.misses)} synthesized"]
+        if self.carried:
+            lines.append(f"Incremental save: {len(self.carried)} nodes unchanged, {total} new or changed")
+        if self.previous_archive_error:
+            lines.append(f"Could not read the existing archive, saved everything again: {self.previous_archive_error}")
+        return "\n".join(lines)
+
+
+class SpeechCache:
+    """
+    Persistent, content-addressed store of generated narration audio. An entry is keyed by everything that determines
+    the synthesized audio (the full narration text, the voice description, the TTS model and its sampling rate), so
+    re-saving a game, or saving another game that shares narration, only synthesizes nodes whose narration changed.
+    """
+
+    def __init__(self, cache_folder: str = config.SPEECH_CACHE_FOLDER):
+        """
+        :param cache_folder: directory holding the cached audio files
+        """
+        self.cache_folder = cache_folder
+        os.makedirs(self.cache_folder, exist_ok=True)
+
+    @staticmethod
+    def key(text: str, description: str, model_name: str, sampling_rate: int) -> str:
+        """
+        Computes the cache key of a narration.
+        :param text: the full narration text that is spoken
+        :param description: the voice description given to the TTS model
+        :param model_name: name of the TTS model
+        :param sampling_rate: sampling rate of the generated audio
+        :return: hex digest identifying the narration audio
+        """
+        payload = json.dumps([text, description, model_name, sampling_rate], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str, extension: str) -> str:
+        return os.path.join(self.cache_folder, key[:2], key + extension)
+
+    def fetch(self, key: str, output_file: str) -> bool:
+        """
+        Places the cached audio for the key at output_file, if there is any.
+        :param key: cache key from SpeechCache.key
+        :param output_file: where the audio file should be written
+        :return: True on a cache hit, False on a miss
+        """
+        entry_path = self._entry_path(key, os.path.splitext(output_file)[1])
+        if not os.path.isfile(entry_path):
+            return False
+        try:
+            os.link(entry_path, output_file)
+        except OSError:
+            # e.g. the staging folder is on another file system
+            shutil.copyfile(entry_path, output_file)
+        return True
+
+    def store(self, key: str, audio_file: str):
+        """
+        Adds a freshly generated audio file to the cache. The entry is written under a private name and renamed into
+        place, so a concurrent save never reads a partially written file.
+        :param key: cache key from SpeechCache.key
+        :param audio_file: the generated audio file
+        """
+        entry_path = self._entry_path(key, os.path.splitext(audio_file)[1])
+        if os.path.isfile(entry_path):
+            return
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        tmp_path = f"{entry_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            shutil.copyfile(audio_file, tmp_path)
+            os.replace(tmp_path, entry_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,121 @@
+"""
+Synthetic stories of any size, for measuring how saving, loading, analysing and playing scale. Every generated graph is
+playable (a win can be reached from every node) and has narration of realistic length. Shapes:
+    chain       one long path, node_count deep
+    tree        a complete binary tree
+    dag         layers of up to `width` nodes, each leading to two nodes of the next layer, so subtrees are shared
+    cycles      a path that can also be walked back (the right option returns `loop_length` nodes), so it has cycles
+"""
+
+from typing import Callable
+
+from gesture import EnumGesture
+from graph import GraphStore, Node
+
+LEFT = EnumGesture.ILoveYou_Left
+RIGHT = EnumGesture.ILoveYou_Right
+
+
+def _add_scene(store: GraphStore, index: int, has_left: bool, has_right: bool) -> int:
+    is_win = not has_left and not has_right
+    return store.add_node(
+        f"Scene {index}: the corridor splits and a cold draft blows out of the darkness ahead. Somewhere below, water "
+        f"drips onto stone." if not is_win else f"Scene {index}: daylight at last. You have found the way out.",
+        f"Take the left passage from scene {index}" if has_left else "",
+        f"Take the right passage from scene {index}" if has_right else "",
+        is_win=is_win,
+    )
+
+
+def build_chain(node_count: int) -> Node:
+    """
+    A single path: every node has one choice, the last one is the win.
+    """
+    store = GraphStore()
+    for index in range(node_count):
+        _add_scene(store, index, index + 1 < node_count, False)
+    for index in range(node_count - 1):
+        store.set_successor(index, LEFT, index + 1)
+    return Node.view(store, 0)
+
+
+def build_tree(node_count: int) -> Node:
+    """
+    A complete binary tree in heap order (the children of node i are 2i + 1 and 2i + 2); the leaves are wins.
+    """
+    store = GraphStore()
+    for index in range(node_count):
+        _add_scene(store, index, 2 * index + 1 < node_count, 2 * index + 2 < node_count)
+    for index in range(node_count):
+        for gesture, child in ((LEFT, 2 * index + 1), (RIGHT, 2 * index + 2)):
+            if child < node_count:
+                store.set_successor(index, gesture, child)
+    return Node.view(store, 0)
+
+
+def build_dag(node_count: int, width: int = 16) -> Node:
+    """
+    Layers that double in size from the start node up to width nodes. Node i of a layer leads to nodes 2i and 2i + 1
+    (modulo its size) of the next layer, so once the layers stop growing every node is reached along two paths and
+    subtrees are shared. The last layer holds the wins.
+    """
+    store = GraphStore()
+    layer_sizes = [1]
+    remaining = node_count - 1
+    while remaining > 0:
+        layer_sizes.append(min(width, 2 * layer_sizes[-1], remaining))
+        remaining -= layer_sizes[-1]
+
+    index = 0
+    for layer, size in enumerate(layer_sizes):
+        next_size = layer_sizes[layer + 1] if layer + 1 < len(layer_sizes) else 0
+        for _ in range(size):
+            _add_scene(store, index, next_size > 0, next_size > 1)
+            index += 1
+
+    layer_start = 0
+    for layer, size in enumerate(layer_sizes):
+        next_size = layer_sizes[layer + 1] if layer + 1 < len(layer_sizes) else 0
+        if next_size:
+            next_start = layer_start + size
+            for position in range(size):
+                store.set_successor(layer_start + position, LEFT, next_start + (2 * position) % next_size)
+                if next_size > 1:
+                    store.set_successor(layer_start + position, RIGHT, next_start + (2 * position + 1) % next_size)
+        layer_start += size
+    return Node.view(store, 0)
+
+
+def build_cycles(node_count: int, loop_length: int = 3) -> Node:
+    """
+    A path where the left option goes on and the right option goes loop_length nodes back; the last node is the win.
+    """
+    store = GraphStore()
+    for index in range(node_count):
+        is_last = index + 1 == node_count
+        _add_scene(store, index, not is_last, not is_last and index > 0)
+    for index in range(node_count - 1):
+        store.set_successor(index, LEFT, index + 1)
+        if index > 0:
+            store.set_successor(index, RIGHT, max(0, index - loop_length))
+    return Node.view(store, 0)
+
+
+SHAPES: dict[str, Callable[[int], Node]] = {
+    "chain": build_chain,
+    "tree": build_tree,
+    "dag": build_dag,
+    "cycles": build_cycles,
+}
+
+
+def build_graph(shape: str, node_count: int) -> Node:
+    """
+    Builds a synthetic story of the given shape (one of SHAPES) in its own GraphStore.
+    :return: the root node
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown graph shape {shape!r}, expected one of {', '.join(SHAPES)}")
+    if node_count < 1:
+        raise ValueError("A graph needs at least one node")
+    return SHAPES[shape](node_count)
@@ -70,10 +70,13 @@ def build_default_story_graph() -> Node:
     return start
 
 
-def test_game() -> Node:
+def build_test_game() -> Node:
     root: Node = Node("Hi Bilbo. May I come in?")
     nodeA: Node = Node("Sure come on in.")
     nodeB: Node = Node("No, I'm busy right now. Come tomorrow.")
+    # both answers end the story
+    nodeA.is_win = True
+    nodeB.is_win = True
     root.addNode(EnumGesture.ILoveYou_Left, nodeA)
     root.addNode(EnumGesture.ILoveYou_Right, nodeB)
 
@@ -0,0 +1,103 @@
+import os
+import shutil
+import struct
+import zipfile
+
+from . import config
+from .audio_codec import AudioCodec
+
+COPY_CHUNK_SIZE = 1024 * 1024
+# bit 3 of the general purpose flags: sizes and CRC follow the data instead of being in the local header
+DATA_DESCRIPTOR_FLAG = 0x08
+# bit 0: the member is encrypted
+ENCRYPTED_FLAG = 0x01
+# ZipFile internals a raw copy updates the way ZipFile.write does
+_RAW_COPY_ATTRIBUTES = ("_lock", "fp", "filelist", "NameToInfo", "start_dir", "_didModify", "_writing")
+
+
+def zip_compress_type(filename: str) -> int:
+    """
+    Zip compression for an archive member. Already compressed audio is stored as is, since deflating it again only
+    costs CPU on save and load without making it smaller. The binary graph is stored so it can be memory-mapped
+    straight from the archive.
+    """
+    if os.path.basename(filename) == config.BINARY_GRAPH_FILENAME:
+        return zipfile.ZIP_STORED
+    try:
+        if AudioCodec.from_filename(filename).is_compressed:
+            return zipfile.ZIP_STORED
+    except ValueError:
+        pass
+    return zipfile.ZIP_DEFLATED
+
+
+def member_data_offset(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> int:
+    """
+    Gives the offset of the (compressed) data of a member within the archive file, i.e. just past its local header.
+    """
+    zf.fp.seek(info.header_offset)
+    header = struct.unpack(zipfile.structFileHeader, zf.fp.read(zipfile.sizeFileHeader))
+    filename_length, extra_length = header[-2:]
+    return info.header_offset + zipfile.sizeFileHeader + filename_length + extra_length
+
+
+def can_copy_raw(dst: zipfile.ZipFile, info: zipfile.ZipInfo) -> bool:
+    """
+    Checks that a member can be copied into dst byte-for-byte: dst still has the internals copy_member_raw relies on
+    (they are not part of zipfile's public API and may change between Python versions), its file is positioned where
+    the next member goes, and the member is not encrypted.
+    """
+    if info.flag_bits & ENCRYPTED_FLAG or dst.mode not in ("w", "x", "a"):
+        return False
+    if not all(hasattr(dst, attribute) for attribute in _RAW_COPY_ATTRIBUTES) or dst._writing:
+        return False
+    try:
+        return dst.fp.seekable() and dst.fp.tell() == dst.start_dir
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+def copy_member_raw(src: zipfile.ZipFile, dst: zipfile.ZipFile, info: zipfile.ZipInfo, arcname: str):
+    """
+    Copies a member from one archive into another byte-for-byte, without decompressing and recompressing it.
+    The zipfile module has no public API for this, so the local header is written directly to the destination's file
+    and the entry is registered the same way ZipFile.write does it. If dst does not have the zipfile internals this
+    relies on (see can_copy_raw), the member is decompressed and written again through ZipFile.open instead.
+    :param src: archive opened for reading
+    :param dst: archive opened for writing, with no member currently open for writing
+    :param info: the member of src to copy
+    :param arcname: name of the member in dst
+    """
+    copied = zipfile.ZipInfo(arcname, date_time=info.date_time)
+    copied.compress_type = info.compress_type
+    copied.create_system = info.create_system
+    copied.external_attr = info.external_attr
+
+    if not can_copy_raw(dst, info):
+        copied.file_size = info.file_size
+        with src.open(info, 'r') as source, dst.open(copied, 'w', force_zip64=info.file_size > zipfile.ZIP64_LIMIT) \
+                as target:
+            shutil.copyfileobj(source, target, COPY_CHUNK_SIZE)
+        return
+
+    copied.flag_bits = info.flag_bits & ~DATA_DESCRIPTOR_FLAG
+    copied.CRC = info.CRC
+    copied.compress_size = info.compress_size
+    copied.file_size = info.file_size
+
+    data_offset = member_data_offset(src, info)
+    with dst._lock:
+        copied.header_offset = dst.fp.tell()
+        dst.fp.write(copied.FileHeader())
+        src.fp.seek(data_offset)
+        remaining = info.compress_size
+        while remaining > 0:
+            chunk = src.fp.read(min(COPY_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile(f"Truncated member {info.filename}")
+            dst.fp.write(chunk)
+            remaining -= len(chunk)
+        dst.filelist.append(copied)
+        dst.NameToInfo[copied.filename] = copied
+        dst.start_dir = dst.fp.tell()
+        dst._didModify = True
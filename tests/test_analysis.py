@@ -0,0 +1,97 @@
+import unittest
+
+from gesture import EnumGesture
+from graph import GraphStore, Node
+from graph.analysis import analyze_graph
+from storageManager import test_graphs
+
+LEFT = EnumGesture.ILoveYou_Left
+RIGHT = EnumGesture.ILoveYou_Right
+
+
+def build_graph(edges: dict[int, list[int]], wins: set[int], node_count: int) -> list[Node]:
+    """
+    Builds a graph of node_count nodes in one store, node i leading to the nodes in edges[i] (at most two).
+    :return: the nodes, by ID; node 0 is the root
+    """
+    store = GraphStore()
+    nodes = [Node(f"node {index}", store=store) for index in range(node_count)]
+    for source, targets in edges.items():
+        for gesture, target in zip((LEFT, RIGHT), targets):
+            nodes[source].addNode(gesture, nodes[target])
+    for index in wins:
+        nodes[index].is_win = True
+    return nodes
+
+
+class TestAnalyzeGraph(unittest.TestCase):
+
+    def test_sample_stories_are_playable(self):
+        for root in (test_graphs.build_default_story_graph(), test_graphs.build_test_game()):
+            report = analyze_graph(root)
+            self.assertTrue(report.is_playable, str(report))
+            self.assertEqual([], report.errors())
+
+    def test_unreachable_nodes_are_warnings(self):
+        nodes = build_graph({0: [1]}, wins={1}, node_count=4)
+        report = analyze_graph(nodes[0])
+        self.assertEqual(4, report.node_count)
+        self.assertEqual(2, report.reachable_count)
+        self.assertEqual([2, 3], report.unreachable)
+        self.assertTrue(report.is_playable)
+        self.assertEqual(2, len(report.warnings()))
+
+    def test_dead_end(self):
+        nodes = build_graph({0: [1, 2]}, wins={1}, node_count=3)
+        report = analyze_graph(nodes[0])
+        self.assertEqual([2], report.dead_ends)
+        self.assertEqual([2], report.doomed)
+        self.assertFalse(report.is_playable)
+
+    def test_cycle_with_no_exit_is_trapped(self):
+        # 0 -> 1 (win) and 0 -> 2 -> 3 -> 4 -> 2, which cannot be left again
+        nodes = build_graph({0: [1, 2], 2: [3], 3: [4], 4: [2]}, wins={1}, node_count=5)
+        report = analyze_graph(nodes[0])
+        self.assertEqual([[2, 3, 4]], [sorted(component) for component in report.trapped_components])
+        self.assertEqual([], report.dead_ends)
+        self.assertEqual([2, 3, 4], sorted(report.doomed))
+        self.assertFalse(report.is_playable)
+
+    def test_cycle_with_exit_is_not_trapped(self):
+        # 0 -> 1 -> 0 loops, but 1 also leads to the win 2
+        nodes = build_graph({0: [1], 1: [0, 2]}, wins={2}, node_count=3)
+        report = analyze_graph(nodes[0])
+        self.assertIn([0, 1], [sorted(component) for component in report.components])
+        self.assertEqual([], report.trapped_components)
+        self.assertTrue(report.is_playable)
+
+    def test_self_loop_is_trapped(self):
+        nodes = build_graph({0: [1, 2], 2: [2]}, wins={1}, node_count=3)
+        report = analyze_graph(nodes[0])
+        self.assertEqual([[2]], report.trapped_components)
+
+    def test_shortest_path_to_a_win(self):
+        # a long way to the win 4 on the left, a short one on the right
+        nodes = build_graph({0: [1, 3], 1: [2], 2: [4], 3: [4]}, wins={4}, node_count=5)
+        report = analyze_graph(nodes[0])
+        self.assertEqual([0, 3, 4], report.win_path)
+        # depth is the fewest choices needed to reach a node
+        self.assertEqual(2, report.max_depth)
+
+    def test_no_win_reachable(self):
+        nodes = build_graph({0: [1]}, wins={2}, node_count=3)
+        report = analyze_graph(nodes[0])
+        self.assertIsNone(report.win_path)
+        self.assertIn("No win node can be reached from the start.", report.errors())
+
+    def test_deep_story_does_not_recurse(self):
+        depth = 5000
+        nodes = build_graph({index: [index + 1] for index in range(depth)}, wins={depth}, node_count=depth + 1)
+        report = analyze_graph(nodes[0])
+        self.assertTrue(report.is_playable)
+        self.assertEqual(depth, report.max_depth)
+        self.assertEqual(depth + 1, len(report.components))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+import soundfile as sf
+
+from gamePlayer import audioPrefetcher
+from gamePlayer.audioPrefetcher import AudioPrefetcher
+
+SAMPLE_RATE = 16000
+FILENAMES = [f"node_{index}.flac" for index in range(3)]
+
+
+class TestAudioPrefetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, "audio"))
+        for filename in FILENAMES:
+            sf.write(os.path.join(self.directory, "audio", filename), np.zeros(SAMPLE_RATE, dtype="float32"),
+                     SAMPLE_RATE)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_prefetched_audio_is_cached(self):
+        with AudioPrefetcher(self.directory) as prefetcher:
+            prefetcher.prefetch(FILENAMES + [None])
+            data, sample_rate = prefetcher.get(FILENAMES[0])
+            self.assertEqual((SAMPLE_RATE, SAMPLE_RATE), (len(data), sample_rate))
+            for filename in FILENAMES:
+                prefetcher.get(filename)
+            self.assertEqual(FILENAMES, list(prefetcher._buffers))
+
+    def test_decode_finishing_after_close_is_not_cached(self):
+        started, finish = threading.Event(), threading.Event()
+        read = sf.read
+
+        def slow_read(*args, **kwargs):
+            started.set()
+            finish.wait()
+            return read(*args, **kwargs)
+
+        prefetcher = AudioPrefetcher(self.directory, workers=1)
+        with mock.patch.object(audioPrefetcher.sf, "read", slow_read):
+            prefetcher.prefetch(FILENAMES)
+            started.wait()
+            running = prefetcher._pending[FILENAMES[0]]
+            queued = prefetcher._pending[FILENAMES[1]]
+            prefetcher.close()
+            finish.set()
+            running.result()
+        self.assertTrue(queued.cancelled())
+        self.assertEqual({}, dict(prefetcher._buffers))
+        self.assertEqual(0, prefetcher._size)
+
+        prefetcher.prefetch(FILENAMES)
+        self.assertEqual({}, prefetcher._pending)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import io
+import unittest
+
+from gesture import EnumGesture
+from graph import Node
+from graph.binary_graph import BinaryGraph, BinaryGraphWriter, encode_binary_graph
+from graph.serial_graph import SerialGraph
+from graph.serial_node import SerialNode
+
+
+def build_serial_graph() -> SerialGraph:
+    # IDs out of order and a cycle, so neither node order nor IDs can be assumed by the decoder
+    nodes = [
+        SerialNode(id=7, text="Start ✨", left_option="left", right_option="right", audio_filename="node_7.flac",
+                   adjacency_list={EnumGesture.ILoveYou_Left: 3, EnumGesture.ILoveYou_Right: 12}, is_win=False),
+        SerialNode(id=3, text="A loop", left_option="back", right_option="", audio_filename="node_3.flac",
+                   adjacency_list={EnumGesture.ILoveYou_Left: 7}, is_win=False),
+        SerialNode(id=12, text="", left_option="", right_option="", audio_filename="node_12.flac",
+                   adjacency_list={}, is_win=True),
+    ]
+    return SerialGraph(nodes={node.id: node for node in nodes}, audio_codec="flac")
+
+
+class TestBinaryGraph(unittest.TestCase):
+
+    def test_serial_nodes_round_trip(self):
+        serial_graph = build_serial_graph()
+        binary_graph = BinaryGraph(encode_binary_graph(serial_graph))
+        self.assertEqual(3, len(binary_graph))
+        self.assertEqual(0, binary_graph.root_index)
+        for index, serial_node in enumerate(serial_graph.nodes.values()):
+            self.assertEqual(serial_node, binary_graph.serial_node(index))
+            self.assertEqual(index, binary_graph.index_of(serial_node.id))
+
+    def test_store_round_trip(self):
+        serial_graph = build_serial_graph()
+        store = BinaryGraph(encode_binary_graph(serial_graph)).to_store()
+        self.assertEqual(3, len(store))
+        index_of = {node_id: index for index, node_id in enumerate(serial_graph.nodes)}
+        for node_id, serial_node in serial_graph.nodes.items():
+            node = Node.view(store, index_of[node_id])
+            self.assertEqual(
+                (serial_node.text, serial_node.left_option, serial_node.right_option, serial_node.audio_filename,
+                 serial_node.is_win),
+                (node.getText(), node.left_option, node.right_option, node.audio_filename, node.is_win))
+            self.assertEqual({gesture: index_of[target] for gesture, target in serial_node.adjacency_list.items()},
+                             {gesture: target.get_id() for gesture, target in node.adjacencyList.items()})
+        # string 0 of the store is still the empty string
+        Node.view(store, 0).right_option = ""
+        self.assertEqual("", Node.view(store, 0).right_option)
+
+    def test_root_is_written(self):
+        serial_graph = build_serial_graph()
+        with BinaryGraphWriter(root_id=12) as writer:
+            for serial_node in serial_graph.nodes.values():
+                writer.add(serial_node)
+            output = io.BytesIO()
+            writer.write_to(output)
+        binary_graph = BinaryGraph(output.getvalue())
+        self.assertEqual(2, binary_graph.root_index)
+        self.assertEqual("", binary_graph.to_nodes().getText())
+        self.assertTrue(binary_graph.to_nodes().is_win)
+
+    def test_invalid_graphs_are_rejected(self):
+        with self.assertRaises(ValueError):
+            encode_binary_graph(SerialGraph(nodes={}, audio_codec="flac"))
+        with BinaryGraphWriter(root_id=99) as writer:
+            writer.add(build_serial_graph().nodes[12])
+            with self.assertRaises(ValueError):
+                writer.write_to(io.BytesIO())
+        data = encode_binary_graph(build_serial_graph())
+        with self.assertRaises(ValueError):
+            BinaryGraph(b"NOTAGRPH" + data[8:])
+        with self.assertRaises(ValueError):
+            BinaryGraph(data[:40])
+
+    def test_corrupt_edge_is_rejected_by_the_bulk_decode(self):
+        data = bytearray(encode_binary_graph(build_serial_graph()))
+        binary_graph = BinaryGraph(bytes(data))
+        # point the first edge at a node index that does not exist
+        edge_target = binary_graph._edges_start + 4
+        data[edge_target:edge_target + 4] = (1000).to_bytes(4, "little")
+        with self.assertRaises(ValueError):
+            BinaryGraph(bytes(data)).to_store()
+
+
+if __name__ == "__main__":
+    unittest.main()
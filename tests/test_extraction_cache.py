@@ -0,0 +1,114 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+from storageManager.extraction_cache import ExtractionCache, LEASE_FOLDER
+
+ENTRY_SIZE = 1000
+
+
+class TestExtractionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_folder = os.path.join(self.directory, "cache")
+        self.zips = []
+        for index in range(3):
+            zip_path = os.path.join(self.directory, f"game{index}.zip")
+            with zipfile.ZipFile(zip_path, 'w') as zf:
+                zf.writestr(f"game{index}/graph.json", os.urandom(ENTRY_SIZE))
+            self.zips.append(zip_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def cache(self) -> ExtractionCache:
+        # room for one entry only, so every further extract evicts what it can
+        return ExtractionCache(self.cache_folder, max_bytes=ENTRY_SIZE + ENTRY_SIZE // 2)
+
+    def lease_files(self) -> list[str]:
+        return os.listdir(os.path.join(self.cache_folder, LEASE_FOLDER))
+
+    def test_extracts_into_the_game_folder(self):
+        cache = self.cache()
+        folder = cache.extract(self.zips[0])
+        self.assertEqual("game0", os.path.basename(folder))
+        self.assertTrue(os.path.isfile(os.path.join(folder, "graph.json")))
+        self.assertEqual(folder, cache.extract(self.zips[0]))
+
+    def test_leased_entries_are_not_evicted(self):
+        first, second = self.cache(), self.cache()
+        folder0 = first.extract(self.zips[0])
+        folder1 = second.extract(self.zips[1])
+        # over the cap, but both entries are leased
+        self.assertTrue(os.path.isdir(folder0))
+        self.assertTrue(os.path.isdir(folder1))
+
+        second.release(folder1)
+        folder2 = second.extract(self.zips[2])
+        self.assertTrue(os.path.isdir(folder0))
+        self.assertFalse(os.path.isdir(folder1))
+        self.assertTrue(os.path.isdir(folder2))
+
+    def test_every_extract_holds_its_own_lease(self):
+        cache = self.cache()
+        folder = cache.extract(self.zips[0])
+        cache.extract(self.zips[0])
+        cache.release(folder)
+        cache.clear()
+        self.assertTrue(os.path.isdir(folder))
+        cache.release(folder)
+        cache.clear()
+        self.assertFalse(os.path.isdir(folder))
+        self.assertEqual([], self.lease_files())
+
+    def test_stale_lease_is_cleaned_up(self):
+        cache = self.cache()
+        folder = cache.extract(self.zips[0])
+        entry_name = cache.archive_hash(self.zips[0])
+        # a lease left behind by a process that died: the file exists, but nothing holds its lock
+        cache.release(folder)
+        open(os.path.join(self.cache_folder, LEASE_FOLDER, f"{entry_name}.stale"), 'wb').close()
+
+        cache.clear()
+        self.assertFalse(os.path.isdir(folder))
+        self.assertEqual([], self.lease_files())
+
+    def test_clear_keeps_entries_in_use(self):
+        cache = self.cache()
+        folder0 = cache.extract(self.zips[0])
+        folder1 = cache.extract(self.zips[1])
+        cache.release(folder1)
+        cache.clear()
+        self.assertTrue(os.path.isdir(folder0))
+        self.assertFalse(os.path.isdir(folder1))
+
+    def test_hash_index_is_reused_by_a_later_launch(self):
+        digest = self.cache().archive_hash(self.zips[0])
+        with open(self.zips[0], 'rb') as file:
+            self.assertEqual(hashlib.sha256(file.read()).hexdigest(), digest)
+
+        with mock.patch("hashlib.sha256") as sha256:
+            self.assertEqual(digest, self.cache().archive_hash(self.zips[0]))
+        sha256.assert_not_called()
+
+    def test_changed_archive_is_hashed_again(self):
+        digest = self.cache().archive_hash(self.zips[0])
+        with zipfile.ZipFile(self.zips[0], 'a') as zf:
+            zf.writestr("game0/audio/node_0.flac", b"new audio")
+        self.assertNotEqual(digest, self.cache().archive_hash(self.zips[0]))
+
+    def test_damaged_hash_index_is_ignored(self):
+        cache = self.cache()
+        digest = cache.archive_hash(self.zips[0])
+        with open(cache._hash_index_path, 'w') as file:
+            file.write("{not json")
+        self.assertEqual(digest, self.cache().archive_hash(self.zips[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
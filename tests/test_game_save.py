@@ -0,0 +1,123 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+from gesture import EnumGesture
+from graph import Node
+from storageManager import GameLoader, GameSaver, SpeechCache, config
+
+
+class TextTalker:
+    """
+    Stands in for text2speech.Talker: writes the narration itself as the audio, and records what it was asked for.
+    """
+    model_name = "test-stub"
+    device = "cpu"
+    sampling_rate = 16000
+
+    def __init__(self):
+        self.narrations: list[str] = []
+
+    def generate_speech_batch(self, items, description, batch_size=8):
+        for text, output_file in items:
+            self.narrations.append(text)
+            with open(output_file, 'wb') as file:
+                file.write(text.encode("utf-8"))
+
+
+def build_story() -> tuple[Node, Node, Node]:
+    root = Node("You stand at a fork.", "go left", "go right")
+    left = Node("The left path leads home.")
+    right = Node("The right path leads to treasure.")
+    left.is_win = True
+    right.is_win = True
+    root.addNode(EnumGesture.ILoveYou_Left, left)
+    root.addNode(EnumGesture.ILoveYou_Right, right)
+    return root, left, right
+
+
+class TestIncrementalSave(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch.object(config, "SIGNING_KEY_PATH", os.path.join(self.directory, "signing.key"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def save(self, root: Node, cache_name: str) -> tuple[GameSaver, TextTalker, str]:
+        talker = TextTalker()
+        saver = GameSaver(speech_cache=SpeechCache(os.path.join(self.directory, cache_name)), workers=1,
+                          talker_factory=lambda: talker)
+        zip_path = saver.save_game(self.directory, "story", root)
+        return saver, talker, zip_path
+
+    def audio_of(self, zip_path: str) -> dict[str, bytes]:
+        """
+        :return: node text -> the audio the archive has for it
+        """
+        root, archive = GameLoader().load_graph_lazy(zip_path)
+        audio = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            audio[node.getText()] = archive.audio(node.audio_filename).read()
+            stack.extend(node.adjacencyList.values())
+        return audio
+
+    def test_only_changed_nodes_are_synthesized_again(self):
+        root, left, right = build_story()
+        _, first_talker, zip_path = self.save(root, "first_cache")
+        self.assertEqual(3, len(first_talker.narrations))
+        first_audio = self.audio_of(zip_path)
+
+        right.right_option = "dig"
+        # a new speech cache, so nothing but the previous archive can supply the unchanged audio
+        saver, talker, zip_path = self.save(root, "second_cache")
+        self.assertEqual(1, len(talker.narrations))
+        self.assertTrue(talker.narrations[0].startswith("The right path leads to treasure."))
+        self.assertEqual(2, len(saver.last_audio_report.carried))
+
+        audio = self.audio_of(zip_path)
+        self.assertEqual(first_audio["You stand at a fork."], audio["You stand at a fork."])
+        self.assertEqual(first_audio["The left path leads home."], audio["The left path leads home."])
+        self.assertEqual(talker.narrations[0].encode("utf-8"), audio["The right path leads to treasure."])
+        with zipfile.ZipFile(zip_path) as zf:
+            self.assertIsNone(zf.testzip())
+
+    def test_unchanged_resave_synthesizes_nothing(self):
+        root, _, _ = build_story()
+        self.save(root, "first_cache")
+        saver, talker, _ = self.save(root, "second_cache")
+        self.assertEqual([], talker.narrations)
+        self.assertEqual(3, len(saver.last_audio_report.carried))
+
+    def test_unreadable_previous_archive_saves_everything(self):
+        root, _, _ = build_story()
+        self.save(root, "first_cache")
+        with mock.patch.object(GameSaver, "_reuse_previous_audio", side_effect=ValueError("bad archive")):
+            saver, talker, zip_path = self.save(root, "second_cache")
+        self.assertEqual(3, len(talker.narrations))
+        self.assertEqual("bad archive", saver.last_audio_report.previous_archive_error)
+        self.assertEqual(3, len(self.audio_of(zip_path)))
+
+    def test_duplicate_narration_is_synthesized_once(self):
+        root = Node("Pick a door.", "left door", "right door")
+        for gesture in (EnumGesture.ILoveYou_Left, EnumGesture.ILoveYou_Right):
+            ending = Node("Behind the door is an empty room.")
+            ending.is_win = True
+            root.addNode(gesture, ending)
+        saver, talker, zip_path = self.save(root, "cache")
+        self.assertEqual(2, len(talker.narrations))
+        self.assertEqual(1, len(saver.last_audio_report.hits))
+        with zipfile.ZipFile(zip_path) as zf:
+            self.assertEqual(3, len([name for name in zf.namelist() if "/audio/" in name]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from gesture import EnumGesture
+from graph import GraphStore, Node
+
+LEFT = EnumGesture.ILoveYou_Left
+RIGHT = EnumGesture.ILoveYou_Right
+
+
+class TestNode(unittest.TestCase):
+
+    def test_nodes_without_a_store_can_be_connected(self):
+        root = Node("root", "go left", "go right")
+        left = Node("left")
+        right = Node("right")
+        root.addNode(LEFT, left)
+        root.addNode(RIGHT, right)
+        self.assertIs(root.store, left.store)
+        self.assertIs(root.store, right.store)
+        self.assertEqual(3, len({root.get_id(), left.get_id(), right.get_id()}))
+        self.assertEqual(left, root.getNode(LEFT))
+        self.assertEqual("right", root.getNode(RIGHT).getText())
+
+    def test_views_follow_a_merged_store(self):
+        parent = Node("parent")
+        child = Node("child", "a", "b")
+        grandchild = Node("grandchild")
+        child.addNode(LEFT, grandchild)
+        grandchild.is_win = True
+        # parent's store is the smaller one, so it moves into child's store
+        parent.addNode(RIGHT, child)
+        self.assertIs(parent.store, grandchild.store)
+        self.assertEqual(grandchild, parent.getNode(RIGHT).getNode(LEFT))
+        self.assertTrue(grandchild.is_win)
+        self.assertEqual(("a", "b"), (child.left_option, child.right_option))
+        self.assertEqual(3, len(parent.store))
+
+    def test_merge_keeps_fields_and_connections(self):
+        store = GraphStore()
+        first = Node("first", "", "right option", store)
+        second = Node("second", store=store)
+        second.audio_filename = "node_1.flac"
+        first.addNode(LEFT, second)
+        other = Node("other", "left option")
+        other.addNode(LEFT, first)
+
+        self.assertIs(other.store, store)
+        self.assertEqual(["first", "second", "other"], [Node.view(store, node_id).getText() for node_id in range(3)])
+        self.assertEqual(("", "right option", None), (first.left_option, first.right_option, first.audio_filename))
+        self.assertEqual("node_1.flac", second.audio_filename)
+        self.assertEqual("left option", other.left_option)
+        self.assertEqual(second, other.getNode(LEFT).getNode(LEFT))
+
+    def test_adjacency_list_is_read_only(self):
+        root = Node("root")
+        root.addNode(LEFT, Node("child"))
+        with self.assertRaises(TypeError):
+            root.adjacencyList[RIGHT] = root
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+from gesture import EnumGesture
+from graph import Node
+from storageManager import GameLoader, GameSaver, config, integrity
+from storageManager.integrity import BlockVerifier, SigningWriter
+from storageManager.zip_utils import member_data_offset
+
+
+class SigningKeyTestCase(unittest.TestCase):
+    """
+    Signs with a key of its own, in a temporary folder.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        patcher = mock.patch.object(config, "SIGNING_KEY_PATH", os.path.join(self.directory, "signing.key"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+class TestSignatures(SigningKeyTestCase):
+
+    def test_modified_data_does_not_verify(self):
+        signature = integrity.sign(b"graph data")
+        self.assertTrue(integrity.verify(b"graph data", signature))
+        self.assertFalse(integrity.verify(b"graph dat4", signature))
+        self.assertFalse(integrity.verify(b"graph data", None))
+
+    def test_another_key_does_not_verify(self):
+        signature = integrity.sign(b"graph data")
+        os.remove(config.SIGNING_KEY_PATH)
+        self.assertFalse(integrity.verify(b"graph data", signature))
+        integrity.sign(b"anything")
+        self.assertFalse(integrity.verify(b"graph data", signature))
+
+    def test_writer_signs_as_a_whole_and_in_blocks(self):
+        data = os.urandom(2500)
+        writer = SigningWriter(io.BytesIO(), block_size=1000)
+        for start in range(0, len(data), 300):
+            writer.write(data[start:start + 300])
+        self.assertEqual(integrity.sign(data), writer.signature)
+        block_size, blocks = writer.block_signatures
+        self.assertEqual((1000, 3), (block_size, len(blocks)))
+        BlockVerifier(data, writer.block_signatures).check(0, len(data))
+
+    def test_tampered_block_fails_only_when_read(self):
+        data = bytearray(os.urandom(2500))
+        writer = SigningWriter(io.BytesIO(), block_size=1000)
+        writer.write(bytes(data))
+        data[2100] ^= 0xFF
+        verifier = BlockVerifier(bytes(data), writer.block_signatures)
+        verifier.check(0, 2000)
+        with self.assertRaises(ValueError):
+            verifier.check(1990, 2110)
+        with self.assertRaises(ValueError):
+            verifier.check(2400, 2600)
+
+    def test_swapped_blocks_do_not_verify(self):
+        data = os.urandom(2000)
+        writer = SigningWriter(io.BytesIO(), block_size=1000)
+        writer.write(data)
+        with self.assertRaises(ValueError):
+            BlockVerifier(data[1000:] + data[:1000], writer.block_signatures).check(0, 2000)
+
+    def test_manifest_round_trip(self):
+        manifest = integrity.create_manifest(3, {"graph.json": "ab"}, {"graph.bin": (1000, ["cd", "ef"])})
+        self.assertEqual((3, {"graph.json": "ab"}), integrity.read_manifest(manifest.encode("utf-8")))
+        self.assertEqual({"graph.bin": (1000, ["cd", "ef"])}, integrity.read_block_signatures(manifest.encode("utf-8")))
+        self.assertEqual((None, {}), integrity.read_manifest(b"not json"))
+
+
+class TestTamperedArchive(SigningKeyTestCase):
+
+    def save(self) -> str:
+        root = Node("Start", "left", "right")
+        for text in ("Left end", "Right end"):
+            ending = Node(text)
+            ending.is_win = True
+            root.addNode(EnumGesture.ILoveYou_Left if text == "Left end" else EnumGesture.ILoveYou_Right, ending)
+        folder = os.path.join(self.directory, "story")
+        os.makedirs(os.path.join(folder, "audio"))
+        zip_path = os.path.join(self.directory, "story" + config.FILE_EXTENSION)
+        GameSaver()._zip_folder_to(folder, zip_path, root, {})
+        return zip_path
+
+    def flip_byte(self, zip_path: str, member: str, from_end: int):
+        with zipfile.ZipFile(zip_path) as zf:
+            info = zf.getinfo(f"story/{member}")
+            self.assertEqual(zipfile.ZIP_STORED, info.compress_type)
+            position = member_data_offset(zf, info) + info.file_size - from_end
+        with open(zip_path, 'r+b') as file:
+            file.seek(position)
+            value = file.read(1)[0]
+            file.seek(position)
+            file.write(bytes([value ^ 0x20]))
+
+    def test_signed_binary_graph_is_used(self):
+        zip_path = self.save()
+        with mock.patch.object(GameLoader, "_build_graph_trusted") as trusted_json:
+            root, _ = GameLoader().load_graph_lazy(zip_path)
+        trusted_json.assert_not_called()
+        self.assertEqual("Start", root.getText())
+
+    def test_tampered_binary_graph_falls_back_to_graph_json(self):
+        zip_path = self.save()
+        # a letter of the last string
+        self.flip_byte(zip_path, config.BINARY_GRAPH_FILENAME, 1)
+        loader = GameLoader()
+        with mock.patch.object(GameLoader, "_build_graph_trusted", wraps=loader._build_graph_trusted) as trusted_json:
+            root, _ = loader.load_graph_lazy(zip_path)
+        trusted_json.assert_called_once()
+        self.assertEqual(["Left end", "Right end"], sorted(node.getText() for node in root.adjacencyList.values()))
+
+    def test_unsigned_key_means_full_validation(self):
+        zip_path = self.save()
+        os.remove(config.SIGNING_KEY_PATH)
+        loader = GameLoader()
+        with mock.patch.object(GameLoader, "_build_graph", wraps=loader._build_graph) as validated:
+            root, _ = loader.load_graph_lazy(zip_path)
+        validated.assert_called_once()
+        self.assertEqual("Start", root.getText())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+from unittest import mock
+
+from storageManager import zip_utils
+from storageManager.zip_utils import can_copy_raw, copy_member_raw
+
+MEMBERS = {
+    "game/graph.json": (b'{"nodes": {}}' * 500, zipfile.ZIP_DEFLATED),
+    "game/audio/node_0.flac": (os.urandom(50_000), zipfile.ZIP_STORED),
+    "game/audio/empty.flac": (b"", zipfile.ZIP_STORED),
+}
+
+
+class TestCopyMemberRaw(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.src_path = os.path.join(self.directory, "src.zip")
+        with zipfile.ZipFile(self.src_path, 'w') as zf:
+            for name, (data, compress_type) in MEMBERS.items():
+                zf.writestr(name, data, compress_type)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def copy_all(self) -> str:
+        dst_path = os.path.join(self.directory, "dst.zip")
+        with zipfile.ZipFile(self.src_path, 'r') as src, zipfile.ZipFile(dst_path, 'w') as dst:
+            dst.writestr("copied/before.txt", b"written before the copies")
+            for info in src.infolist():
+                copy_member_raw(src, dst, info, info.filename.replace("game/", "copied/"))
+            dst.writestr("copied/after.txt", b"written after the copies")
+        return dst_path
+
+    def assert_copied(self, dst_path: str):
+        with zipfile.ZipFile(self.src_path, 'r') as src, zipfile.ZipFile(dst_path, 'r') as dst:
+            self.assertIsNone(dst.testzip())
+            for info in src.infolist():
+                copied = dst.getinfo(info.filename.replace("game/", "copied/"))
+                self.assertEqual(info.CRC, copied.CRC)
+                self.assertEqual(info.compress_type, copied.compress_type)
+                self.assertEqual(info.file_size, copied.file_size)
+                self.assertEqual(MEMBERS[info.filename][0], dst.read(copied))
+            self.assertEqual(b"written after the copies", dst.read("copied/after.txt"))
+
+    def test_raw_copy_round_trip(self):
+        with zipfile.ZipFile(self.src_path, 'r') as src, \
+                zipfile.ZipFile(os.path.join(self.directory, "check.zip"), 'w') as dst:
+            self.assertTrue(can_copy_raw(dst, src.infolist()[0]))
+        self.assert_copied(self.copy_all())
+
+    def test_compressed_bytes_are_not_recompressed(self):
+        dst_path = self.copy_all()
+        with zipfile.ZipFile(self.src_path, 'r') as src, zipfile.ZipFile(dst_path, 'r') as dst:
+            for info in src.infolist():
+                copied = dst.getinfo(info.filename.replace("game/", "copied/"))
+                self.assertEqual(info.compress_size, copied.compress_size)
+
+    def test_falls_back_without_zipfile_internals(self):
+        with mock.patch.object(zip_utils, "_RAW_COPY_ATTRIBUTES", ("_no_such_attribute",)):
+            self.assert_copied(self.copy_all())
+
+    def test_not_raw_while_a_member_is_open(self):
+        with zipfile.ZipFile(self.src_path, 'r') as src, \
+                zipfile.ZipFile(os.path.join(self.directory, "open.zip"), 'w') as dst:
+            with dst.open("copied/open.txt", 'w'):
+                self.assertFalse(can_copy_raw(dst, src.infolist()[0]))
+
+
+if __name__ == "__main__":
+    unittest.main()
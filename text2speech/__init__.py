@@ -1 +1,2 @@
-from text2speech.text2speech import Talker
\ No newline at end of file
+from text2speech.text2speech import Talker
+from text2speech.synthesis_pool import SynthesisPool, SynthesisJob, SynthesisProgress
\ No newline at end of file
@@ -0,0 +1,187 @@
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+from text2speech.text2speech import Talker
+
+# how often a cancel request is checked while waiting for workers, in seconds
+CANCEL_POLL_INTERVAL = 0.2
+# how long a terminated worker process is waited for, in seconds
+WORKER_EXIT_TIMEOUT = 5.0
+# chunks submitted ahead per worker; further jobs are only taken from the caller's iterable as chunks finish
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+# the Talker of a worker process, loaded once by _init_worker and reused for every job the worker pulls
+_worker_talker: Optional[Talker] = None
+
+
+@dataclass
+class SynthesisJob:
+    """
+    One node to synthesize.
+    """
+    node_id: int
+    text: str
+    output_file: str
+
+
+@dataclass
+class SynthesisProgress:
+    """
+    Progress event for one node: emitted once the node's audio is written, taken from a cache, or has failed for good.
+    """
+    node_id: int
+    completed: int
+    total: int
+    cached: bool = False
+    error: Optional[str] = None
+
+
+def _init_worker(model_name: str, device: str, torch_threads: int):
+    global _worker_talker
+    import torch
+
+    # keep each worker to its share of the cores so the pool does not oversubscribe the machine
+    torch.set_num_threads(torch_threads)
+    _worker_talker = Talker(model_name, device)
+    # load the model now, once per worker, instead of on the first job
+    _worker_talker.model
+
+
+def _terminate_workers(executor: ProcessPoolExecutor):
+    """
+    Stops the worker processes of the executor right away, including the ones in the middle of a job, and waits for
+    them to exit, so they neither write audio nor hold a model in memory any more.
+    """
+    # ProcessPoolExecutor has no public way to stop running calls before Python 3.14, so its processes are taken from it
+    processes = list((executor._processes or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join(WORKER_EXIT_TIMEOUT)
+
+
+def _synthesize(jobs: list[SynthesisJob], description: str, batch_size: int) -> list[int]:
+    _worker_talker.generate_speech_batch([(job.text, job.output_file) for job in jobs], description, batch_size)
+    return [job.node_id for job in jobs]
+
+
+class SynthesisPool:
+    """
+    Synthesizes speech on several worker processes. Each worker loads the TTS model once and then pulls chunks of jobs
+    from the pool's shared queue until there are none left. A chunk is generated in one batched model call, so all of
+    its nodes are done at the same moment: progress is streamed back per node, for every node of a chunk as soon as the
+    chunk is written. A chunk that fails is retried node by node, without redoing the chunks that already succeeded.
+    """
+
+    def __init__(self, workers: int, model_name: str = "parler-tts/parler_tts_mini_v0.1", device: str = "cpu",
+                 torch_threads: Optional[int] = None, batch_size: int = 8, max_retries: int = 2):
+        """
+        :param workers: number of worker processes
+        :param model_name: the TTS model each worker loads
+        :param device: the torch device each worker runs on
+        :param torch_threads: torch threads per worker; defaults to an even share of the CPU cores
+        :param batch_size: maximum number of nodes a worker generates in one call
+        :param max_retries: how many times a failed node is retried before it is reported as failed
+        """
+        self.workers = workers
+        self.model_name = model_name
+        self.device = device
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn, so workers never inherit a forked copy of torch's thread pools
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_name, self.device, self.torch_threads),
+        )
+
+    def synthesize(self, jobs: Iterable[SynthesisJob], description: str,
+                   cancel_event: Optional[threading.Event] = None,
+                   total: Optional[int] = None) -> Iterator[SynthesisProgress]:
+        """
+        Synthesizes all jobs, yielding a progress event for each node once the chunk (at most batch_size nodes, one
+        model call) it was generated in is done.
+        Jobs are taken from the iterable only as workers become free, so it can be a generator producing them while
+        the earlier ones are synthesized.
+        :param jobs: the nodes to synthesize
+        :param description: the voice description, shared by all nodes
+        :param cancel_event: when set, stops the workers and ends the iteration early
+        :param total: the number of jobs (or an upper bound), used to size the chunks; defaults to len(jobs)
+        :return: iterator of progress events, one per job. Closing it early (or cancelling) terminates the workers and
+        waits for them to exit, so no more audio files are written once it is closed.
+        """
+        if total is None:
+            jobs = list(jobs)
+            total = len(jobs)
+        completed = 0
+        # small chunks when there are few jobs, so every worker gets some
+        chunk_size = max(1, min(self.batch_size, math.ceil(total / self.workers)))
+        remaining_jobs: Iterator[SynthesisJob] = iter(jobs)
+        jobs_left = True
+
+        executor = self._create_executor()
+        pending: dict[Future, tuple[list[SynthesisJob], int]] = {}
+        finished = False
+
+        def submit(chunk: list[SynthesisJob], attempt: int):
+            nonlocal executor
+            try:
+                future = executor.submit(_synthesize, chunk, description, self.batch_size)
+            except BrokenProcessPool:
+                # a worker died (e.g. out of memory); start a fresh pool for the remaining jobs
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = self._create_executor()
+                future = executor.submit(_synthesize, chunk, description, self.batch_size)
+            pending[future] = (chunk, attempt)
+
+        try:
+            while True:
+                while jobs_left and len(pending) < self.workers * CHUNKS_IN_FLIGHT_PER_WORKER:
+                    chunk = list(itertools.islice(remaining_jobs, chunk_size))
+                    if not chunk:
+                        jobs_left = False
+                        break
+                    submit(chunk, 0)
+                if not pending:
+                    break
+
+                done, _ = wait(pending, timeout=CANCEL_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                for future in done:
+                    chunk, attempt = pending.pop(future)
+                    try:
+                        node_ids = future.result()
+                    except Exception as e:
+                        if attempt < self.max_retries:
+                            print(f"Synthesis of {len(chunk)} node(s) failed, retrying: {e}")
+                            for job in chunk:
+                                submit([job], attempt + 1)
+                            continue
+                        for job in chunk:
+                            completed += 1
+                            yield SynthesisProgress(job.node_id, completed, total, error=str(e))
+                        continue
+
+                    for node_id in node_ids:
+                        completed += 1
+                        yield SynthesisProgress(node_id, completed, total)
+            finished = True
+        finally:
+            if finished:
+                executor.shutdown()
+            else:
+                # the consumer stopped early (e.g. the save was cancelled): the chunks still running are not needed
+                _terminate_workers(executor)
@@ -1,13 +1,45 @@
-from parler_tts import ParlerTTSForConditionalGeneration
-from transformers import AutoTokenizer
 import soundfile as sf
 
+from tracing import count, span, traced
+
 class Talker:
+    """
+    Narrates text with Parler-TTS. parler_tts and transformers (and with them torch) are only imported once the model,
+    tokenizer or sampling rate is first needed, so importing this module is cheap.
+    """
     def __init__(self, model_name="parler-tts/parler_tts_mini_v0.1", device="cpu"):
+        self.model_name = model_name
         self.device = device
-        self.model = ParlerTTSForConditionalGeneration.from_pretrained(model_name).to(device)
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        # the model and tokenizer are only loaded once speech is actually generated
+        self._model = None
+        self._tokenizer = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            with span("load_tts_model", "tts", model=self.model_name):
+                from parler_tts import ParlerTTSForConditionalGeneration
+                self._model = ParlerTTSForConditionalGeneration.from_pretrained(self.model_name).to(self.device)
+        return self._model
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        return self._tokenizer
+
+    @property
+    def sampling_rate(self) -> int:
+        """
+        Sampling rate of the generated audio. Read from the model config, so the model weights are not loaded for it.
+        """
+        if self._model is not None:
+            return self._model.config.sampling_rate
+        from parler_tts import ParlerTTSConfig
+        return ParlerTTSConfig.from_pretrained(self.model_name).sampling_rate
 
+    @traced("generate_speech", "tts")
     def generate_speech(self, text, description, output_file="output.wav"):
         input_ids = self.tokenizer(description, return_tensors="pt").input_ids.to(self.device)
         prompt_input_ids = self.tokenizer(text, return_tensors="pt").input_ids.to(self.device)
@@ -15,10 +47,45 @@ class Talker:
         generation = self.model.generate(input_ids=input_ids, prompt_input_ids=prompt_input_ids)
         audio_arr = generation.cpu().numpy().squeeze()
         sf.write(output_file, audio_arr, self.model.config.sampling_rate)
+        count("tts.prompts")
         print(f"Audio saved to {output_file}")
 
+    def generate_speech_batch(self, items, description, batch_size=8):
+        """
+        Generates speech for many prompts with one model.generate call per batch.
+        Prompts are sorted by token length and split into buckets of similar length, so little compute is spent on
+        padding. Each output is trimmed to its own length before it is written.
+        :param items: list of (text, output_file) pairs
+        :param description: the voice description, shared by all prompts
+        :param batch_size: maximum number of prompts generated together
+        """
+        lengths = [len(self.tokenizer(text).input_ids) for text, _ in items]
+        order = sorted(range(len(items)), key=lambda i: lengths[i])
+
+        for start in range(0, len(order), batch_size):
+            bucket = [items[i] for i in order[start:start + batch_size]]
+            texts = [text for text, _ in bucket]
+
+            descriptions = self.tokenizer([description] * len(bucket), return_tensors="pt", padding=True).to(self.device)
+            prompts = self.tokenizer(texts, return_tensors="pt", padding=True).to(self.device)
+
+            with span("generate_speech_batch", "tts", prompts=len(bucket)):
+                generation = self.model.generate(
+                    input_ids=descriptions.input_ids,
+                    attention_mask=descriptions.attention_mask,
+                    prompt_input_ids=prompts.input_ids,
+                    prompt_attention_mask=prompts.attention_mask,
+                    return_dict_in_generate=True,
+                )
+            with span("write_speech", "tts", files=len(bucket)):
+                for i, (_, output_file) in enumerate(bucket):
+                    audio_arr = generation.sequences[i, :generation.audios_length[i]].cpu().numpy().squeeze()
+                    sf.write(output_file, audio_arr, self.model.config.sampling_rate)
+                    print(f"Audio saved to {output_file}")
+            count("tts.prompts", len(bucket))
+
 if __name__ == "__main__":
     talker = Talker()
     prompt = "Once upon a time in a land far away"
     description = "A calm and soothing narration voice"
-    talker.generate_speech(prompt, description, "story.wav")
\ No newline at end of file
+    talker.generate_speech(prompt, description, "story.wav")
@@ -0,0 +1,6 @@
+from .tracer import Tracer, SpanSummary, tracer
+
+# shortcuts for instrumenting code with the application's tracer
+span = tracer.span
+count = tracer.count
+traced = tracer.traced
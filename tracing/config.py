@@ -0,0 +1,14 @@
+import os
+
+# record spans and counters; off by default, since the layer is then close to free (set NOUI_TRACE=1 to turn it on)
+TRACING_ENABLED = os.environ.get("NOUI_TRACE", "") not in ("", "0")
+
+# with tracing on, the Chrome trace (open in chrome://tracing or ui.perfetto.dev) is written here when the process
+# exits; {pid} keeps the files of the TTS worker processes apart. Empty to not write one.
+TRACE_OUTPUT_PATH = os.environ.get("NOUI_TRACE_FILE", "trace-{pid}.json")
+
+# most recent events kept in memory; older ones are dropped
+TRACE_MAX_EVENTS = 1_000_000
+
+# seconds of recent spans covered by the rolling summary
+SUMMARY_WINDOW = 60.0
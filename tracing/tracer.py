@@ -0,0 +1,246 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from . import config
+
+
+@dataclass
+class SpanSummary:
+    name: str
+    count: int
+    # seconds spent in the span, and in the span but not in its child spans
+    total: float
+    self_time: float
+    max: float
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class _NullSpan:
+    """
+    What span() gives while tracing is disabled: entering, leaving and setting arguments do nothing.
+    """
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, key: str, value: Any):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start", "child_time")
+
+    def __init__(self, tracer: 'Tracer', name: str, category: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0
+        self.child_time = 0
+
+    def __enter__(self) -> '_Span':
+        self.tracer._stack().append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter_ns()
+        stack = self.tracer._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_time += end - self.start
+        if exc_info[0] is not None:
+            self.args["error"] = exc_info[0].__name__
+        self.tracer._record_span(self, end)
+        return False
+
+    def set(self, key: str, value: Any):
+        """
+        Adds an argument to the span (e.g. a count only known at its end), shown with it in the trace.
+        """
+        self.args[key] = value
+
+
+class Tracer:
+    """
+    Records nested timing spans and counters with very little overhead, for export as a Chrome trace
+    (chrome://tracing, ui.perfetto.dev) and as a summary of where the time of the last minute went.
+    While disabled, span() returns a shared do-nothing object, so instrumented code costs one attribute check.
+    Thread-safe: every thread has its own span stack and appears as its own track in the trace.
+    """
+
+    def __init__(self, enabled: bool = config.TRACING_ENABLED, max_events: int = config.TRACE_MAX_EVENTS):
+        """
+        :param enabled: record from the start
+        :param max_events: most recent events kept; older ones are dropped
+        """
+        self.enabled = enabled
+        self._origin = time.perf_counter_ns()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # completed spans: (name, category, start ns, end ns, thread id, self time ns, args)
+        self._spans: deque[tuple] = deque(maxlen=max_events)
+        # counter changes: (name, time ns, value)
+        self._counter_events: deque[tuple[str, int, float]] = deque(maxlen=max_events)
+        self._counters: dict[str, float] = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._counter_events.clear()
+            self._counters.clear()
+
+    def _stack(self) -> list[_Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record_span(self, span: _Span, end: int):
+        self._spans.append((span.name, span.category, span.start, end, threading.get_ident(),
+                            end - span.start - span.child_time, span.args))
+
+    def span(self, name: str, category: str = "", **args):
+        """
+        Times the with statement it is used in, nested in the span around it:
+            with tracer.span("load_graph", "storage", game=path) as span:
+                ...
+                span.set("nodes", count)
+        :param category: groups spans in the trace viewer (e.g. "storage", "tts", "player", "recognition")
+        :param args: shown with the span in the trace
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, category, args)
+
+    def count(self, name: str, delta: float = 1):
+        """
+        Adds delta to a counter (e.g. frames processed). Counters show as graphs over time in the trace.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            value = self._counters.get(name, 0) + delta
+            self._counters[name] = value
+            self._counter_events.append((name, time.perf_counter_ns(), value))
+
+    def traced(self, name: Optional[str] = None, category: str = "") -> Callable:
+        """
+        Decorator running every call of a function in a span (named after the function by default).
+        """
+        def decorator(function: Callable) -> Callable:
+            span_name = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Span(self, span_name, category, {}):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @property
+    def counters(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._counters)
+
+    def chrome_trace(self) -> dict:
+        """
+        The recorded events in the Chrome trace event format.
+        """
+        pid = os.getpid()
+        events: list[dict] = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"noui {pid}"}}]
+        for name, category, start, end, thread_id, _, args in list(self._spans):
+            events.append({
+                "name": name, "cat": category, "ph": "X", "pid": pid, "tid": thread_id,
+                "ts": (start - self._origin) / 1000, "dur": (end - start) / 1000, "args": args,
+            })
+        for name, timestamp, value in list(self._counter_events):
+            events.append({"name": name, "ph": "C", "pid": pid, "ts": (timestamp - self._origin) / 1000,
+                           "args": {name: value}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str):
+        """
+        Writes the recorded events as a Chrome trace JSON file.
+        """
+        with open(path, "w") as file:
+            json.dump(self.chrome_trace(), file, default=str)
+
+    def summary(self, window: Optional[float] = config.SUMMARY_WINDOW) -> list[SpanSummary]:
+        """
+        Sums the spans that ended in the last window seconds (all recorded spans if None) by name.
+        :return: one summary per span name, the most total time first
+        """
+        since = time.perf_counter_ns() - int(window * 1e9) if window is not None else None
+        summaries: dict[str, SpanSummary] = {}
+        for name, _, start, end, _, self_time, _ in reversed(list(self._spans)):
+            if since is not None and end < since:
+                break
+            summary = summaries.get(name)
+            if summary is None:
+                summary = summaries[name] = SpanSummary(name, 0, 0.0, 0.0, 0.0)
+            duration = (end - start) / 1e9
+            summary.count += 1
+            summary.total += duration
+            summary.self_time += self_time / 1e9
+            summary.max = max(summary.max, duration)
+        return sorted(summaries.values(), key=lambda summary: summary.total, reverse=True)
+
+    def format_summary(self, window: Optional[float] = config.SUMMARY_WINDOW) -> str:
+        """
+        The summary as a table, followed by the counters.
+        """
+        lines = [f"Trace summary (last {window:g} s):" if window is not None else "Trace summary:",
+                 f"{'span':<32} {'count':>7} {'total (s)':>10} {'self (s)':>10} {'mean (ms)':>10} {'max (ms)':>10}"]
+        for summary in self.summary(window):
+            lines.append(f"{summary.name:<32} {summary.count:>7} {summary.total:>10.3f} {summary.self_time:>10.3f} "
+                         f"{summary.mean * 1000:>10.1f} {summary.max * 1000:>10.1f}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<32} {value:>7g}")
+        return "\n".join(lines)
+
+
+# the tracer the application is instrumented with
+tracer = Tracer()
+
+
+def _export_at_exit():
+    if not tracer.enabled:
+        return
+    print(tracer.format_summary(window=None))
+    if not config.TRACE_OUTPUT_PATH:
+        return
+    path = config.TRACE_OUTPUT_PATH.format(pid=os.getpid())
+    try:
+        tracer.export_chrome_trace(path)
+        print(f"Trace written to {path}")
+    except OSError as e:
+        print(f"Failed to write the trace to {path}: {e}")
+
+
+atexit.register(_export_at_exit)